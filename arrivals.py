@@ -0,0 +1,69 @@
+import json
+import numpy as np
+
+# Load shapes: arrival rate (customers per hour) at hours since opening, linear in between
+# The doors close at the last point. A curve can be scaled to stress the casino with the same shape.
+RATE_CURVES = {
+    # Today's spawner on average (one arrival every 5 to 15 seconds) over a whole night
+    "steady": [(0, 360), (8, 360)],
+    # A weekday: a slow afternoon, a small evening bump, empty by midnight
+    "weekday": [(0, 120), (3, 400), (5, 300), (6, 0)],
+    # Friday night from 18:00: busy from the start, a peak around midnight, closing at 04:00
+    "friday_night": [(0, 300), (2, 900), (5, 2400), (6, 2600), (8, 1200), (9, 400), (10, 0)],
+    # The last two hours before closing: arrivals dry up
+    "closing": [(0, 1200), (1, 500), (2, 0)],
+}
+
+
+# Function to load a rate curve from a JSON file: a list of [hours since opening, customers per hour] pairs
+def load_curve(path):
+    with open(path) as file:
+        return [tuple(point) for point in json.load(file)]
+
+
+# RateCurve class is a time-varying arrival rate, from which a whole night of arrivals is drawn at once
+class RateCurve:
+    def __init__(self, points, scale=1.0):
+        hours, rates = zip(*points)
+        self.times = np.array(hours, dtype=float) * 3600  # Seconds since opening of every point
+        self.rates = np.array(rates, dtype=float) * scale / 3600  # Arrivals per second at every point
+        if len(self.times) < 2 or np.any(np.diff(self.times) <= 0) or np.any(self.rates < 0):
+            raise ValueError("A rate curve needs at least two points, increasing times and non-negative rates")
+
+    def rate(self, seconds):
+        # Arrivals per second at the given seconds since opening (0 once the doors are closed)
+        return np.interp(seconds, self.times, self.rates, right=0)
+
+    def expected(self):
+        # Expected number of arrivals over the night
+        return float(np.sum((self.rates[1:] + self.rates[:-1]) / 2 * np.diff(self.times)))
+
+    def schedule(self, rng):
+        # Draw the seconds at which customers arrive (sorted), as a non-homogeneous Poisson process
+        # Each segment between two points is thinned on its own: arrivals are drawn at the segment's highest rate
+        # and each one is kept with probability rate / highest rate, so few draws are wasted even at the peak
+        starts, lengths = self.times[:-1], np.diff(self.times)
+        peaks = np.maximum(self.rates[:-1], self.rates[1:])
+        counts = rng.poisson(peaks * lengths)
+        times = np.repeat(starts, counts) + rng.random(counts.sum()) * np.repeat(lengths, counts)
+        kept = rng.random(len(times)) * np.repeat(peaks, counts) < self.rate(times)
+        return np.sort(times[kept])
+
+
+def spawner_schedule(rng, initial_customers=80, max_customers=300, delay_range=(5, 15)):
+    # Seconds at which the customers arrive with the casino's original spawner: the initial customers at opening,
+    # then the others one after the other, the first at opening too and each next one delay_range seconds later
+    delays = rng.integers(delay_range[0], delay_range[1], size=max(max_customers - initial_customers, 0), endpoint=True)
+    spawned = np.concatenate([[0], np.cumsum(delays)[:-1]]) if len(delays) else delays
+    return np.concatenate([np.zeros(min(initial_customers, max_customers)), spawned]).astype(float)
+
+
+def night_schedule(rng, curve=None, scale=1.0, initial_customers=80, max_customers=None):
+    # Seconds at which every customer of the night arrives: the initial customers at opening, then the arrivals
+    # of a rate curve (a name of RATE_CURVES or a JSON file), or of the original spawner without a curve (300
+    # customers in all unless max_customers says otherwise). max_customers caps the arrivals of a curve.
+    if curve is None:
+        return spawner_schedule(rng, initial_customers, max_customers if max_customers is not None else 300)
+    points = RATE_CURVES[curve] if curve in RATE_CURVES else load_curve(curve)
+    arrivals = np.concatenate([np.zeros(initial_customers), RateCurve(points, scale).schedule(rng)])
+    return arrivals[:max_customers] if max_customers is not None else arrivals
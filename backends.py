@@ -0,0 +1,185 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from clock import Clock, VirtualClock, AsyncioClock, PooledClock
+from simulation import Simulation, Wait, run_process, run_process_async
+
+
+# A backend decides how actors (customers, games, baristas, waiters) are executed.
+# Every actor exposes the same process() generator, plus run() for threads and run_async() for asyncio.
+
+
+# ThreadBackend runs every actor on its own OS thread, in real time
+class ThreadBackend:
+    name = "threads"
+    single_threaded = False  # Actors run concurrently, each database write needs its own connection
+    blocking = False  # run() returns immediately, the threads keep running
+
+    def __init__(self, speedup=1.0):
+        self.clock = Clock(speedup)  # A speedup above 1 shortens every sleep and timer
+
+    def start(self, actor):
+        # Start the actor on a new thread
+        threading.Thread(target=actor.run).start()
+
+    def run(self, process):
+        # Run the main process (customer arrivals) on a background thread and return immediately
+        threading.Thread(target=run_process, args=(process, self.clock)).start()
+
+    def stop(self):
+        # Threads keep running until the program is interrupted, as before
+        pass
+
+
+# SimulationBackend runs every actor as events of a discrete-event simulation on a virtual clock
+class SimulationBackend:
+    name = "des"
+    single_threaded = True
+    blocking = True  # run() returns once every customer has left
+
+    def __init__(self):
+        self.simulation = Simulation()
+        self.clock = VirtualClock(self.simulation)
+
+    def start(self, actor):
+        # Schedule the actor's process at the current virtual time
+        self.simulation.start(actor.process())
+
+    def run(self, process):
+        # Run the main process and every actor until stop() is called
+        self.simulation.start(process)
+        self.simulation.run()
+        print(f"Simulation finished: {self.simulation.now:.0f} simulated seconds, "
+              f"{self.simulation.events_processed} events.")
+
+    def stop(self):
+        self.simulation.stop()
+
+
+# AsyncioBackend runs every actor as a task on a single asyncio event loop, in real time
+class AsyncioBackend:
+    name = "asyncio"
+    single_threaded = True
+    blocking = True
+
+    def __init__(self, speedup=1.0):
+        self.loop = asyncio.new_event_loop()
+        self.clock = AsyncioClock(self.loop, speedup)
+        self.tasks = set()  # Running tasks (the loop only keeps weak references to them)
+        self.finished = self.loop.create_future()  # Resolved by stop() once every customer has left
+
+    def start(self, actor):
+        # Create a task for the actor's coroutine (it starts running once the loop runs)
+        task = self.loop.create_task(actor.run_async())
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def run(self, process):
+        # Run the main process and every actor on the event loop until stop() is called
+        asyncio.set_event_loop(self.loop)
+        # The main task is kept with the actors' tasks, so that it is referenced until it ends (or is cancelled)
+        main = self.loop.create_task(run_process_async(process, self.clock))
+        self.tasks.add(main)
+        main.add_done_callback(self.tasks.discard)
+        try:
+            self.loop.run_until_complete(self.finished)
+        finally:
+            # Games and staff loop forever: cancel them once the casino is closed
+            for task in list(self.tasks):
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*self.tasks, return_exceptions=True))
+            self.loop.close()
+
+    def stop(self):
+        if not self.finished.done():
+            self.finished.set_result(None)
+
+
+# PoolBackend steps every actor on a fixed-size thread pool, in real time
+# Actors that are waiting sit on a timer heap instead of holding a thread, so the thread count stays
+# constant however many customers arrive
+class PoolBackend:
+    name = "pool"
+    single_threaded = False
+    blocking = True
+
+    def __init__(self, workers=8, speedup=1.0):
+        self.clock = PooledClock(self, speedup)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="casino-worker")
+        self._timers = []  # Timer heap of (due time, sequence, callback, args)
+        self._sequence = itertools.count()  # Tie-breaker that keeps timers due at the same time in FIFO order
+        self._condition = threading.Condition()  # Wakes the timer loop when an earlier timer is added
+        self._running = False
+
+    def schedule(self, delay, callback, *args):
+        # Run a callback on the pool after the given delay
+        with self._condition:
+            heapq.heappush(self._timers, (self.clock.now() + delay, next(self._sequence), callback, args))
+            self._condition.notify()
+
+    def start(self, actor):
+        # Step the actor's process on the pool as soon as a worker is free
+        self.schedule(0, self._step, actor.process())
+
+    def _step(self, process):
+        # Advance a process by one step on a worker and park it on the timer heap until its next step
+        try:
+            step = next(process)
+        except StopIteration:
+            return  # The process has finished
+        if isinstance(step, Wait):
+            step.on_wake(lambda: self.schedule(0, self._step, process), self.schedule)
+        else:
+            self.schedule(step, self._step, process)
+
+    def _run_callback(self, callback, args):
+        # Run a due callback on a worker, reporting failures like an uncaught exception in a thread
+        try:
+            callback(*args)
+        except Exception:
+            traceback.print_exc()
+
+    def run(self, process):
+        # Run the timer loop on the calling thread until stop() is called
+        self.schedule(0, self._step, process)
+        self._running = True
+        while True:
+            with self._condition:
+                while self._running and (not self._timers or self._timers[0][0] > self.clock.now()):
+                    timeout = self.clock.to_real(self._timers[0][0] - self.clock.now()) if self._timers else None
+                    self._condition.wait(timeout)
+                if not self._running:
+                    break
+                # Collect every timer that is due
+                due = []
+                now = self.clock.now()
+                while self._timers and self._timers[0][0] <= now:
+                    _, _, callback, args = heapq.heappop(self._timers)
+                    due.append((callback, args))
+            for callback, args in due:
+                self.executor.submit(self._run_callback, callback, args)
+        self.executor.shutdown(wait=True)
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+
+
+BACKENDS = {
+    ThreadBackend.name: ThreadBackend,
+    SimulationBackend.name: SimulationBackend,
+    AsyncioBackend.name: AsyncioBackend,
+    PoolBackend.name: PoolBackend,
+}
+
+
+def create_backend(name, **options):
+    # Create the backend registered under the given name (options are passed to its constructor)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}', expected one of {tuple(BACKENDS)}")
+    return BACKENDS[name](**options)
@@ -1,6 +1,11 @@
 import random
 import threading
-import time
+import heapq
+from collections import deque
+from clock import get_clock
+from db import save_order_timing
+from order_queue import OrderQueue
+from simulation import run_process, run_process_async
 
 # Define an item in the menu (drink, snack, etc.)
 class Item:
@@ -24,13 +29,32 @@ class Order:
         self.lock = threading.Lock()  # Lock to synchronize status updates
         self.items = []               # List of items in the order
         self.customer = customer      # Customer who placed the order
+        self.placed_at = None         # Time at which the order was placed
+        self.queued_at = None         # Time at which the order was queued
+        self.queue_wait = None        # Seconds the order waited before a barista took it
+        self.pending = deque()        # Items no barista has started yet
+        self.pending_counts = {}      # Copies of each item name not started yet, to find orders sharing an item
+        self.remaining = 0            # Items not finished yet, the order is processed when it reaches zero
+        self.completed_at = None      # Time at which the last item was finished
+        self.status_times = {}        # Time at which the order first reached each status
+        self.record_id = None         # Row of the order in order_record, once saved
 
     def set_status(self, status):
         with self.lock: # update the order status using a lock
             self.status = status
+            self.status_times.setdefault(status, get_clock().now()) # Keep the first time of each status
 
     def add_item(self, item):
         self.items.append(item) # Add an item to the order
+        self.pending.append(item)
+        self.pending_counts[item.name] = self.pending_counts.get(item.name, 0) + 1
+        self.remaining += 1
+
+    def item_done(self):
+        # Count one more finished item, returns True when it was the last one
+        with self.lock:
+            self.remaining -= 1
+            return self.remaining == 0
 
     def get_total(self):
         return sum(item.price for item in self.items) # Calculate the total price of the order
@@ -38,40 +62,218 @@ class Order:
     def get_estimated_time(self):
         return sum(item.prep_time for item in self.items) # Calculate the total estimated preparation time for the order
 
+# Queue of bar orders from which a barista can take the same item out of several orders at once
+class BatchOrderQueue(OrderQueue):
+    def take_batch(self, batch_size, max_wait=0):
+        # Take up to batch_size copies of the next pending item, from as many queued orders as needed
+        # (the item and the orders sharing it are chosen in the order of the scheduling policy)
+        # Returns (batch, delay): the (order, item) pairs to prepare, or no pairs and the seconds to wait
+        # for more identical items (None when the queue is empty)
+        with self.lock:
+            if not self.orders:
+                closed = self.closed
+                batch = None
+            else:
+                head = self.orders[0][2]  # Order that goes first, its next item is the one to batch
+                name = head.pending[0].name
+                waited = self.clock.now() - head.queued_at
+                # One pass over the queue for the orders with this item pending, only these few are put in the
+                # order of the policy (an order with several copies of the item gives several of them)
+                matching = [entry for entry in self.orders if name in entry[2].pending_counts]
+                chosen = heapq.nsmallest(batch_size, matching)
+                matches = [order for _, _, order in chosen for _ in range(order.pending_counts[name])][:batch_size]
+                if len(matches) < batch_size and waited < max_wait and not self.closed:
+                    # Give other customers a chance to order the same item (waiting at least 10ms, so that
+                    # float rounding cannot keep the deadline a hair away forever)
+                    return [], max(max_wait - waited, 0.01)
+                batch = []
+                for order in matches:
+                    if len(order.pending) == len(order.items):
+                        self._record_wait(order)  # First item of this order a barista starts on
+                    item = next(item for item in order.pending if item.name == name)
+                    order.pending.remove(item)
+                    order.pending_counts[name] -= 1
+                    if not order.pending_counts[name]:
+                        del order.pending_counts[name]
+                    batch.append((order, item))
+                # Remove the orders with nothing left to start: the first one is popped off the heap, the others
+                # (a batch holds a few at most) are swapped with the last entry and the heap is rebuilt once
+                if not head.pending:
+                    heapq.heappop(self.orders)
+                finished = [entry for entry in chosen if entry[2] is not head and not entry[2].pending]
+                for entry in finished:
+                    index = self.orders.index(entry)
+                    self.orders[index] = self.orders[-1]
+                    self.orders.pop()
+                if finished:
+                    heapq.heapify(self.orders)
+        if batch is None:
+            if closed:
+                self.ready.notify()  # Pass the closing on to the next idle barista
+            return [], None
+        return batch, 0
+
+
 # Represents a bar that can have multiple orders
 class Bar:
-    def __init__(self, menu, name):
+    def __init__(self, menu, name, batch_size=1, max_batch_wait=0, policy="fifo"):
         self.menu = menu               # The bar's menu
-        self.orders = []               # List of current orders
-        self.lock = threading.Lock()   # Lock to protect access to orders
+        self.orders = BatchOrderQueue(get_clock(), policy)  # Queue of orders waiting for a barista
         self.name = name               # Name of the bar
+        self.batch_size = batch_size   # Identical items prepared together, 1 prepares one order at a time (FIFO)
+        self.max_batch_wait = max_batch_wait  # Seconds a barista may wait for a batch to fill up
+        self.products = {item.name: item for item in menu.products}  # Menu items by name
+        self.lock = threading.Lock()   # Lock to protect the counters below
+        self.items_prepared = 0        # Items finished so far
+        self.backlog = 0               # Estimated seconds of work ordered and not finished yet
+        self.baristas = 0              # Baristas currently working at the bar
+
+    def close(self):
+        # Stop taking orders, the baristas finish the queued ones and go home
+        self.orders.close()
+
+    def add_order(self, order):
+        # Queue an order and add its estimated time to the backlog, returns False if the bar is closed
+        estimated = order.get_estimated_time()
+        order.set_status("waiting")
+        with self.lock:
+            self.backlog += estimated
+        if self.orders.put(order):
+            return True
+        with self.lock:
+            self.backlog -= estimated
+        return False
+
+    def items_done(self, item, count=1):
+        # Count finished items and remove their preparation time from the backlog
+        with self.lock:
+            self.items_prepared += count
+            self.backlog -= item.prep_time * count
 
+    def expected_wait(self):
+        # Estimated seconds before a new order is started: the backlog shared among the working baristas
+        return self.backlog / max(self.baristas, 1)
 
-class Barista(threading.Thread):
-    def __init__(self, id, bar):
-        super().__init__()
+    def staff_changed(self, delta):
+        # A barista started (+1) or stopped (-1) working
+        with self.lock:
+            self.baristas += delta
+
+    def report(self, now):
+        # Return the throughput of the bar (items per second), order completion times are in orders.report()
+        with self.lock:
+            return {
+                'items': self.items_prepared,
+                'throughput': self.items_prepared / now if now else 0,
+            }
+
+
+class Barista:
+    def __init__(self, id, bar, idle_timeout=60):
         self.id = id  # Barista's ID
         self.bar = bar
+        self.idle_timeout = idle_timeout  # Longest sleep (seconds) without an order before checking the bar again
+        self.retired = False  # Set by the staffing controller, the barista leaves after the current order
 
-    # Worker thread that processes orders in the bar# Worker thread that processes orders in the bar
+    # Worker thread that processes orders in the bar
     def run(self):
-        while True:
-            with self.bar.lock:
-                if not self.bar.orders: # No orders to process, wait a bit
-                    time.sleep(2)
-                    continue
-                order = self.bar.orders.pop(0) # Take the next order from the queue
-                order.set_status("in_progress")
-                print(f"Barista-{self.id} preparing order for customer-{order.customer.id} will take {order.get_estimated_time()} seconds")
-            for item in order.items: # Take the next order from the queue
-                time.sleep(item.prep_time)
-            order.set_status("processed") # Order is done
+        run_process(self.process(), get_clock())
+
+    # Coroutine equivalent of run() for the asyncio backend
+    async def run_async(self):
+        await run_process_async(self.process(), get_clock())
+
+    # Process that takes orders from the bar queue (yields the seconds spent waiting or preparing)
+    def process(self):
+        self.bar.staff_changed(1)
+        if self.bar.batch_size > 1:
+            yield from self.process_batches()
+        else:
+            yield from self.process_orders()
+        self.bar.staff_changed(-1)
+
+    # Process that prepares one order at a time
+    def process_orders(self):
+        while not self.retired:
+            order = self.bar.orders.get() # Take the next order from the queue
+            if order is None:
+                if self.bar.orders.closed: # The bar has closed and every order is done
+                    break
+                yield self.bar.orders.wait(self.idle_timeout) # Sleep until an order arrives
+                continue
+            order.set_status("in_progress")
+            print(f"Barista-{self.id} preparing order for customer-{order.customer.id} after {order.queue_wait:.1f}s in the queue, will take {order.get_estimated_time()} seconds")
+            for item in order.items: # Prepare each item of the order
+                yield item.prep_time
+                self.bar.items_done(item)
+            self.bar.orders.complete(order) # Order is done
+            save_order_timing(order)
 
             print(f"Barista-{self.id} done preparing order for customer-{order.customer.id}")
 
+    # Process that prepares identical items of several orders together
+    def process_batches(self):
+        while not self.retired:
+            batch, delay = self.bar.orders.take_batch(self.bar.batch_size, self.bar.max_batch_wait)
+            if not batch:
+                if delay is None and self.bar.orders.closed: # The bar has closed and every order is done
+                    break
+                yield self.bar.orders.wait(self.idle_timeout if delay is None else delay) # Wait for orders
+                continue
+            item = batch[0][1]
+            for order, _ in batch:
+                order.set_status("in_progress")
+            print(f"Barista-{self.id} preparing {len(batch)} x {item.name} for customers {[order.customer.id for order, _ in batch]}, will take {item.prep_time} seconds")
+            yield item.prep_time # Identical items are prepared together in the time of one
+            self.bar.items_done(item, len(batch))
+            for order, _ in batch:
+                if order.item_done(): # Last item of this order
+                    self.bar.orders.complete(order)
+                    save_order_timing(order)
+                    print(f"Barista-{self.id} done preparing order for customer-{order.customer.id}")
+
+
+# Bar routing strategies: power-of-two choices, join the shortest queue, or a random bar
+ROUTING = ("p2c", "jsq", "random")
+
+
+# BarRouter class sends each order to a bar serving the item the customer wants, using the bars' expected waits
+class BarRouter:
+    def __init__(self, strategy="p2c"):
+        if strategy not in ROUTING:
+            raise ValueError(f"Unknown bar routing strategy: {strategy}")
+        self.strategy = strategy
+        self.serving = {}  # Item name -> bars whose menu has it, so candidates are found in O(1)
+        self.item_names = []  # Every item served by at least one bar
+        self.routed = {}  # Orders routed to each bar, by bar name
+
+    def add(self, bar):
+        # Index the items of a bar's menu
+        for name in bar.products:
+            if name not in self.serving:
+                self.serving[name] = []
+                self.item_names.append(name)
+            self.serving[name].append(bar)
+        self.routed[bar.name] = 0
+
+    def choose(self, item_name):
+        # Return the bar that should prepare an order starting with the given item
+        bars = self.serving[item_name]
+        if len(bars) == 1 or self.strategy == "random":
+            bar = random.choice(bars)
+        elif self.strategy == "p2c":
+            # Power of two choices: compare two random candidates, O(1) whatever the number of bars
+            first, second = random.sample(bars, 2)
+            bar = first if first.expected_wait() <= second.expected_wait() else second
+        else:
+            # Join the shortest (expected) queue among the few bars serving the item
+            bar = min(bars, key=lambda bar: bar.expected_wait())
+        self.routed[bar.name] += 1
+        return bar
+
 
 # Helper function to create multiple bars with pre-filled menus
-def create_bars():
+def create_bars(batch_size=1, max_batch_wait=0, policy="fifo"):
     drinks_menu = Menu() # drink menu
     drinks_menu.add_product("Beer", 5.00, random.randint(1,5))
     drinks_menu.add_product("Whiskey", 12.00, random.randint(1,5))
@@ -83,16 +285,19 @@ def create_bars():
     snacks_menu.add_product("French Fries", 6.00, random.randint(1,5))
     snacks_menu.add_product("Chicken Wings", 10.00, random.randint(1,5))
     snacks_menu.add_product("Peanuts", 4.00, random.randint(1,5))
+    snacks_menu.add_product("Beer", 5.00, random.randint(1,5))  # Beer and Coke are also served with the snacks
+    snacks_menu.add_product("Coke", 3.00, random.randint(1,5))
 
     cocktails_menu = Menu()
     cocktails_menu.add_product("Old Fashioned", 18.00, random.randint(1,5))
     cocktails_menu.add_product("Mojito", 16.00, random.randint(1,5))
     cocktails_menu.add_product("Negroni", 20.00, random.randint(1,5))
     cocktails_menu.add_product("Margarita", 14.00, random.randint(1,5))
+    cocktails_menu.add_product("Whiskey", 12.00, random.randint(1,5))
 
 
-    drinks_bar = Bar(drinks_menu, "Drinks Bar")
-    snacks_bar = Bar(snacks_menu, "Snacks Bar")
-    cocktails_bar = Bar(cocktails_menu, "Cocktails Bar")
+    drinks_bar = Bar(drinks_menu, "Drinks Bar", batch_size, max_batch_wait, policy)
+    snacks_bar = Bar(snacks_menu, "Snacks Bar", batch_size, max_batch_wait, policy)
+    cocktails_bar = Bar(cocktails_menu, "Cocktails Bar", batch_size, max_batch_wait, policy)
 
     return [drinks_bar, snacks_bar, cocktails_bar] # Return list of all bars
\ No newline at end of file
@@ -0,0 +1,77 @@
+# Benchmark: population and game queue waits under overload, every arrival let in vs admission control
+#
+# Drives the casino (discrete-event simulation) with the "closing" arrival curve at SCALE times its rates,
+# far more customers than the game tables can seat. "before" lets every arrival in, as the casino always did;
+# "after" caps the customers inside at MAX_OCCUPANCY, with an entrance line of ENTRANCE_QUEUE customers who
+# wait up to ENTRANCE_WAIT seconds. Every SAMPLE_INTERVAL simulated seconds it samples the customers inside
+# and the longest wait of a player queued at a game table. Reports the peak population, the p95 and peak of
+# the sampled game waits, how many customers got in, balked or were turned away, and the wall time.
+# Like casino.py, both write the night to casino.db.
+#
+# Usage: python benchmarks/admission_control.py
+import contextlib
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from casino import Casino
+from arrivals import night_schedule
+from customer_registry import AT_ENTRANCE, DEPARTED
+
+# Multiplier of the arrival curve's rates
+SCALE = 60
+
+# Admission limits of the "after" run
+MAX_OCCUPANCY = 200
+ENTRANCE_QUEUE = 100
+ENTRANCE_WAIT = 60
+
+# Simulated seconds between two samples
+SAMPLE_INTERVAL = 60
+
+
+# Sampler class records the casino population and the longest game queue wait as the night goes on
+class Sampler:
+    def __init__(self, casino):
+        self.casino = casino
+        self.samples = []  # (customers inside, longest wait of a queued player)
+
+    def process(self):
+        while True:
+            yield SAMPLE_INTERVAL
+            counts = self.casino.locations.report()
+            inside = sum(count for location, count in counts.items() if location not in (AT_ENTRANCE, DEPARTED))
+            now = self.casino.clock.now()
+            wait = max((game.wait_list.oldest_wait(now) for dispatcher in self.casino.games.values()
+                        for game in dispatcher.instances), default=0)
+            self.samples.append((inside, wait))
+
+
+def run(arrivals, **options):
+    casino = Casino(backend="des", **options)
+    sampler = Sampler(casino)
+    casino.start_actor(sampler)
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        casino.open_casino(arrivals=arrivals)
+    elapsed = time.perf_counter() - started
+    inside, waits = zip(*sampler.samples)
+    return max(inside), np.percentile(waits, 95), max(waits), casino.entrance.report(), elapsed
+
+
+def show(label, peak, p95_wait, max_wait, entrance, elapsed):
+    print(f"{label:<7} peak {peak:5d} inside, game wait p95 {p95_wait:7.1f}s max {max_wait:7.1f}s, "
+          f"{entrance['admitted']:5d} let in, {entrance['balked']:5d} balked, {entrance['rejected']:5d} turned away, "
+          f"{elapsed:6.1f}s")
+
+
+if __name__ == "__main__":
+    arrivals = night_schedule(np.random.default_rng(1), "closing", SCALE)
+    print(f"{len(arrivals)} arrivals over {arrivals[-1] / 3600:.1f} hours")
+    show("before", *run(arrivals))
+    show("after", *run(arrivals, max_occupancy=MAX_OCCUPANCY, entrance_queue=ENTRANCE_QUEUE,
+                       entrance_wait=ENTRANCE_WAIT))
@@ -0,0 +1,63 @@
+# Benchmark: customer arrivals generated per second, one at a time vs from a precomputed schedule
+#
+# "before" reproduces the original spawner's work per arrival: draw the delay to the next customer, build the
+# customer and insert it with its own connection and commit. "after" draws the whole night's schedule at once
+# (arrivals.py) and builds and inserts the customers ARRIVAL_BATCH at a time, with one statement per batch.
+# Reports arrivals per second for 20k customers, then the time to draw a Friday night's schedule at 10x and
+# 100x its rates. Like casino.py, both write the customers to casino.db.
+#
+# Usage: python benchmarks/arrival_generation.py
+import contextlib
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from casino import Casino, ARRIVAL_BATCH
+from customer_factory import CustomerFactory, ProfileRegistry
+from arrivals import RATE_CURVES, RateCurve, spawner_schedule
+from db import create_tables, next_record_id, save_customer, save_customers
+
+
+def run_before(factory, customers):
+    first_id = next_record_id("customer")
+    started = time.perf_counter()
+    arrived_at = 0
+    for id in range(first_id, first_id + customers):
+        arrived_at += random.randint(5, 15)  # Delay to the next customer, as in the original spawner
+        save_customer(factory.create_customer(id))
+    return time.perf_counter() - started
+
+
+def run_after(factory, customers):
+    first_id = next_record_id("customer")
+    started = time.perf_counter()
+    arrivals = spawner_schedule(np.random.default_rng(), 0, customers)
+    for start in range(0, len(arrivals), ARRIVAL_BATCH):
+        batch = factory.create_customers(first_id + start, len(arrivals[start:start + ARRIVAL_BATCH]))
+        save_customers([(customer.id, customer.balance, customer.type, 1 if customer.car else 0, None, None, None)
+                        for customer in batch])
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    create_tables()
+    factory = CustomerFactory(Casino(backend="des"), ProfileRegistry())
+    customers = 20000
+    for label, run in (("before", run_before), ("after", run_after)):
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            elapsed = run(factory, customers)
+        print(f"{customers} arrivals {label:<7} {elapsed:7.2f}s  {customers / elapsed:10.0f} arrivals/s")
+
+    rng = np.random.default_rng(1)
+    for scale in (10, 100):
+        curve = RateCurve(RATE_CURVES["friday_night"], scale)
+        started = time.perf_counter()
+        arrivals = curve.schedule(rng)
+        elapsed = time.perf_counter() - started
+        print(f"friday_night x{scale:<4} {len(arrivals):9d} arrivals (expected {curve.expected():9.0f}) "
+              f"drawn in {elapsed:.3f}s")
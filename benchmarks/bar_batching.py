@@ -0,0 +1,71 @@
+# Benchmark: bar throughput and order latency, one order at a time (FIFO) vs batching identical items
+#
+# Runs a discrete-event simulation of one bar with three baristas, where customers arrive at a fixed rate
+# and each order one to seven items of the drinks menu. Reports items/sec and order latency for FIFO and
+# for increasing batch sizes. Nothing is written to the database.
+#
+# Usage: python benchmarks/bar_batching.py [orders per minute] [simulated hours] [max batch wait]
+import contextlib
+import io
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from casino import Casino
+from bar import Bar, Barista, Menu, Order
+
+
+# Customer class stands in for a casino customer placing the order
+class Customer:
+    def __init__(self, id):
+        self.id = id
+
+
+def drinks_menu():
+    # The drinks bar menu of create_bars(), with fixed preparation times
+    menu = Menu()
+    menu.add_product("Beer", 5.00, 2)
+    menu.add_product("Whiskey", 12.00, 3)
+    menu.add_product("Martini", 15.00, 5)
+    menu.add_product("Coke", 3.00, 1)
+    return menu
+
+
+def arrivals(casino, bar, rate, duration):
+    # Process placing orders at the given rate (per simulated second) until duration is reached
+    id = 0
+    while casino.clock.now() < duration:
+        id += 1
+        order = Order(Customer(id))
+        for item in random.choices(bar.menu.products, k=random.randint(1, 7)):
+            order.add_item(item)
+        bar.add_order(order)
+        yield random.expovariate(rate)
+    casino.backend.stop()
+
+
+def run(label, rate, duration, batch_size, max_batch_wait):
+    casino = Casino(backend="des")
+    bar = Bar(drinks_menu(), "Drinks Bar", batch_size, max_batch_wait)
+    for i in range(3):
+        casino.start_actor(Barista(i, bar))
+    with contextlib.redirect_stdout(io.StringIO()):
+        casino.backend.run(arrivals(casino, bar, rate, duration))
+    throughput = bar.report(casino.clock.now())['throughput']
+    row = bar.orders.report()
+    print(f"{label:<10} {throughput:6.3f} items/sec, {row['completed']:5d} orders done, "
+          f"{row['depth']:5d} still queued, latency mean {row['mean_completion']:8.1f}s p95 {row['p95_completion']:8.1f}s")
+
+
+if __name__ == "__main__":
+    rate = float(sys.argv[1]) / 60 if len(sys.argv) > 1 else 15 / 60
+    duration = float(sys.argv[2]) * 3600 if len(sys.argv) > 2 else 4 * 3600
+    max_batch_wait = float(sys.argv[3]) if len(sys.argv) > 3 else 5
+    print(f"{rate * 60:.0f} orders per minute for {duration / 3600:.0f} simulated hours, 3 baristas")
+    random.seed(1)
+    run("FIFO", rate, duration, 1, 0)
+    for batch_size in (2, 4, 8, 16):
+        random.seed(1)
+        run(f"batch {batch_size}", rate, duration, batch_size, max_batch_wait)
@@ -0,0 +1,81 @@
+# Benchmark: order completion time with random, join-shortest-queue and power-of-two-choices bar routing
+#
+# Runs a discrete-event simulation of four bars serving the same drinks menu with 1, 2, 3 and 3 baristas.
+# Customers arrive at a fixed rate, the router picks a bar for the item they want, and they order one to
+# seven items of that bar's menu. Reports order completion time for each routing strategy and the share
+# of orders each bar received. Nothing is written to the database.
+#
+# Usage: python benchmarks/bar_routing.py [orders per minute] [simulated hours]
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from casino import Casino
+from bar import Bar, Barista, BarRouter, Menu, Order, ROUTING
+
+# Baristas working at each bar
+STAFF = (1, 2, 3, 3)
+
+
+# Customer class stands in for a casino customer placing the order
+class Customer:
+    def __init__(self, id):
+        self.id = id
+
+
+def drinks_menu():
+    # The drinks bar menu of create_bars(), with fixed preparation times
+    menu = Menu()
+    menu.add_product("Beer", 5.00, 2)
+    menu.add_product("Whiskey", 12.00, 3)
+    menu.add_product("Martini", 15.00, 5)
+    menu.add_product("Coke", 3.00, 1)
+    return menu
+
+
+def arrivals(casino, router, rate, duration, orders):
+    # Process placing orders at the given rate (per simulated second) until duration is reached
+    id = 0
+    while casino.clock.now() < duration:
+        id += 1
+        wanted = random.choice(router.item_names)
+        bar = router.choose(wanted)
+        order = Order(Customer(id))
+        for item in [bar.products[wanted]] + random.choices(bar.menu.products, k=random.randint(0, 6)):
+            order.add_item(item)
+        bar.add_order(order)
+        orders.append(order)
+        yield random.expovariate(rate)
+    casino.backend.stop()
+
+
+def run(strategy, rate, duration):
+    casino = Casino(backend="des")
+    router = BarRouter(strategy)
+    for number, staff in enumerate(STAFF):
+        bar = Bar(drinks_menu(), f"Bar-{number}")
+        router.add(bar)
+        for i in range(staff):
+            casino.start_actor(Barista(i, bar))
+    orders = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        casino.backend.run(arrivals(casino, router, rate, duration, orders))
+    times = sorted(order.completed_at - order.queued_at for order in orders if order.completed_at is not None)
+    shares = " ".join(f"{count / len(orders):4.0%}" for count in router.routed.values())
+    print(f"{strategy:<7} completion mean {statistics.mean(times):8.1f}s p95 {times[int(0.95 * (len(times) - 1))]:8.1f}s "
+          f"p99 {times[int(0.99 * (len(times) - 1))]:8.1f}s | still queued {len(orders) - len(times):5d} | "
+          f"orders per bar {shares}")
+
+
+if __name__ == "__main__":
+    rate = float(sys.argv[1]) / 60 if len(sys.argv) > 1 else 45 / 60
+    duration = float(sys.argv[2]) * 3600 if len(sys.argv) > 2 else 4 * 3600
+    print(f"{rate * 60:.0f} orders per minute for {duration / 3600:.0f} simulated hours, baristas per bar {STAFF}")
+    for strategy in ROUTING:
+        random.seed(1)
+        run(strategy, rate, duration)
@@ -0,0 +1,72 @@
+# Micro-benchmark: customer decisions per second, weighted draws rebuilt on every call vs alias tables
+#
+# "before" reproduces the original decisions: choose_game rebuilds the game and weight lists and calls
+# random.choices, a floor step tries each action with its own random.random() draw, and the type of an
+# arriving customer is drawn with random.choices over the raw spawn weights. "after" draws from the
+# alias tables compiled once per profile, with a single random number per decision. Also checks that both
+# give the same odds for every floor action. Nothing is written to the database.
+#
+# Usage: python benchmarks/customer_decisions.py [draws]
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from customer import FLOOR_ACTIONS
+from customer_factory import customer_profiles, ProfileRegistry
+
+# Profile used for the per-customer decisions
+PROFILE = "gambler"
+# Probability field the original floor step tested for each action, in the order it tested them
+ACTION_FIELDS = {"leave": "p_leaving", "strategize": "p_strategizing", "play": "p_playing", "order": "p_ordering",
+                 "sleep": "p_sleeping", "restaurant": "p_restaurant"}
+
+
+def game_before(fields):
+    games = list(fields["game_preferences"].keys())
+    probs = list(fields["game_preferences"].values())
+    return random.choices(games, weights=probs, k=1)[0]
+
+
+def action_before(fields):
+    for action in FLOOR_ACTIONS:
+        if random.random() < fields[ACTION_FIELDS[action]]:
+            return action
+    return "wait"
+
+
+def type_before(names, weights):
+    return random.choices(names, weights=weights, k=1)[0]
+
+
+def rate(draw, count):
+    started = time.perf_counter()
+    for _ in range(count):
+        draw()
+    return count / (time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    registry = ProfileRegistry()
+    profile, fields = registry.profiles[PROFILE], customer_profiles[PROFILE]
+    names = list(customer_profiles)
+    weights = [customer_profiles[name]["spawn_weight"] for name in names]
+    decisions = [
+        ("game choice", lambda: game_before(fields), profile.games.sample),
+        ("floor action", lambda: action_before(fields), profile.actions.sample),
+        ("customer type", lambda: type_before(names, weights), registry.choose_type),
+    ]
+    print(f"{count} draws of each decision ({PROFILE} profile)")
+    for label, before, after in decisions:
+        slow, fast = rate(before, count), rate(after, count)
+        print(f"{label:<14} before {slow / 1e6:5.2f}M/s  after {fast / 1e6:5.2f}M/s  ({fast / slow:.1f}x)")
+
+    random.seed(1)
+    expected = Counter(action_before(fields) for _ in range(count))
+    drawn = Counter(profile.actions.sample() for _ in range(count))
+    gap = max(abs(expected[action] - drawn[action]) / count for action in FLOOR_ACTIONS + ("wait",))
+    print(f"largest difference in floor action odds: {gap:.4f}")
@@ -0,0 +1,102 @@
+# Benchmark: memory used by customers, one __dict__ per customer vs slotted customers with shared profiles
+#
+# "before" reproduces the original Customer: every profile field copied into a per-instance __dict__, and
+# a car and a wake-up signal built on threading.Condition. "after" builds customers the way the factories
+# now do: slotted Customer, Car and Signal, with the profile compiled once per type and shared.
+# Reports the memory traced while building 10k and 100k customers of mixed types. Nothing is written to
+# the database.
+#
+# Usage: python benchmarks/customer_memory.py
+import os
+import random
+import sys
+import threading
+import tracemalloc
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from casino import Casino
+from customer_factory import customer_profiles, ProfileRegistry
+from customer import Customer
+
+
+# LegacySignal class is the original Signal, built on a Condition
+class LegacySignal:
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._waiters = deque()
+        self._pending = False
+
+
+# LegacyCar class is the original Car, with a __dict__
+class LegacyCar:
+    def __init__(self, customer_id):
+        self.customer_id = customer_id
+        self.parked = False
+        self.slot = None
+        self.parking_record_id = None
+        self.parking = None
+        self.waiting = False
+        self.waiting_since = None
+        self.slot_ready = LegacySignal()
+
+
+# LegacyCustomer class is the original Customer, with every profile field copied in
+class LegacyCustomer:
+    def __init__(self, id, casino, balance, p_leaving, p_strategizing, p_ordering, p_playing, type, p_sleeping,
+                 min_bet, max_bet, has_car_probability, p_restaurant, game_preferences):
+        self.id = id
+        self.casino = casino
+        self.balance = balance
+        self.lock = threading.Lock()
+        self.p_leaving = p_leaving
+        self.p_strategizing = p_strategizing
+        self.p_ordering = p_ordering
+        self.p_playing = p_playing
+        self.p_sleeping = p_sleeping
+        self.min_bet = min_bet
+        self.max_bet = max_bet
+        self.car = LegacyCar(id) if random.random() < has_car_probability else None
+        self.booked_room = None
+        self.permanence_id = None
+        self.type = type
+        self.p_restaurant = p_restaurant
+        self.game_preferences = game_preferences
+        self.state = "arriving"
+        self.parking_attempts = 0
+        self.restaurant = None
+        self.restaurant_bill = 0
+        self.returned = LegacySignal()
+
+
+# Profile fields of each type, as the original factories passed them to the Customer
+profile_fields = {name: {field: value for field, value in fields.items() if field != "spawn_weight"}
+                  for name, fields in customer_profiles.items()}
+registry = ProfileRegistry()
+
+
+def build_before(casino, id, name):
+    return LegacyCustomer(id=id, casino=casino, balance=random.randint(100, 1000), type=name, **profile_fields[name])
+
+
+def build_after(casino, id, name):
+    return Customer(id=id, casino=casino, balance=random.randint(100, 1000), profile=registry.profiles[name])
+
+
+def measure(label, build, count):
+    random.seed(1)
+    casino = Casino(backend="des")
+    names = random.choices(list(customer_profiles), k=count)
+    tracemalloc.start()
+    customers = [build(casino, id, name) for id, name in enumerate(names)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{count:7d} customers {label:<7} {size / 2 ** 20:8.1f} MB, {size / count:6.0f} bytes per customer")
+    return customers
+
+
+if __name__ == "__main__":
+    for count in (10000, 100000):
+        measure("before", build_before, count)
+        measure("after", build_after, count)
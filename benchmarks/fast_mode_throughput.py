@@ -0,0 +1,62 @@
+# Benchmark: simulated customer-seconds per second, actor simulation vs fast mode
+#
+# "before" runs the casino as a discrete-event simulation, every customer an actor stepped one at a time.
+# "after" runs the same night in fast mode (fast_mode.py), the whole population as arrays advanced a second
+# at a time. Every customer is in the casino at opening, the crowd capacity planning is about. Reports the wall
+# time and the customer-seconds simulated per second of wall time (writing to the database included), then
+# fast mode alone for a crowd too large for actors. Like casino.py, both write the night to casino.db.
+#
+# Usage: python benchmarks/fast_mode_throughput.py
+import contextlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from casino import Casino
+from fast_mode import FastCasino
+from arrivals import spawner_schedule
+
+# BenchCasino class is the actor casino, adding up how long its customers stay
+class BenchCasino(Casino):
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.arrived_at = {}  # Customer id -> time they were started
+        self.customer_seconds = 0
+
+    def start_customer(self, customer):
+        self.arrived_at[customer.id] = self.clock.now()
+        super().start_customer(customer)
+
+    def customer_departed(self, customer):
+        self.customer_seconds += self.clock.now() - self.arrived_at.pop(customer.id)
+        super().customer_departed(customer)
+
+
+def run_before(customers):
+    casino = BenchCasino(backend="des")
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        casino.open_casino(total_customers_initial=customers, max_customers=customers)
+    return time.perf_counter() - started, casino.customer_seconds
+
+
+def run_after(customers):
+    casino = FastCasino(parking_slots=30, hotel_rooms=10, seed=1)
+    arrivals = spawner_schedule(casino.rng, customers, customers)
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        casino.run(arrivals)
+    return time.perf_counter() - started, casino.customer_seconds
+
+
+def show(customers, label, elapsed, customer_seconds):
+    print(f"{customers:7d} customers {label:<7} {elapsed:8.2f}s  {customer_seconds / elapsed / 1e6:8.3f}M customer-seconds/s")
+
+
+if __name__ == "__main__":
+    for customers in (5000, 20000):
+        show(customers, "before", *run_before(customers))
+        show(customers, "after", *run_after(customers))
+    show(100000, "after", *run_after(100000))
@@ -0,0 +1,98 @@
+# Benchmark: customers away from the floor polling for their return vs sleeping until they are handed back
+#
+# Runs a discrete-event simulation of customers who alternate between the casino floor and an activity
+# (a game round, a meal or a hotel stay) of random length. "before" reproduces the original Customer loop:
+# an away customer wakes every 1 to 5 seconds to look up its location. "after" runs the current one: it
+# sleeps on its returned signal, which the game / hotel / restaurant fires when handing it back.
+# Reports the wake-ups spent finding the customer still away, the CPU time of the run, and how long
+# customers stayed idle after being handed back. Nothing is written to the database.
+#
+# Usage: python benchmarks/floor_wakeups.py [simulated minutes]
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from casino import Casino
+from customer import RETURN_TIMEOUT
+from customer_registry import CustomerRegistry, ON_FLOOR, AT_GAME_TABLE
+from simulation import Signal
+
+# Seconds an activity away from the floor lasts (game rounds are short, hotel stays up to 50 seconds)
+ACTIVITY_TIME = (1, 50)
+
+
+# Customer class keeps the parts of the casino customer that wait to be handed back
+class Customer:
+    def __init__(self, id):
+        self.id = id
+        self.returned = Signal()
+        self.returned_at = None  # Time at which the customer was last handed back
+        self.polls = 0  # Wake-ups that found the customer still away
+        self.idle = []  # Seconds between being handed back and noticing it
+
+
+def hand_back(casino, locations, customer, notify):
+    # What the game, hotel or restaurant does at the end of the activity
+    customer.returned_at = casino.clock.now()
+    locations.move(customer, ON_FLOOR)
+    if notify:
+        customer.returned.notify()
+
+
+def customer_process(casino, locations, customer, event_driven):
+    # Decide on the floor, go away for an activity, then wait until handed back
+    while True:
+        yield random.randint(1, 5)  # Time on the floor before the next activity
+        locations.move(customer, AT_GAME_TABLE)
+        casino.clock.call_later(random.randint(*ACTIVITY_TIME), hand_back, casino, locations, customer, event_driven)
+        while locations.location_of(customer.id) != ON_FLOOR:
+            if event_driven:
+                yield customer.returned.wait(RETURN_TIMEOUT)
+            else:
+                yield random.randint(1, 5)
+            customer.polls += 1
+        customer.polls -= 1  # The last wake-up found the customer back
+        customer.idle.append(casino.clock.now() - customer.returned_at)
+
+
+# Actor class lets the backend start a customer process
+class Actor:
+    def __init__(self, process):
+        self.process = lambda: process
+
+
+def closing(casino, duration):
+    yield duration
+    casino.backend.stop()
+
+
+def run(count, duration, event_driven):
+    random.seed(1)
+    casino = Casino(backend="des")
+    locations = CustomerRegistry()
+    customers = [Customer(i) for i in range(count)]
+    for customer in customers:
+        locations.move(customer, ON_FLOOR)
+        casino.start_actor(Actor(customer_process(casino, locations, customer, event_driven)))
+    started = time.process_time()
+    casino.backend.run(closing(casino, duration))
+    cpu = time.process_time() - started
+    polls = sum(customer.polls for customer in customers)
+    idle = [seconds for customer in customers for seconds in customer.idle]
+    label = "after (returned signal)" if event_driven else "before (polling)"
+    print(f"{count:6d} customers {label:<24} {polls:9d} wasted wake-ups, cpu {cpu:6.2f}s, "
+          f"idle after return mean {statistics.mean(idle):4.2f}s, {len(idle)} returns")
+    return cpu
+
+
+if __name__ == "__main__":
+    duration = float(sys.argv[1]) * 60 if len(sys.argv) > 1 else 10 * 60
+    print(f"{duration / 60:.0f} simulated minutes")
+    for count in (1000, 10000):
+        before = run(count, duration, False)
+        after = run(count, duration, True)
+        print(f"{count:6d} customers: {before - after:.2f}s of cpu saved ({1 - after / before:.0%})")
@@ -0,0 +1,80 @@
+# Benchmark: how seating scales as game instances are added
+#
+# Runs a discrete-event simulation in which players arrive at a fixed rate for one game, and reports
+# throughput, utilization and mean join-to-play wait for an increasing number of tables.
+# Rounds only record when players are seated, nothing is written to the database.
+#
+# Usage: python benchmarks/game_scaling.py [game] [arrivals per minute] [simulated hours]
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from casino import Casino
+from game import Game
+
+# Table parameters of each game (capacity, minimum seats), as in game_implementations.py
+GAMES = {
+    "Slot Machine": (1, 1),
+    "BlackJack": (5, 1),
+    "Roulette": (30, 1),
+    "Craps": (20, 1),
+    "Poker": (6, 2),
+}
+
+
+# Player class records when it joined and when it was seated
+class Player:
+    def __init__(self, joined_at):
+        self.joined_at = joined_at
+        self.seated_at = None
+
+
+# BenchGame class is the current Game, with rounds that only record when each player was seated
+class BenchGame(Game):
+    def play_round(self, players):
+        for player in players:
+            player.seated_at = self.casino.clock.now()
+
+
+def arrivals(casino, dispatcher, rate, duration, players):
+    # Process generating players at the given rate (per simulated second) until duration is reached
+    while casino.clock.now() < duration:
+        player = Player(casino.clock.now())
+        players.append(player)
+        dispatcher.join(player)
+        yield random.expovariate(rate)
+    casino.backend.stop()
+
+
+def run(name, instances, rate, duration):
+    casino = Casino(backend="des")
+    capacity, min_seats = GAMES[name]
+    games = [BenchGame(casino, name, capacity, 0.5, 2, id, min_seats=min_seats) for id in range(instances)]
+    for game in games:
+        casino.start_actor(game)
+    players = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        casino.backend.run(arrivals(casino, casino.games[name], rate, duration, players))
+    rows = casino.games[name].report(casino.clock.now())
+    waits = [p.seated_at - p.joined_at for p in players if p.seated_at is not None]
+    served = sum(row['players'] for row in rows)
+    print(f"{instances:3d} tables: {served * 3600 / duration:8.1f} players/hour, "
+          f"utilization {statistics.mean(row['utilization'] for row in rows):4.0%}, "
+          f"stolen {sum(row['stolen'] for row in rows):5d}, "
+          f"mean wait {statistics.mean(waits) if waits else 0:7.1f}s, "
+          f"still queued {len(players) - len(waits)}")
+
+
+if __name__ == "__main__":
+    name = sys.argv[1] if len(sys.argv) > 1 else "Slot Machine"
+    rate = float(sys.argv[2]) / 60 if len(sys.argv) > 2 else 1.0
+    duration = float(sys.argv[3]) * 3600 if len(sys.argv) > 3 else 4 * 3600
+    print(f"{name}: {rate * 60:.0f} arrivals per minute for {duration / 3600:.0f} simulated hours")
+    for instances in (1, 2, 4, 8, 16, 32):
+        random.seed(1)
+        run(name, instances, rate, duration)
@@ -0,0 +1,114 @@
+# Benchmark: join-to-play latency of a game table, polling wait list vs condition-based wait list
+#
+# "before" reproduces the original table loop: a plain list, pop(0), and sleeps taken while holding the lock.
+# "after" runs the current Game with its WaitList (deque + Signal, tables wake as soon as players join).
+# Both run on real threads with an accelerated clock; latencies are reported in simulated seconds.
+#
+# Usage: python benchmarks/game_wait_latency.py [players] [speedup]
+import os
+import random
+import statistics
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from casino import Casino
+from game import Game
+
+
+# Player class stands in for a customer: it records when it joined, when the join call returned and when it played
+class Player:
+    def __init__(self, clock):
+        self.clock = clock
+        self.joined_at = None
+        self.join_returned_at = None
+        self.played_at = None
+        self.done = threading.Event()
+
+    def play(self):
+        self.played_at = self.clock.now()
+        self.done.set()
+
+
+# BenchGame class is the current Game, with rounds that only record when each player played
+class BenchGame(Game):
+    def play_round(self, players):
+        for player in players:
+            player.play()
+
+
+def legacy_table(clock, wait_list, lock, capacity, stop):
+    # The original Game.run loop
+    while not stop.is_set():
+        with lock:
+            if not wait_list:
+                clock.sleep(random.randint(1, 10))  # Sleeps while holding the lock
+                continue
+            for _ in range(min(len(wait_list), capacity)):
+                player = wait_list.pop(0)
+                player.play()
+                clock.sleep(random.randint(1, 5))  # Customer.play used to sleep here, still under the lock
+        clock.sleep(random.randint(1, 5))
+
+
+def run_before(players, speedup):
+    casino = Casino(backend="threads", speedup=speedup)
+    clock = casino.clock
+    wait_list, lock, stop = [], threading.Lock(), threading.Event()
+    threading.Thread(target=legacy_table, args=(clock, wait_list, lock, 5, stop), daemon=True).start()
+
+    def join(player):
+        with lock:
+            wait_list.append(player)
+
+    results = generate_arrivals(clock, players, join)
+    stop.set()
+    return results
+
+
+def run_after(players, speedup):
+    casino = Casino(backend="threads", speedup=speedup)
+    game = BenchGame(casino, "BlackJack", capacity=5, probability=0.49, prize=2, id=0)
+    threading.Thread(target=game.run, daemon=True).start()
+    return generate_arrivals(casino.clock, players, casino.games["BlackJack"].join)
+
+
+def generate_arrivals(clock, players, join):
+    # Players join one table at random intervals (about one every 8 simulated seconds)
+    # Each join runs on its own thread so that a blocked join does not delay the following arrivals
+    joined, joins = [], []
+    for _ in range(players):
+        player = Player(clock)
+        player.joined_at = clock.now()
+        thread = threading.Thread(target=join_and_record, args=(clock, player, join), daemon=True)
+        thread.start()
+        joined.append(player)
+        joins.append(thread)
+        clock.sleep(random.expovariate(1 / 8))
+    for player, thread in zip(joined, joins):
+        player.done.wait()
+        thread.join()
+    return joined
+
+
+def join_and_record(clock, player, join):
+    join(player)
+    player.join_returned_at = clock.now()
+
+
+def summarize(label, players):
+    latencies = sorted(p.played_at - p.joined_at for p in players)
+    blocked = [p.join_returned_at - p.joined_at for p in players]
+    p95 = latencies[int(0.95 * (len(latencies) - 1))]
+    print(f"{label:<8} join-to-play mean {statistics.mean(latencies):7.2f}s  median {statistics.median(latencies):7.2f}s  "
+          f"p95 {p95:7.2f}s  |  join blocked mean {statistics.mean(blocked):6.2f}s max {max(blocked):6.2f}s")
+
+
+if __name__ == "__main__":
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 150
+    speedup = float(sys.argv[2]) if len(sys.argv) > 2 else 100
+    random.seed(1)
+    summarize("before", run_before(players, speedup))
+    random.seed(1)
+    summarize("after", run_after(players, speedup))
@@ -0,0 +1,113 @@
+# Benchmark: hotel booking throughput, scanning rooms with a timer thread per stay vs a free-room pool
+#
+# "before" reproduces the original hotel: a booking takes the lock of every room in turn until it finds a free
+# one, and starts a threading.Timer for the checkout. "after" runs the current Hotel, which takes rooms from a
+# pool and puts checkouts on the heap of its single scheduler actor. The hotel is filled to the given
+# occupancy, then guests check out and new guests book one after the other. Reports bookings per second and
+# the timer threads alive for hotels of thousands of rooms. Nothing is written to the database.
+#
+# Usage: python benchmarks/hotel_booking.py [cycles] [occupancy]
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from casino import Casino
+from hotel import Hotel, Room
+
+# Length of every stay (seconds), longer than the benchmark so that no checkout fires during it
+STAY = 3600
+
+
+# Customer class stands in for a casino customer
+class Customer:
+    def __init__(self, id):
+        self.id = id
+        self.booked_room = None
+
+
+# LegacyRoom class is the original room: its own lock and a timer thread per booking
+class LegacyRoom:
+    def __init__(self, room_number):
+        self.room_number = room_number
+        self.customer = None
+        self.lock = threading.Lock()
+        self.timer = None
+
+    def book(self, customer, duration_seconds):
+        with self.lock:
+            if self.customer is None:
+                self.customer = customer
+                self.timer = threading.Timer(duration_seconds, self.de_book)
+                self.timer.start()
+                return True
+            return False
+
+    def de_book(self):
+        with self.lock:
+            self.timer.cancel()  # Checking out early in the benchmark, as the timer would have done
+            self.customer = None
+
+
+# LegacyHotel class is the original hotel: every booking walks the rooms
+class LegacyHotel:
+    def __init__(self, num_rooms):
+        self.rooms = [LegacyRoom(i) for i in range(num_rooms)]
+
+    def book_room(self, customer, duration_seconds):
+        for room in self.rooms:
+            if room.book(customer, duration_seconds):
+                return room
+        return None
+
+    def check_out(self, room):
+        room.de_book()
+
+
+# BenchRoom class is the current room without the database write and the customer bookkeeping
+class BenchRoom(Room):
+    def book(self, customer, duration_seconds):
+        self.customer = customer
+
+    def de_book(self):
+        self.customer = None
+
+
+# BenchHotel class is the current Hotel with BenchRooms
+class BenchHotel(Hotel):
+    def __init__(self, num_rooms, casino):
+        super().__init__(num_rooms, casino)
+        self.rooms = [BenchRoom(i, casino) for i in range(num_rooms)]
+        self.free_rooms = deque(self.rooms)
+
+    def check_out(self, room):
+        self._check_out(room)
+
+
+def run(label, hotel, num_rooms, cycles, occupancy):
+    random.seed(1)
+    booked = [hotel.book_room(Customer(i), STAY) for i in range(int(num_rooms * occupancy))]
+    threads = threading.active_count() - 1
+    started = time.perf_counter()
+    for i in range(cycles):
+        index = random.randrange(len(booked))
+        hotel.check_out(booked[index])
+        booked[index] = hotel.book_room(Customer(len(booked) + i), STAY)
+    elapsed = time.perf_counter() - started
+    print(f"{num_rooms:6d} rooms {label:<7} {cycles / elapsed:10.0f} bookings per second, {threads:5d} timer threads")
+    return booked
+
+
+if __name__ == "__main__":
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    occupancy = float(sys.argv[2]) if len(sys.argv) > 2 else 0.9
+    print(f"{cycles} checkouts and bookings at {occupancy:.0%} occupancy")
+    for num_rooms in (1000, 2000, 5000):
+        for room in run("before", LegacyHotel(num_rooms), num_rooms, cycles, occupancy):
+            room.timer.cancel()
+            room.timer.join()
+        run("after", BenchHotel(num_rooms, Casino(backend="des")), num_rooms, cycles, occupancy)
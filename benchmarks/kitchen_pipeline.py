@@ -0,0 +1,109 @@
+# Benchmark: restaurant order completion time, waiters cooking whole orders vs a kitchen of parallel stations
+#
+# "before" reproduces the original Waiter: it takes an order and prepares its items one after the other.
+# "after" runs the current Restaurant: items go to the oven / cold / drinks stations and are prepared in
+# parallel, waiters only deliver. Both run a discrete-event simulation of PizzaPlace with four waiters and
+# report completion time (placing to delivery), then station utilization for a few kitchen sizes.
+# Nothing is written to the database.
+#
+# Usage: python benchmarks/kitchen_pipeline.py [orders per minute] [simulated hours]
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from casino import Casino
+from order_queue import OrderQueue
+from restaurant import Menu, Order, Restaurant, Waiter
+
+
+# Customer class stands in for a casino customer placing the order
+class Customer:
+    def __init__(self, id):
+        self.id = id
+
+
+def pizza_menu():
+    # The PizzaPlace menu of create_restaurants()
+    menu = Menu()
+    menu.add_product("Pizza", 8.99, 4, "oven")
+    menu.add_product("Salad", 4.99, 2, "cold")
+    menu.add_product("Water", 0.00, 0, "drinks")
+    return menu
+
+
+# LegacyWaiter class is the original Waiter: it cooks every item of the order in sequence
+class LegacyWaiter:
+    def __init__(self, queue):
+        self.queue = queue
+
+    def process(self):
+        while True:
+            order = self.queue.get()
+            if order is None:
+                yield self.queue.wait()
+                continue
+            for item in order.items:
+                yield item.prep_time
+            self.queue.complete(order)
+
+
+def arrivals(casino, menu, place, rate, duration, orders):
+    # Process placing orders at the given rate (per simulated second) until duration is reached
+    id = 0
+    while casino.clock.now() < duration:
+        id += 1
+        order = Order(Customer(id))
+        for item in random.choices(menu.products, k=random.randint(1, 7)):
+            order.add_item(item)
+        place(order)
+        orders.append(order)
+        yield random.expovariate(rate)
+    casino.backend.stop()
+
+
+def summarize(label, orders, stations=""):
+    times = sorted(order.completed_at - order.placed_at for order in orders if order.completed_at is not None)
+    print(f"{label:<42} completion mean {statistics.mean(times):8.1f}s p95 {times[int(0.95 * (len(times) - 1))]:8.1f}s "
+          f"still waiting {len(orders) - len(times):5d}  {stations}")
+
+
+def run_before(rate, duration):
+    casino = Casino(backend="des")
+    menu, queue, orders = pizza_menu(), OrderQueue(casino.clock), []
+    for _ in range(4):
+        casino.start_actor(LegacyWaiter(queue))
+    with contextlib.redirect_stdout(io.StringIO()):
+        casino.backend.run(arrivals(casino, menu, queue.put, rate, duration, orders))
+    summarize("before (4 cooking waiters)", orders)
+
+
+def run_after(rate, duration, stations):
+    casino = Casino(backend="des")
+    restaurant = Restaurant(pizza_menu(), "PizzaPlace", 10, casino, stations)
+    for i in range(4):
+        casino.start_actor(Waiter(i, restaurant))
+    for cook in restaurant.kitchen.cooks():
+        casino.start_actor(cook)
+    orders = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        casino.backend.run(arrivals(casino, restaurant.menu, restaurant.add_order, rate, duration, orders))
+    now = casino.clock.now()
+    busy = " ".join(f"{row['station']} {row['utilization']:4.0%}" for row in restaurant.kitchen.report(now))
+    summarize(f"after {stations}", orders, busy)
+
+
+if __name__ == "__main__":
+    rate = float(sys.argv[1]) / 60 if len(sys.argv) > 1 else 8 / 60
+    duration = float(sys.argv[2]) * 3600 if len(sys.argv) > 2 else 4 * 3600
+    print(f"{rate * 60:.0f} orders per minute for {duration / 3600:.0f} simulated hours")
+    random.seed(1)
+    run_before(rate, duration)
+    for stations in ({"oven": 1, "cold": 1, "drinks": 1}, {"oven": 2, "cold": 1, "drinks": 1},
+                     {"oven": 3, "cold": 1, "drinks": 1}):
+        random.seed(1)
+        run_after(rate, duration, stations)
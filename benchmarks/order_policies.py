@@ -0,0 +1,86 @@
+# Benchmark: order completion time under each scheduling policy (fifo, sjf, vip, aging)
+#
+# Runs a discrete-event simulation of one bar with three baristas serving orders one at a time, with
+# customers of mixed types arriving at a fixed rate and ordering one to seven drinks. Reports mean, p95 and
+# p99 completion time (placing to finishing the order) for all orders and for VIP / rich customers.
+# Nothing is written to the database.
+#
+# Usage: python benchmarks/order_policies.py [orders per minute] [simulated hours]
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from casino import Casino
+from bar import Bar, Barista, Menu, Order
+from order_queue import POLICIES, VIP_TYPES
+
+# Customer types and their share of the orders
+TYPES = {"gambler": 80, "vip": 10, "rich_player": 10}
+
+
+# Customer class stands in for a casino customer placing the order
+class Customer:
+    def __init__(self, id, type):
+        self.id = id
+        self.type = type
+
+
+def drinks_menu():
+    # The drinks bar menu of create_bars(), with fixed preparation times
+    menu = Menu()
+    menu.add_product("Beer", 5.00, 2)
+    menu.add_product("Whiskey", 12.00, 3)
+    menu.add_product("Martini", 15.00, 5)
+    menu.add_product("Coke", 3.00, 1)
+    return menu
+
+
+def arrivals(casino, bar, rate, duration, orders):
+    # Process placing orders at the given rate (per simulated second) until duration is reached
+    id = 0
+    while casino.clock.now() < duration:
+        id += 1
+        order = Order(Customer(id, random.choices(list(TYPES), weights=list(TYPES.values()))[0]))
+        for item in random.choices(bar.menu.products, k=random.randint(1, 7)):
+            order.add_item(item)
+        bar.add_order(order)
+        orders.append(order)
+        yield random.expovariate(rate)
+    casino.backend.stop()
+
+
+def summary(times):
+    # Mean, p95 and p99 of a list of completion times
+    times = sorted(times)
+    if not times:
+        return "no orders completed"
+    return (f"mean {statistics.mean(times):7.1f}s  p95 {times[int(0.95 * (len(times) - 1))]:7.1f}s  "
+            f"p99 {times[int(0.99 * (len(times) - 1))]:7.1f}s")
+
+
+def run(policy, rate, duration):
+    casino = Casino(backend="des")
+    bar = Bar(drinks_menu(), "Drinks Bar", policy=policy)
+    for i in range(3):
+        casino.start_actor(Barista(i, bar))
+    orders = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        casino.backend.run(arrivals(casino, bar, rate, duration, orders))
+    done = [order for order in orders if order.completed_at is not None]
+    vip = [order for order in done if order.customer.type in VIP_TYPES]
+    print(f"{policy:<6} all {summary([o.completed_at - o.queued_at for o in done])}  |  "
+          f"vip {summary([o.completed_at - o.queued_at for o in vip])}  |  still queued {len(orders) - len(done)}")
+
+
+if __name__ == "__main__":
+    rate = float(sys.argv[1]) / 60 if len(sys.argv) > 1 else 15 / 60
+    duration = float(sys.argv[2]) * 3600 if len(sys.argv) > 2 else 8 * 3600
+    print(f"{rate * 60:.0f} orders per minute for {duration / 3600:.0f} simulated hours, 3 baristas")
+    for policy in POLICIES:
+        random.seed(1)
+        run(policy, rate, duration)
@@ -0,0 +1,71 @@
+# Benchmark: park and de-park throughput of the parking lot, slot scanning vs a free-slot pool
+#
+# "before" reproduces the original lot: parking shuffles the shared slot list and takes the lock of every
+# slot in turn until it finds a free one. "after" runs the current Parking, which takes and returns slots
+# from a pool. The lot is filled to the given occupancy, then cars leave and new cars park one after the
+# other. Reports park + de-park pairs per second for lots of thousands of slots. Nothing is written to the
+# database.
+#
+# Usage: python benchmarks/parking_throughput.py [cycles] [occupancy]
+import contextlib
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parking_lot import Car, Parking, ParkingSlot
+
+
+# LegacySlot class is the original slot, with its own lock
+class LegacySlot(ParkingSlot):
+    def __init__(self, id):
+        super().__init__(id)
+        self.lock = threading.Lock()
+
+
+# LegacyParking class is the original lot: a list of slots scanned on every attempt
+class LegacyParking:
+    def __init__(self, capacity):
+        self.list_slots = [LegacySlot(id) for id in range(capacity)]
+
+    def acquire(self, car):
+        random.shuffle(self.list_slots)
+        for slot in self.list_slots:
+            with slot.lock:
+                if slot.available():
+                    slot.occupy(car)
+                    return True
+        return False
+
+    def release(self, car):
+        slot = car.slot
+        with slot.lock:
+            slot.vacate(car)
+
+
+def run(label, parking, capacity, cycles, occupancy):
+    random.seed(1)
+    cars = [Car(i) for i in range(int(capacity * occupancy))]
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for car in cars:
+            parking.acquire(car)
+        started = time.perf_counter()
+        for i in range(cycles):
+            index = random.randrange(len(cars))
+            parking.release(cars[index])
+            cars[index] = Car(len(cars) + i)
+            parking.acquire(cars[index])
+        elapsed = time.perf_counter() - started
+    print(f"{capacity:6d} slots {label:<8} {cycles / elapsed:10.0f} park + de-park per second")
+
+
+if __name__ == "__main__":
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    occupancy = float(sys.argv[2]) if len(sys.argv) > 2 else 0.9
+    print(f"{cycles} cycles at {occupancy:.0%} occupancy")
+    for capacity in (1000, 5000, 20000):
+        run("before", LegacyParking(capacity), capacity, cycles, occupancy)
+        run("after", Parking(capacity), capacity, cycles, occupancy)
@@ -0,0 +1,69 @@
+# Soak test: memory of a long night of arrivals must level off once customers start leaving
+#
+# Runs the whole casino as a discrete-event simulation for a large number of arrivals (100k by default) and
+# samples the resident set size (RSS) of the process as customers come and go. Departed customers are
+# removed from every live structure, so after the warm-up RSS must stay flat however many customers have
+# come through. Fails (exit status 1) if RSS grows by more than MAX_GROWTH between the end of the warm-up
+# and the end of the run. Like casino.py, it writes the night to casino.db.
+#
+# Usage: python benchmarks/soak.py [arrivals]
+import contextlib
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from casino import Casino
+from customer_registry import DEPARTED
+
+# Share of the arrivals after which the casino is considered warmed up
+WARM_UP = 0.2
+
+# Largest RSS growth (bytes) allowed after the warm-up
+MAX_GROWTH = 16 * 1024 * 1024
+
+# Simulated seconds between two RSS samples
+SAMPLE_INTERVAL = 3600
+
+
+def rss():
+    # Current resident set size of the process in bytes (Linux)
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+# Sampler class records the RSS and the casino population as the night goes on
+class Sampler:
+    def __init__(self, casino):
+        self.casino = casino
+        self.samples = []  # (customers generated, customers in the casino, RSS)
+
+    def process(self):
+        while True:
+            yield SAMPLE_INTERVAL
+            counts = self.casino.locations.report()
+            inside = sum(count for location, count in counts.items() if location != DEPARTED)
+            self.samples.append((self.casino.total_customers_generated, inside, rss()))
+
+
+if __name__ == "__main__":
+    arrivals = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    casino = Casino(backend="des")
+    sampler = Sampler(casino)
+    casino.start_actor(sampler)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        casino.open_casino(total_customers_initial=80, max_customers=arrivals)
+    final = rss()
+
+    step = max(len(sampler.samples) // 10, 1)
+    for generated, inside, size in sampler.samples[::step]:
+        print(f"{generated:8d} arrivals {inside:6d} in the casino  RSS {size / 2 ** 20:7.1f} MB")
+    print(f"{arrivals:8d} arrivals, closed          RSS {final / 2 ** 20:7.1f} MB")
+
+    warm = next(size for generated, _, size in sampler.samples if generated >= WARM_UP * arrivals)
+    growth = final - warm
+    print(f"RSS growth after the warm-up: {growth / 2 ** 20:.1f} MB (limit {MAX_GROWTH / 2 ** 20:.0f} MB)")
+    if growth > MAX_GROWTH:
+        print("FAIL: memory keeps growing with the number of customers")
+        sys.exit(1)
+    print("OK: memory is steady")
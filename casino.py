@@ -1,224 +1,330 @@
 # Standard library imports
 import threading
-import random
-import time
-import sqlite3
 import os
+import argparse
+import numpy as np
 
-# Game factories
-from game_implementations import RouletteFactory, BlackJackFactory, CrapsFactory, SlotMachineFactory, PokerFactory
+# Game dispatchers and the table manager (which creates games with the game factories)
+from game import GameDispatcher
+from table_manager import TableManager
 
-# Customer factories
-from customer_factory import (
-    GamblerFactory, OrderingAddictFactory, StrategistFactory, BudgetPlayerFactory, DrunkenGamblerFactory,
-    AdventurerFactory, MinimalistFactory, RichPlayerFactory, RiskyCheatingFactory, RiskyPlayerFactory,
-    ShopperFactory, SafePlayerFactory, TiredCustomerFactory, VipFactory
-)
+# Customer factory and the registry of customer profiles
+from customer_factory import CustomerFactory, ProfileRegistry, load_profiles
 
-# Bar, parking, restaurant, and hotel modules
-from bar import create_bars, Barista
+# Bar, parking, restaurant, hotel and entrance modules
+from bar import create_bars, BarRouter, ROUTING
 from parking_lot import Parking
-from restaurant import create_restaurants, Waiter
+from restaurant import create_restaurants
 from hotel import Hotel
+from entrance import Entrance
+from staffing import StaffingController
+from customer_registry import CustomerRegistry, ON_FLOOR, DEPARTED
+
+# Execution backends, clock and database helpers
+from backends import BACKENDS, create_backend
+from clock import set_clock
+from order_queue import POLICIES
+from db import create_tables, open_shared_connection, close_shared_connection, next_record_id, save_customers, save_bar, save_restaurant, save_latency_histograms
+from arrivals import RATE_CURVES, night_schedule, spawner_schedule
+
+# Customers built and saved together ahead of their arrival
+ARRIVAL_BATCH = 1000
 
 
 # Casino main class
 class Casino:
-    def __init__(self):
+    def __init__(self, backend="threads", parking_slots=30, hotel_rooms=10, max_occupancy=None, entrance_queue=100,
+                 entrance_wait=60, **backend_options):
         # Initialize key components of the casino
+        # "threads" runs every actor on a real thread, "asyncio" as tasks of one event loop,
+        # "pool" steps every actor on a fixed-size thread pool,
+        # "des" as events of a discrete-event simulation on a virtual clock
+        self.backend = create_backend(backend, **backend_options)
+        self.clock = self.backend.clock  # Time source for every actor
+        set_clock(self.clock)  # Database timestamps are taken from the casino clock
         self.games = {}  # Dictionary to hold games by name
         self.bars = {}  # Dictionary to hold bars by name
-        self.customers = []  # List of customers currently in casino
-        self.customers_lock = threading.Lock()  # Lock for safe multi-threaded access to customers
-        self.parking = Parking()  # Parking lot instance
+        self.bar_router = BarRouter()  # Sends each bar order to the bar with the shortest expected wait
+        self.locations = CustomerRegistry()  # Where every customer currently in the casino is
+        self.parking = Parking(parking_slots)  # Parking lot instance
         self.restaurants = []  # List of restaurants
-        self.hotel = Hotel(10, casino=self)  # Hotel with 10 rooms
+        self.hotel = Hotel(hotel_rooms, casino=self)  # Hotel, its actor checks guests out
+        self.entrance = Entrance(self, max_occupancy, entrance_queue, entrance_wait)  # Lets customers in, or in line
+        self.table_manager = TableManager(self)  # Opens and closes game tables as demand changes
+        self.staffing = StaffingController(self)  # Hires and retires baristas and waiters as queues change
         self.db_path = os.path.join(os.path.dirname(__file__), "casino.db")  # Database file path
+        self.active_customers = 0  # Customers started and not yet departed
+        self.active_lock = threading.Lock()  # Lock guarding the active customers and the end of the arrivals
+        self.arrivals_done = False  # Whether the dynamic spawner has created all its customers
 
     def add_game(self, game):
-        #Add a game to the casino if it's not already added
-        if game.name not in self.games:
-            self.games[game.name] = {'wait_list': [], 'lock': threading.Lock()}
+        #Add a game table to the casino if it's not already added (each game has a dispatcher for its tables)
+        self.dispatcher(game.name).add(game)
+
+    def dispatcher(self, name):
+        # Return the dispatcher of a game's tables, created the first time the game is asked for
+        # (a game named only in a --profiles file has no table until the dispatcher opens one)
+        if name not in self.games:
+            self.games.setdefault(name, GameDispatcher(name, self.table_manager.open_table))
+        return self.games[name]
 
     def add_bar(self, bar):
         #Add a bar to the casino
         self.bars[bar.name] = bar
+        self.bar_router.add(bar)
 
     def add_restaurant(self, restaurant):
         # Add a restaurant to the casino
         self.restaurants.append(restaurant)
 
-    def add_customer(self, customer):
-        #Safely add a customer to the casino
-        with self.customers_lock:
-            self.customers.append(customer)
+    def admit(self, customer):
+        # Let a customer in through the entrance: put them on the floor and start them
+        print(f"New Customer-{customer.id} ({customer.type}) arrived at the casino.")
+        self.add_customer(customer)
+        self.start_customer(customer)
 
-    def open_casino(self):
+    def add_customer(self, customer):
+        # Put a customer who has just arrived on the casino floor
+        self.locations.move(customer, ON_FLOOR)
+
+    def return_to_floor(self, customer):
+        # Hand a customer back to the casino floor (after a game round, a hotel stay or a meal) and wake them up
+        self.locations.move(customer, ON_FLOOR)
+        customer.returned.notify()
+
+    def start_actor(self, actor):
+        # Start a customer, game, barista, waiter or cook on the selected backend
+        self.backend.start(actor)
+
+    def start_customer(self, customer):
+        # Start a customer and keep track of how many are still in the casino
+        with self.active_lock:
+            self.active_customers += 1
+        self.start_actor(customer)
+
+    def customer_departed(self, customer):
+        # Called by a customer when it leaves the casino, the entrance lets the next customer in line in
+        self.locations.move(customer, DEPARTED)
+        self.entrance.leave(customer)
+        with self.active_lock:
+            self.active_customers -= 1
+            finished = self.arrivals_done and self.active_customers == 0
+        if finished:
+            # Every customer has left: the simulation is complete
+            self.close_casino()
+
+    def close_casino(self):
+        # Close the bars and restaurants (their staff finish the queued orders), save their latency histograms,
+        # then stop the backend
+        for bar in self.bars.values():
+            bar.close()
+            save_latency_histograms("bar", bar.name, bar.orders.histograms)
+        for restaurant in self.restaurants:
+            restaurant.close()
+            save_latency_histograms("restaurant", restaurant.name, restaurant.orders.histograms)
+        self.backend.stop()
+
+    def open_casino(self, total_customers_initial=80, max_customers=300, bar_batch_size=1, bar_batch_wait=0,
+                    order_policy="fifo", bar_routing="p2c", profiles=None, arrivals=None):
         #Set up and start the casino environment
+        # arrivals gives the seconds at which every customer of the night arrives (see arrivals.py), otherwise the
+        # initial customers arrive at opening and the others one every 5 to 15 seconds, max_customers in all
+
+        # Make sure the database has every table and column this version writes
+        create_tables()
 
-        # Connect to the database
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        customers = []
-
-        # Define customer creation factories and associated spawn weights
-        factories_with_weights = [
-            (GamblerFactory(self), 20),
-            (DrunkenGamblerFactory(self), 10),
-            (BudgetPlayerFactory(self), 15),
-            (ShopperFactory(self), 10),
-            (StrategistFactory(self), 5),
-            (OrderingAddictFactory(self), 5),
-            (AdventurerFactory(self), 5),
-            (MinimalistFactory(self), 5),
-            (VipFactory(self), 5),
-            (RichPlayerFactory(self), 5),
-            (SafePlayerFactory(self), 5),
-            (RiskyPlayerFactory(self), 3),
-            (RiskyCheatingFactory(self), 1),
-            (TiredCustomerFactory(self), 1),
-        ]
-
-        total_customers_initial = 80
+        # When every actor runs on this thread, one connection serves all writes
+        if self.backend.single_threaded:
+            open_shared_connection()
+
+        # Customers are built from the compiled profiles, their type drawn by the profiles' spawn weights
+        factory = CustomerFactory(self, ProfileRegistry(profiles))
         self.total_customers_generated = 0
-        factory_choices, weights = zip(*factories_with_weights)
-
-        # Generate initial batch of customers
-        for i in range(1, total_customers_initial + 1):
-            factory = random.choices(factory_choices, weights=weights, k=1)[0]
-            customer = factory.create_customer(i)
-            customers.append(customer)
-            cursor.execute("""
-                INSERT INTO customer (initial_balance, customer_type, has_car)
-                VALUES (?, ?, ?)
-            """, (customer.balance, customer.type, 1 if customer.car else 0))
-            self.total_customers_generated += 1
-
-        # Create and set up bars
-        bars = create_bars()[:3]
+        if arrivals is None:
+            arrivals = spawner_schedule(np.random.default_rng(), total_customers_initial, max_customers)
+
+        # Create and set up bars, saving each one with its menu
+        self.bar_router = BarRouter(bar_routing)
+        bars = create_bars(bar_batch_size, bar_batch_wait, order_policy)[:3]
         for bar in bars:
-            cursor.execute("""
-                INSERT INTO bar (name) VALUES (?)
-            """, (bar.name,))
-            bar_id = cursor.lastrowid
-            for item in bar.menu.products:
-                cursor.execute("""
-                    INSERT INTO menu_item (name, price, prep_time, source_type, source_id)
-                    VALUES (?, ?, ?, 'bar', ?)
-                """, (item.name, item.price, item.prep_time, bar_id))
-
-        # Create and set up restaurants
-        restaurants = create_restaurants(self)[:2]
-        for restaurant in restaurants:
-            cursor.execute("""
-                INSERT INTO restaurant (name, num_tables) VALUES (?, ?)
-            """, (restaurant.name, restaurant.num_tables))
-            restaurant_id = cursor.lastrowid
-            for item in restaurant.menu.products:
-                cursor.execute("""
-                    INSERT INTO menu_item (name, price, prep_time, source_type, source_id)
-                    VALUES (?, ?, ?, 'restaurant', ?)
-                """, (item.name, item.price, item.prep_time, restaurant_id))
-
-        # Create and set up games
-        n_games = 0
-        games = []
-        for _ in range(4):
-            games.append(RouletteFactory(self).create_game(n_games))
-            n_games += 1
-        for _ in range(25):
-            games.append(SlotMachineFactory(self).create_game(n_games))
-            n_games += 1
-        for _ in range(6):
-            games.append(BlackJackFactory(self).create_game(n_games))
-            n_games += 1
-        for _ in range(3):
-            games.append(CrapsFactory(self).create_game(n_games))
-            n_games += 1
-        for _ in range(5):
-            games.append(PokerFactory(self).create_game(n_games))
-            n_games += 1
-
-        # Insert created games into the database
-        for game in games:
-            cursor.execute("""
-                INSERT INTO game_instance (game_name)
-                VALUES (?)
-            """, (game.name,))
-
-        # Finalize and close database connection
-        conn.commit()
-        conn.close()
-
-        # Set up waiters for restaurants
-        waiters = []
+            save_bar(bar)
+
+        # Create and set up restaurants, saving each one with its menu
+        restaurants = create_restaurants(self, order_policy)[:2]
         for restaurant in restaurants:
-            for i in range(4):
-                waiters.append(Waiter(i, restaurant))
+            save_restaurant(restaurant)
 
         for restaurant in restaurants:
             self.add_restaurant(restaurant)
 
-        # Set up baristas for bars
-        baristas = []
-        for bar in bars:
-            for i in range(3):
-                baristas.append(Barista(i, bar))
-
         for bar in bars:
             self.add_bar(bar)
 
-        # Add all customers
-        for customer in customers:
-            self.add_customer(customer)
-
-        # Start baristas
-        for barista in baristas:
-            barista.start()
-
-        # Start waiters
-        for waiter in waiters:
-            waiter.start()
-
-        # Add and start all games
-        for game in games:
-            self.add_game(game)
-            game.start()
-
-        # Start all customers
-        for customer in customers:
-            customer.start()
-
-        # Start background thread for spawning new customers dynamically
-        threading.Thread(target=self.spawn_customers_dynamically, args=(factory_choices, weights)).start()
-
-    def spawn_customers_dynamically(self, factory_choices, weights, delay_range=(5, 15), max_customers=300):
-
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        while self.total_customers_generated < max_customers:
-            customer_id = self.total_customers_generated + 1
-            factory = random.choices(factory_choices, weights=weights, k=1)[0]
-            customer = factory.create_customer(customer_id)
-            print(f"New Customer-{customer_id} ({customer.type}) arrived at the casino.")
-            self.add_customer(customer)
-            customer.start()
-
-            cursor.execute("""
-                INSERT INTO customer (initial_balance, customer_type, has_car)
-                VALUES (?, ?, ?)
-            """, (customer.balance, customer.type, 1 if customer.car else 0))
-            conn.commit()
+        # Hire the minimum staff of every bar and restaurant, the staffing controller adds workers when orders wait
+        for bar in bars:
+            self.staffing.add_venue("bar", bar)
+        for restaurant in restaurants:
+            self.staffing.add_venue("restaurant", restaurant)
+        self.start_actor(self.staffing)
 
-            self.total_customers_generated += 1
-            time.sleep(random.randint(*delay_range))
+        # Start the hotel's checkout scheduler and the entrance's balking scheduler
+        self.start_actor(self.hotel)
+        self.start_actor(self.entrance)
 
-        conn.close()
+        # Start the cooks of every kitchen station
+        for restaurant in restaurants:
+            for cook in restaurant.kitchen.cooks():
+                self.start_actor(cook)
+
+        # Open the minimum number of tables of each game, the table manager opens more when demand rises
+        self.table_manager.open_initial_tables()
+        self.start_actor(self.table_manager)
+
+        # Let the customers in on schedule: in the background for threads, until every customer has left otherwise
+        self.backend.run(self.spawn_customers(factory, arrivals))
+        if self.backend.single_threaded:
+            close_shared_connection()
+        if self.backend.blocking:
+            print(f"Casino closed after {self.total_customers_generated} customers.")
+            self.report_games()
+            self.report_orders()
+            self.report_locations()
+            self.report_parking()
+            self.report_hotel()
+            self.report_entrance()
+
+    def report_games(self):
+        # Print the throughput and utilization counters of every game table
+        now = self.clock.now()
+        for dispatcher in self.games.values():
+            for row in dispatcher.report(now):
+                print(f"{row['game']}-{row['id']}: {row['rounds']} rounds, {row['players']} players "
+                      f"({row['stolen']} stolen), {row['throughput']:.1f} players/hour, {row['utilization']:.0%} busy")
+
+    def report_orders(self):
+        # Print the queue depth, order waiting and completion times of every bar and restaurant
+        venues = list(self.bars.values()) + self.restaurants
+        for venue in venues:
+            row = venue.orders.report()
+            print(f"{venue.name} ({row['policy']}): {row['orders']} orders, {row['depth']} still queued "
+                  f"(max {row['max_depth']}), wait mean {row['mean_wait']:.1f}s max {row['max_wait']:.1f}s, "
+                  f"completion mean {row['mean_completion']:.1f}s p95 {row['p95_completion']:.1f}s "
+                  f"p99 {row['p99_completion']:.1f}s")
+        now = self.clock.now()
+        for restaurant in self.restaurants:
+            for row in restaurant.kitchen.report(now):
+                print(f"{restaurant.name} {row['station']} station ({row['policy']}, {row['capacity']} cooks): "
+                      f"{row['completed']} items, wait mean {row['mean_wait']:.1f}s max {row['max_wait']:.1f}s, "
+                      f"{row['utilization']:.0%} busy")
+        for bar in self.bars.values():
+            row = bar.report(now)
+            print(f"{bar.name}: {row['items']} items, {row['throughput']:.3f} items/sec, "
+                  f"{self.bar_router.routed[bar.name]} orders routed here ({self.bar_router.strategy})")
+        for row in self.staffing.report():
+            print(f"{row['venue']} staff: {row['hires']} hired, {row['retirements']} retired, "
+                  f"peak {row['peak']} workers, {row['workers']} at closing")
+
+    def report_locations(self):
+        # Print how many customers are at every location of the casino
+        counts = self.locations.report()
+        print("Customers: " + ", ".join(f"{count} {location}" for location, count in counts.items()))
+
+    def report_parking(self):
+        # Print the occupancy and waiting counters of the parking lot
+        row = self.parking.report()
+        print(f"Parking: {row['parked']} cars parked, {row['occupied']}/{row['capacity']} slots taken "
+              f"(max {row['max_occupied']}), {row['queued']} cars waited in line (max {row['max_queue']}), "
+              f"{row['waited']} got a slot after {row['mean_wait']:.1f}s on average, {row['timed_out']} gave up")
+
+    def report_hotel(self):
+        # Print the occupancy and lobby counters of the hotel
+        row = self.hotel.report()
+        print(f"Hotel: {row['bookings']} stays, {row['occupied']}/{row['rooms']} rooms taken (max {row['max_occupied']}), "
+              f"{row['queued']} customers waited in the lobby (max {row['max_lobby']}), "
+              f"{row['waited']} got a room after {row['mean_wait']:.1f}s on average, {row['gave_up']} were refunded")
+
+    def report_entrance(self):
+        # Print the occupancy and line counters of the entrance
+        row = self.entrance.report()
+        limit = f"limit {row['max_occupancy']}" if row['max_occupancy'] is not None else "no limit"
+        print(f"Entrance: {row['admitted']} customers let in, {row['inside']} inside (max {row['max_inside']}, {limit}), "
+              f"{row['queued']} waited in line (max {row['max_line']}), {row['waited']} got in after "
+              f"{row['mean_wait']:.1f}s on average, {row['balked']} balked, {row['rejected']} were turned away")
+
+    def spawn_customers(self, factory, arrivals, batch_size=ARRIVAL_BATCH):
+        # Process that lets the customers in at the seconds of a precomputed schedule, yielding the time until the
+        # next arrival. The load is open loop: arrivals follow the schedule whatever the state of the casino.
+        # Customers are built and saved a batch at a time, with one statement, ahead of their arrival.
+        first_id = next_record_id("customer")
+        for start in range(0, len(arrivals), batch_size):
+            customers = factory.create_customers(first_id + start, len(arrivals[start:start + batch_size]))
+            save_customers([(customer.id, customer.balance, customer.type, 1 if customer.car else 0, None, None, None)
+                            for customer in customers])
+            for customer, arrival in zip(customers, arrivals[start:start + batch_size].tolist()):
+                delay = arrival - self.clock.now()  # From the schedule, so that delays do not add up
+                if delay > 0:
+                    yield delay
+                self.entrance.arrive(customer)  # In, in line at the entrance, or turned away
+                self.total_customers_generated += 1
+            customers.clear()  # From now on only their process and the location registry refer to them
+
+        with self.active_lock:
+            self.arrivals_done = True
+            finished = self.active_customers == 0
+        if finished:
+            self.close_casino()
 
 
 if __name__ == "__main__":
-    casino = Casino()
-    casino.open_casino()
+    parser = argparse.ArgumentParser(description="Run the casino simulation")
+    parser.add_argument("--backend", choices=BACKENDS, default="threads", help="execution backend")
+    parser.add_argument("--initial-customers", type=int, default=80, help="customers present at opening")
+    parser.add_argument("--max-customers", type=int,
+                        help="total customers for the night (300 by default, no limit with an arrival curve)")
+    parser.add_argument("--arrival-curve", metavar="CURVE",
+                        help=f"arrival rate over the night: {', '.join(RATE_CURVES)} or a JSON file of [hour, customers per hour] "
+                             "points (default: one arrival every 5 to 15 seconds)")
+    parser.add_argument("--arrival-scale", type=float, default=1.0, help="multiplier of the arrival curve's rates")
+    parser.add_argument("--arrival-seed", type=int, help="seed of the arrival schedule, for a reproducible load")
+    parser.add_argument("--parking-slots", type=int, default=30, help="slots in the parking lot")
+    parser.add_argument("--hotel-rooms", type=int, default=10, help="rooms in the hotel")
+    parser.add_argument("--max-occupancy", type=int,
+                        help="most customers inside the casino at the same time (default: no limit)")
+    parser.add_argument("--entrance-queue", type=int, default=100,
+                        help="most customers waiting at the entrance once the casino is full, the others are turned away")
+    parser.add_argument("--entrance-wait", type=float, default=60,
+                        help="seconds a customer waits at the entrance before giving up")
+    parser.add_argument("--profiles", nargs="+", metavar="JSON",
+                        help="customer profile files to use instead of the built-in profiles (merged in order)")
+    parser.add_argument("--workers", type=int, default=8, help="worker threads for the pool backend")
+    parser.add_argument("--speedup", type=float, default=1.0,
+                        help="simulated seconds per real second for the real-time backends (threads, asyncio, pool)")
+    parser.add_argument("--bar-batch-size", type=int, default=1,
+                        help="identical items a barista prepares together across orders (1 serves orders one at a time)")
+    parser.add_argument("--bar-batch-wait", type=float, default=0,
+                        help="seconds a barista may wait for more identical items to fill a batch")
+    parser.add_argument("--order-policy", choices=POLICIES, default="fifo",
+                        help="order in which baristas and kitchen stations take orders")
+    parser.add_argument("--bar-routing", choices=ROUTING, default="p2c",
+                        help="how customers choose among the bars serving what they want")
+    args = parser.parse_args()
+
+    backend_options = {}
+    if args.backend != "des":
+        backend_options["speedup"] = args.speedup
+    if args.backend == "pool":
+        backend_options["workers"] = args.workers
+    casino = Casino(backend=args.backend, parking_slots=args.parking_slots, hotel_rooms=args.hotel_rooms,
+                    max_occupancy=args.max_occupancy, entrance_queue=args.entrance_queue,
+                    entrance_wait=args.entrance_wait, **backend_options)
+    profiles = None
+    if args.profiles:
+        profiles = {}
+        for path in args.profiles:
+            profiles.update(load_profiles(path))
+    arrivals = night_schedule(np.random.default_rng(args.arrival_seed), args.arrival_curve, args.arrival_scale,
+                              args.initial_customers, args.max_customers)
+    casino.open_casino(bar_batch_size=args.bar_batch_size, bar_batch_wait=args.bar_batch_wait,
+                       order_policy=args.order_policy, bar_routing=args.bar_routing, profiles=profiles,
+                       arrivals=arrivals)
 
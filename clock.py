@@ -0,0 +1,124 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Format used for every timestamp written to the database (same as SQLite's CURRENT_TIMESTAMP)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+# Clock class represents real (wall-clock) time, used by the threaded simulator
+# Every duration given to the clock is in simulated seconds: with a speedup of 50, sleep(50) blocks for one
+# real second, and timestamps advance 50 seconds per real second
+class Clock:
+    def __init__(self, speedup=1.0):
+        if speedup <= 0:
+            raise ValueError("The clock speedup must be positive")
+        self.speedup = speedup  # Simulated seconds that pass per real second
+        # Remember when the clock was created so that now() starts at zero
+        self.start = self._real_time()
+        self.start_time = datetime.utcnow()  # Date that simulated time zero maps to
+
+    def _real_time(self):
+        # Source of real time, in seconds
+        return time.monotonic()
+
+    def to_real(self, seconds):
+        # Convert a simulated duration into the real duration to wait
+        return seconds / self.speedup
+
+    def now(self):
+        # Return the number of simulated seconds elapsed since the clock was created
+        return (self._real_time() - self.start) * self.speedup
+
+    def sleep(self, seconds):
+        # Block the calling thread for the given number of simulated seconds
+        time.sleep(self.to_real(seconds))
+
+    def call_later(self, seconds, callback, *args):
+        # Run a callback after the given number of simulated seconds on a timer thread
+        timer = threading.Timer(self.to_real(seconds), callback, args)
+        timer.start()
+        return timer
+
+    def timestamp(self):
+        # Return the current simulated time formatted for the database (UTC, like CURRENT_TIMESTAMP)
+        return (self.start_time + timedelta(seconds=self.now())).strftime(TIMESTAMP_FORMAT)
+
+
+# VirtualClock class represents simulated time, driven by a discrete-event Simulation
+class VirtualClock:
+    def __init__(self, simulation, start_time=None):
+        # The simulation owns the time; start_time is the real date that virtual time zero maps to
+        self.simulation = simulation
+        self.start_time = start_time if start_time is not None else datetime.utcnow()
+
+    def now(self):
+        # Return the current virtual time in seconds
+        return self.simulation.now
+
+    def sleep(self, seconds):
+        # Blocking sleeps are not possible in a single-threaded simulation: actors must yield instead
+        raise RuntimeError("Cannot sleep on a virtual clock, yield the delay from the process instead")
+
+    def call_later(self, seconds, callback, *args):
+        # Schedule a callback as a simulation event
+        return self.simulation.schedule(seconds, callback, *args)
+
+    def timestamp(self):
+        # Return the current virtual time formatted for the database
+        return (self.start_time + timedelta(seconds=self.simulation.now)).strftime(TIMESTAMP_FORMAT)
+
+
+# PooledClock class represents real time for actors stepped by a worker pool
+class PooledClock(Clock):
+    def __init__(self, scheduler, speedup=1.0):
+        # The scheduler (the pool's timer heap) runs delayed callbacks, so no timer threads are created
+        super().__init__(speedup)
+        self.scheduler = scheduler
+
+    def sleep(self, seconds):
+        # A worker blocked in a sleep could not step other actors: processes must yield instead
+        raise RuntimeError("Cannot sleep on a pool worker, yield the delay from the process instead")
+
+    def call_later(self, seconds, callback, *args):
+        # Schedule a callback on the pool's timer heap
+        return self.scheduler.schedule(seconds, callback, *args)
+
+
+# AsyncioClock class represents real time as seen by an asyncio event loop
+class AsyncioClock(Clock):
+    def __init__(self, loop, speedup=1.0):
+        self.loop = loop
+        super().__init__(speedup)
+
+    def _real_time(self):
+        # The event loop's own monotonic time
+        return self.loop.time()
+
+    def sleep(self, seconds):
+        # Blocking the event loop would stall every actor: coroutines must await instead
+        raise RuntimeError("Cannot sleep on the event loop, yield the delay from the process instead")
+
+    def call_later(self, seconds, callback, *args):
+        # Schedule a callback on the event loop
+        return self.loop.call_later(self.to_real(seconds), callback, *args)
+
+
+# Clock used by module-level helpers (e.g. db.py) that have no reference to the casino
+_current_clock = Clock()
+
+
+def set_clock(clock):
+    # Replace the clock used for database timestamps
+    global _current_clock
+    _current_clock = clock
+
+
+def get_clock():
+    # Return the clock used for database timestamps
+    return _current_clock
+
+
+def timestamp():
+    # Return the current timestamp of the active clock
+    return _current_clock.timestamp()
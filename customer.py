@@ -1,36 +1,85 @@
 import threading
 import random
 from bar import Order
-from abc import abstractmethod
 from parking_lot import Car
-from db import save_order, save_game_play, save_permanence_record, close_permanence_record, save_failed_parking
-import time
+from db import save_order, save_permanence_record, close_permanence_record, save_failed_parking, save_customer_departure
+from simulation import Signal, run_process, run_process_async
+from customer_registry import ON_FLOOR, IN_GAME_QUEUE
+from sampling import AliasSampler
 
-# Base Customer class inheriting from threading.Thread to simulate concurrent customer behavior
-class Customer(threading.Thread):
-    def __init__(self, id, casino, balance, p_leaving, p_strategizing, p_ordering, p_playing, type, p_sleeping, min_bet, max_bet, has_car_probability, p_restaurant, game_preferences):
-        super().__init__() # Initialize the thread with the parent class
+# States of the customer's state machine
+ARRIVING = "arriving"  # Parking the car (or just walking in)
+PARKING = "parking"  # Waiting in line for a parking slot
+FLOOR = "floor"  # On the casino floor deciding what to do next (or away playing / sleeping)
+RESTAURANT = "restaurant"  # Seated at a restaurant, ordering
+DEPARTED = "departed"  # Left the casino
+
+PARKING_TIMEOUT = 20  # Longest time (seconds) a driver waits in line for a parking slot before leaving
+RETURN_TIMEOUT = 60  # Longest sleep (seconds) away from the floor before checking again, in case a wake-up is lost
+
+# Actions a customer on the floor may take, in the order the original step tried them one draw at a time
+FLOOR_ACTIONS = ("leave", "strategize", "play", "order", "sleep", "restaurant")
+
+
+def floor_action_weights(probabilities):
+    # Turn the chance of each action, tried in turn, into the odds of each outcome of a single draw:
+    # an action happens if its own draw succeeds and every earlier one failed, "wait" if they all failed
+    weights, remaining = [], 1.0
+    for p in probabilities:
+        weights.append(remaining * p)
+        remaining *= 1 - p
+    return weights + [remaining]
+
+
+# Profile class holds the behaviour shared by every customer of a type (probabilities, bets, game preferences)
+# Profiles are compiled once per type and shared, so customers only store their own state. They cannot be
+# changed once built, since every customer of the type would see the change.
+class Profile:
+    __slots__ = ("type", "p_leaving", "p_strategizing", "p_ordering", "p_playing", "p_sleeping", "p_restaurant",
+                 "min_bet", "max_bet", "has_car_probability", "games", "actions", "actions_without_sleep")
+
+    def __init__(self, type, p_leaving, p_strategizing, p_ordering, p_playing, p_sleeping, p_restaurant, min_bet,
+                 max_bet, has_car_probability, game_preferences):
+        probabilities = [p_leaving, p_strategizing, p_playing, p_ordering, p_sleeping, p_restaurant]
+        without_sleep = [p_leaving, p_strategizing, p_playing, p_ordering, 0, p_restaurant]
+        fields = dict(type=type, p_leaving=p_leaving, p_strategizing=p_strategizing, p_ordering=p_ordering,
+                      p_playing=p_playing, p_sleeping=p_sleeping, p_restaurant=p_restaurant, min_bet=min_bet,
+                      max_bet=max_bet, has_car_probability=has_car_probability,
+                      # Alias tables: the game chosen, and the action taken by a customer who can still book a
+                      # room or who already has one (and so never sleeps)
+                      games=AliasSampler(game_preferences.keys(), game_preferences.values()),
+                      actions=AliasSampler(FLOOR_ACTIONS + ("wait",), floor_action_weights(probabilities)),
+                      actions_without_sleep=AliasSampler(FLOOR_ACTIONS + ("wait",), floor_action_weights(without_sleep)))
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Profile attributes are read-only, cannot set '{name}'")
+
+
+# Base Customer class simulating concurrent customer behavior (run by the casino's backend)
+class Customer:
+    __slots__ = ("id", "casino", "balance", "lock", "profile", "car", "booked_room", "permanence_id", "state",
+                 "restaurant", "restaurant_bill", "returned")  # No __dict__: a casino may see 100k customers
+
+    def __init__(self, id, casino, balance, profile):
         self.id = id # Customer's unique ID
         self.casino = casino # The casino where the customer is playing
         self.balance = balance  # The customer's balance
         self.lock = threading.Lock() # Lock to synchronize access to the customer's balance
-        self.p_leaving = p_leaving # Probability of the customer leaving the casino
-        self.p_strategizing = p_strategizing   # Probability of the customer strategizing when playing
-        self.p_ordering = p_ordering   # Probability of the customer ordering food or drinks
-        self.p_playing = p_playing # Probability of the customer playing a game
-        self.p_sleeping = p_sleeping  # Probability of the customer sleeping
-        self.min_bet = min_bet # Minimum bet the customer can make
-        self.max_bet = max_bet # Maximum bet the customer can make
-        self.car = Car(id) if random.random() < has_car_probability else None # Assign a car to the customer
+        self.profile = profile  # Behaviour shared with every customer of the same type
+        self.car = Car(id) if random.random() < profile.has_car_probability else None # Assign a car to the customer
         self.booked_room = None # The room the customer has booked, if any
         self.permanence_id = None  # ID for the customer's permanence record in the casino
-        self.type = type
-        self.p_restaurant = p_restaurant
-        self.game_preferences = game_preferences
+        self.state = ARRIVING  # Current state of the customer's state machine
+        self.restaurant = None  # Restaurant where the customer is seated, if any
+        self.restaurant_bill = 0  # Amount ordered at the current restaurant
+        self.returned = Signal()  # Wakes the customer when they are handed back to the casino floor
 
-    def amount_bet(self):
-        # Returns a random amount the customer is willing to bet based on their balance and bet limits
-        return random.randint(min(self.min_bet, self.get_balance()) , min(self.max_bet, self.get_balance()))
+    @property
+    def type(self):
+        # The customer type (e.g. "gambler"), from the profile
+        return self.profile.type
 
     def increment(self, amount):
         # Increase the customer's balance by the specified amount (if they win)
@@ -55,48 +104,41 @@ class Customer(threading.Thread):
 
     def choose_game(self):
         # Choose a game based on the customer's game preferences (probabilities)
-        games = list(self.game_preferences.keys())
-        probs = list(self.game_preferences.values())
-        selected_game = random.choices(games, weights=probs, k=1)[0]
-        return selected_game
-
-    def play(self, name, probability, prize, game_id):
-        # Simulate playing game
-        print(f"Customer-{self.id} playing {name}")
-        amount = self.amount_bet()
-        if not self.decrease(amount):
-            self.casino.add_customer(self)
-            return
-        if random.random() < probability:
-            # If the customer wins, increase their balance by the prize
-            self.increment(amount * prize)
-            save_game_play(self.id, game_id, amount, "won")
-        else:
-            # If the customer loses, save the loss
-            print(f"Customer-{self.id} lost ${amount}. (Balance: ${self.balance})")
-            save_game_play(self.id, game_id, amount, "lost")
-        self.casino.add_customer(self)
-        time.sleep(random.randint(1, 5))
+        return self.profile.games.sample()
+
+    def settle(self, amount, payout):
+        # Settle a bet in one step: take the amount bet and add the payout (0 if the bet was lost)
+        with self.lock:
+            if amount > self.balance:
+                print(f"Customer-{self.id} does not have ${amount} to spend.")
+                return False
+            self.balance += payout - amount
+            return True
 
     def place_order(self):
         # Simulate the customer placing an order at the bar
-        bar_name = random.choice(list(self.casino.bars.keys()))
-        print(f"Customer-{self.id} will place order in bar {bar_name}")
+        # The customer picks what they want first, the router sends them to a bar serving it with the shortest wait
+        wanted = random.choice(self.casino.bar_router.item_names)
+        bar = self.casino.bar_router.choose(wanted)
+        bar_name = bar.name
+        print(f"Customer-{self.id} will place order in bar {bar_name} (expected wait {bar.expected_wait():.0f}s)")
         order = Order(self)
         num_items = random.randint(1, 7)
-        bar = self.casino.bars[bar_name]
-        items = random.choices(bar.menu.products, k=num_items)
+        items = [bar.products[wanted]] + random.choices(bar.menu.products, k=num_items - 1)
         for item in items:
             order.add_item(item)
-        with self.lock:
-            if order.get_total() > self.balance:
-                print(f"Customer-{self.id} could not place order of ${order.get_total()}. (Balance: ${self.balance})")
-                return
-        with bar.lock:
-            self.decrease(order.get_total())
-            bar.orders.append(order)
+        total = order.get_total()
+        # Pay before the order is queued, so that a bet settled meanwhile cannot leave the bar serving an unpaid order
+        if not self.decrease(total):
+            print(f"Customer-{self.id} could not place order of ${total}. (Balance: ${self.get_balance()})")
+            return
+        if not bar.add_order(order):
+            with self.lock:
+                self.balance += total  # Refund the order the closed bar will never serve
+            print(f"Customer-{self.id} could not order, {bar_name} is closed. (Refunded ${total})")
+            return
         print(
-            f"Customer-{self.id} ordered {[item.name for item in order.items]} (Total: ${order.get_total()}, Balance: ${self.balance})")
+            f"Customer-{self.id} ordered {[item.name for item in order.items]} (Total: ${total}, Balance: ${self.get_balance()})")
         save_order(self.id, 'bar', list(self.casino.bars.keys()).index(bar_name) + 1, order)
 
     def place_restaurant_order(self, restaurant, total):
@@ -110,121 +152,181 @@ class Customer(threading.Thread):
             if order.get_total() + total > self.balance:
                 print(f"Customer-{self.id} could not place order of ${order.get_total()}. (Balance: ${self.balance})")
                 return 0
-        with restaurant.lock:
-            restaurant.orders.append(order)
+        if not restaurant.add_order(order):
+            print(f"Customer-{self.id} could not order, {restaurant.name} is closed.")
+            return 0
         print(
             f"Customer-{self.id} ordered {[item.name for item in order.items]} (Total: ${order.get_total()}, Balance: ${self.balance - total - order.get_total()})")
         save_order(self.id, 'restaurant', list(self.casino.restaurants).index(restaurant) + 1, order)
         return order.get_total()
 
     def enter_restaurant(self):
-        # Simulate the customer entering a restaurant and ordering food
+        # Simulate the customer entering a restaurant (returns whether they got a table)
         restaurant = random.choice(list(self.casino.restaurants))
         print(f"Customer-{self.id} is trying to seat at {restaurant.name}")
-        seated = restaurant.seat_customer(self)
-        if seated:
-            total_payed = 0
-            while True:
-                if random.random() < self.p_ordering:
-                    amount = self.place_restaurant_order(restaurant, total_payed)
-                    total_payed += amount
-                else:
-                    break
-                time.sleep(random.randint(1, 10))
-            self.decrease(total_payed)
-            restaurant.de_seat_customer(self)
+        if not restaurant.seat_customer(self):
+            return False
+        self.restaurant = restaurant  # Restaurant where the customer is seated
+        self.restaurant_bill = 0  # Amount ordered so far, paid when leaving the restaurant
+        return True
+
+    def leave_restaurant(self):
+        # Pay for everything ordered and free the table
+        self.decrease(self.restaurant_bill)
+        self.restaurant.de_seat_customer(self)
+        self.restaurant = None
+        self.restaurant_bill = 0
 
     def run(self):
-        # The main simulation logic for the customer
-        # Perform the customer's action (e.g., play, order)
-        if self.car:
-            # If the customer has a car, attempt to park it in the casino's parking lot
-            parked = self.car.park(self.casino.parking)
-            if not parked:
-                # If the car could not be parked, the customer decides to leave the casino
-                print(f"Customer-{self.id} could not park the car and decided to leave")
-                save_failed_parking(self.id) # Save the failed parking attempt
-                return
-        else:
+        # Run the customer on its own thread
+        run_process(self.process(), self.casino.clock)
+
+    async def run_async(self):
+        # Coroutine equivalent of run() for the asyncio backend
+        await run_process_async(self.process(), self.casino.clock)
+
+    def process(self):
+        # The main simulation logic for the customer, as a generator that yields how many seconds to wait
+        # so that it can run on a thread, as a task or in a simulation
+        delay = self.step()
+        while delay is not None:
+            yield delay
+            delay = self.step()
+
+    def step(self):
+        # Advance the customer's state machine by one step
+        # Returns how many seconds to wait before the next step, or None once the customer has left
+        return getattr(self, f"_step_{self.state}")()
+
+    def _step_arriving(self):
+        # Perform the customer's arrival (parking the car if they have one)
+        if not self.car:
             # If the customer does not have a car, save the customer's permanence record
             self.permanence_id = save_permanence_record(self.id)
+            self.state = FLOOR
+            return 0
 
-        while True:
-            # Lock the list of customers to check if the customer is still in the casino
-            with self.casino.customers_lock:
-                if self not in self.casino.customers:
-                    # If the customer is no longer in the casino, wait before checking again
-                    time.sleep(random.randint(1, 5))
-                    continue  # Check again after the sleep
-
-            # If the customer has no balance, they leave the casino
-            if self.balance <= 0:
-                print(f"Customer-{self.id} is out of money and leaves the casino.")
-                break  # Exit the loop (customer leaves)
-
-            # Random chance for the customer to leave the casino
-            if random.random() < self.p_leaving:  # 20% chance to leave
-                print(f"Customer-{self.id} has decided to leave the casino.")
-                break  # Exit the loop (customer leaves)
-
-            # Random chance for the customer to leave the casino strategically (after thinking)
-            if random.random() < self.p_strategizing:  # 10% chance to leave strategically
-                print(f"Customer-{self.id} is leaving the casino after strategizing.")
-                break  # Exit the loop (customer leaves)
-
-            # Random chance for the customer to play a game
-            if random.random() < self.p_playing:
-                game = self.choose_game()  # Select a game based on preferences
-                print(f"Customer-{self.id} selected the game '{game}'")
-                self.casino.games[game]['lock'].acquire()  # Lock the game to avoid conflicts
-                self.casino.customers_lock.acquire()  # Lock the customers list to remove the customer
-                self.casino.games[game]['wait_list'].append(self)  # Add customer to game wait list
-                self.casino.customers.remove(self)  # Remove the customer from the casino
-                print(f"Customer-{self.id} is ready to play the game '{game}'")
-                self.casino.customers_lock.release()  # Release the customers list lock
-                self.casino.games[game]['lock'].release()  # Release the game lock
-                continue  # Proceed to the next iteration (customer is now playing)
-
-            # Random chance for the customer to place an order (food/drinks)
-            if random.random() < self.p_ordering:
-                self.place_order()  # Place an order for food or drinks
-                continue  # Proceed to the next iteration
-
-            # Random chance for the customer to sleep (if they don't have a booked room yet)
-            if random.random() < self.p_sleeping and self.booked_room is None:
-                sleep_duration = random.randint(1, 50)  # Random sleep duration between 1 and 50 seconds
-                price = sleep_duration * self.casino.hotel.price_per_second  # Calculate cost of sleep
-
-                # Check if the customer has enough balance to pay for the sleep
-                with self.lock:
-                    if price > self.balance:
-                        print(
-                            f"Customer-{self.id} does not have enough money to book the hotel for {sleep_duration} seconds.")
-                        continue  # Skip to the next iteration if not enough money
-
-                # Deduct the cost of the sleep and book the room for the customer
-                print(f"Customer-{self.id} will book hotel for {sleep_duration} seconds")
-                self.decrease(price)  # Deduct the cost of the sleep
-                self.booked_room = self.casino.hotel.book_room(self, sleep_duration)  # Book the room
-                continue  # Proceed to the next iteration
-
-            # Random chance for the customer to enter a restaurant and place orders
-            if random.random() < self.p_restaurant:
-                self.enter_restaurant()  # Enter a restaurant and place orders
-                continue  # Proceed to the next iteration
-
-            # Sleep for a random time between 1 and 5 seconds before checking again
-            time.sleep(random.randint(1, 5))
-
-            # After the customer leaves the casino, if they have a car, they un-park it
-        if self.car and self.car.slot is not None:
-            self.car.de_park()  # De-park the car if it's parked
+        # If the customer has a car, attempt to park it in the casino's parking lot
+        self.car.enter()
+        if self.car.try_park(self.casino.parking):
+            self.state = FLOOR
+            return 0
 
-            # If the customer doesn't have a car and has a permanence ID, close the permanence record
-        if not self.car and self.permanence_id is not None:
-            close_permanence_record(self.permanence_id)  # Close the customer's permanence record
+        # If the lot is full, wait in line until a slot is handed over or the timeout expires
+        print(f"No slots available, customer {self.id} waits in line for up to {PARKING_TIMEOUT} seconds...")
+        self.state = PARKING
+        return self.car.wait_for_slot(self.casino.parking, PARKING_TIMEOUT)
+
+    def _step_parking(self):
+        # The driver woke up: either a slot was handed over or the wait timed out
+        if self.car.stop_waiting():
+            self.state = FLOOR
+            return 0
+
+        # If the car could not be parked, the customer decides to leave the casino
+        print(f"Customer {self.id} gave up after waiting {PARKING_TIMEOUT} seconds.")
+        print(f"Customer-{self.id} could not park the car and decided to leave")
+        save_failed_parking(self.id) # Save the failed parking attempt
+        return self._depart("no_parking")
+
+    def _step_floor(self):
+        # Perform the customer's action (e.g., play, order) while on the casino floor
+        # Check whether the customer is on the casino floor (not at a game table or in the hotel)
+        if self.casino.locations.location_of(self.id) != ON_FLOOR:
+            # If the customer is away (playing or sleeping), sleep until the game or the hotel hands them back
+            return self.returned.wait(RETURN_TIMEOUT)
+
+        # If the customer has no balance, they leave the casino
+        if self.balance <= 0:
+            print(f"Customer-{self.id} is out of money and leaves the casino.")
+            return self._leave("out_of_money")
+
+        # A single draw picks what the customer does, with the same odds as trying each action in turn
+        actions = self.profile.actions if self.booked_room is None else self.profile.actions_without_sleep
+        return getattr(self, f"_floor_{actions.sample()}")()
+
+    def _floor_leave(self):
+        # The customer leaves the casino
+        print(f"Customer-{self.id} has decided to leave the casino.")
+        return self._leave("left")
+
+    def _floor_strategize(self):
+        # The customer leaves the casino strategically (after thinking)
+        print(f"Customer-{self.id} is leaving the casino after strategizing.")
+        return self._leave("strategized")
 
+    def _floor_play(self):
+        # The customer plays a game
+        game = self.choose_game()  # Select a game based on preferences
+        print(f"Customer-{self.id} selected the game '{game}'")
+        self.casino.locations.move(self, IN_GAME_QUEUE)  # The customer leaves the casino floor
+        self.casino.dispatcher(game).join(self)  # Add customer to game wait list (wakes a table)
+        print(f"Customer-{self.id} is ready to play the game '{game}'")
+        return 0  # Proceed to the next step (customer is now playing)
 
+    def _floor_order(self):
+        # The customer places an order (food/drinks)
+        self.place_order()  # Place an order for food or drinks
+        return 0  # Proceed to the next step
 
+    def _floor_sleep(self):
+        # The customer sleeps (only drawn if they don't have a booked room yet)
+        sleep_duration = random.randint(1, 50)  # Random sleep duration between 1 and 50 seconds
+        price = sleep_duration * self.casino.hotel.price_per_second  # Calculate cost of sleep
 
+        # Check if the customer has enough balance to pay for the sleep
+        with self.lock:
+            if price > self.balance:
+                print(
+                    f"Customer-{self.id} does not have enough money to book the hotel for {sleep_duration} seconds.")
+                return 0  # Skip to the next step if not enough money
+
+        # Deduct the cost of the sleep and book the room for the customer
+        print(f"Customer-{self.id} will book hotel for {sleep_duration} seconds")
+        self.decrease(price)  # Deduct the cost of the sleep
+        self.casino.hotel.book_room(self, sleep_duration)  # Book a room, or wait in the lobby for one
+        return 0  # Proceed to the next step
+
+    def _floor_restaurant(self):
+        # The customer enters a restaurant and places orders
+        if self.enter_restaurant():
+            self.state = RESTAURANT
+        return 0  # Proceed to the next step
+
+    def _floor_wait(self):
+        # Wait for a random time between 1 and 5 seconds before deciding again
+        return random.randint(1, 5)
+
+    def _step_restaurant(self):
+        # Keep ordering while seated in the restaurant, then pay and go back to the floor
+        if random.random() < self.profile.p_ordering:
+            self.restaurant_bill += self.place_restaurant_order(self.restaurant, self.restaurant_bill)
+            return random.randint(1, 10)  # Time until the customer considers ordering again
+        self.leave_restaurant()
+        self.state = FLOOR
+        return 0
+
+    def _step_departed(self):
+        # A departed customer has nothing left to do
+        return None
+
+    def _leave(self, reason):
+        # After the customer leaves the casino, if they have a car, they un-park it
+        if self.car and self.car.slot is not None:
+            self.car.de_park()  # De-park the car if it's parked
+
+        # If the customer doesn't have a car and has a permanence ID, close the permanence record
+        if not self.car and self.permanence_id is not None:
+            close_permanence_record(self.permanence_id)  # Close the customer's permanence record
+        return self._depart(reason)
 
+    def _depart(self, reason):
+        # Mark the customer as gone, save their final state and let the casino know
+        self.state = DEPARTED
+        save_customer_departure(self, reason)
+        # Drop what the customer held so that nothing of theirs outlives them
+        self.car = None
+        self.booked_room = None
+        self.restaurant = None
+        self.casino.customer_departed(self)  # Removes the customer from the location registry
+        return None
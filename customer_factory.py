@@ -1,12 +1,13 @@
+import json
 import random
-from parking_lot import Car
-from customer import Customer
-from abc import ABC, abstractmethod
+from customer import Customer, Profile
+from sampling import AliasSampler
 
 
 # Define customer profiles with specific behavior and attributes
 customer_profiles = {
     "gambler": {
+        "spawn_weight": 20,
         "p_leaving": 0.05,
         "p_strategizing": 0.05,
         "p_ordering": 0.1,
@@ -25,6 +26,7 @@ customer_profiles = {
         }
     },
     "strategist": {
+        "spawn_weight": 5,
         "p_leaving": 0.1,
         "p_strategizing": 0.4,
         "p_ordering": 0.1,
@@ -44,6 +46,7 @@ customer_profiles = {
     },
     # Additional customer profiles follow...
     "shopper": {
+        "spawn_weight": 10,
         "p_leaving": 0.2,
         "p_strategizing": 0.05,
         "p_ordering": 0.7,
@@ -62,6 +65,7 @@ customer_profiles = {
         }
     },
     "vip": {
+        "spawn_weight": 5,
         "p_leaving": 0.03,
         "p_strategizing": 0.1,
         "p_ordering": 0.2,
@@ -80,6 +84,7 @@ customer_profiles = {
         }
     },
     "budget_player": {
+        "spawn_weight": 15,
         "p_leaving": 0.25,
         "p_strategizing": 0.1,
         "p_ordering": 0.2,
@@ -98,6 +103,7 @@ customer_profiles = {
         }
     },
     "drunken_gambler": {
+        "spawn_weight": 10,
         "p_leaving": 0.05,
         "p_strategizing": 0.01,
         "p_ordering": 0.5,
@@ -116,6 +122,7 @@ customer_profiles = {
         }
     },
     "ordering_addict": {
+        "spawn_weight": 5,
         "p_leaving": 0.1,
         "p_strategizing": 0.05,
         "p_ordering": 0.8,
@@ -134,6 +141,7 @@ customer_profiles = {
         }
     },
     "adventurer": {
+        "spawn_weight": 5,
         "p_leaving": 0.05,
         "p_strategizing": 0.15,
         "p_ordering": 0.2,
@@ -152,6 +160,7 @@ customer_profiles = {
         }
     },
     "minimalist": {
+        "spawn_weight": 5,
         "p_leaving": 0.3,
         "p_strategizing": 0.3,
         "p_ordering": 0.1,
@@ -170,6 +179,7 @@ customer_profiles = {
         }
     },
     "risky_player": {
+        "spawn_weight": 3,
         "p_leaving": 0.05,
         "p_strategizing": 0.0,
         "p_ordering": 0.1,
@@ -188,6 +198,7 @@ customer_profiles = {
         }
     },
     "cheating_player": {
+        "spawn_weight": 1,
         "p_leaving": 0.05,
         "p_strategizing": 0.5,
         "p_ordering": 0.1,
@@ -206,6 +217,7 @@ customer_profiles = {
         }
     },
     "rich_player": {
+        "spawn_weight": 5,
         "p_leaving": 0.02,
         "p_strategizing": 0.05,
         "p_ordering": 0.2,
@@ -224,6 +236,7 @@ customer_profiles = {
         }
     },
     "safe_player": {
+        "spawn_weight": 5,
         "p_leaving": 0.2,
         "p_strategizing": 0.2,
         "p_ordering": 0.1,
@@ -242,6 +255,7 @@ customer_profiles = {
         }
     },
     "tired_customer": {
+        "spawn_weight": 1,
         "p_leaving": 0.6,
         "p_strategizing": 0.1,
         "p_ordering": 0.2,
@@ -261,118 +275,45 @@ customer_profiles = {
     }
 }
 
-# Abstract CustomerFactory class to define the interface for customer creation
-class CustomerFactory(ABC):
-    def __init__(self, casino):
-        self.casino = casino  # Reference to the casino where the customer will be created
-
-    @abstractmethod
-    def create_customer(self, id):
-        # Abstract method that subclasses must implement to create customers of various types
-        pass
-
-    def _build_customer(self, id, name):
-        # Method to build and return a customer based on the given profile
-        profile = customer_profiles[name]  # Fetch the profile based on the customer type (e.g., "gambler")
-        customer = Customer(
-            id=id,
-            casino=self.casino,
-            balance=random.randint(100, 1000),  # Randomly set the initial balance of the customer
-            p_leaving=profile["p_leaving"],  # Set probabilities and preferences based on the profile
-            p_strategizing=profile["p_strategizing"],
-            p_ordering=profile["p_ordering"],
-            p_playing=profile["p_playing"],
-            p_sleeping=profile["p_sleeping"],
-            min_bet=profile["min_bet"],
-            max_bet=profile["max_bet"],
-            type=name,  # Set the customer type (e.g., "gambler")
-            p_restaurant=profile["p_restaurant"],
-            game_preferences=profile["game_preferences"],  # Set the customer's game preferences
-            has_car_probability=profile["has_car_probability"]  # Set the probability of the customer having a car
-        )
-        return customer
-
-# Concrete Factory classes for creating specific customer types
-class GamblerFactory(CustomerFactory):
-    def create_customer(self, id):
-        profile = "gambler"  # Set the profile to "gambler"
-        print(f"Customer-{id} is type {profile}")
-        return self._build_customer(id, profile)  # Call _build_customer to create the customer
-
-class StrategistFactory(CustomerFactory):
-    def create_customer(self, id):
-        profile = "strategist"  # Set the profile to "strategist"
-        print(f"Customer-{id} is type {profile}")
-        return self._build_customer(id, profile)
-
-class ShopperFactory(CustomerFactory):
-    def create_customer(self, id):
-        profile = "shopper"  # Set the profile to "shopper"
-        print(f"Customer-{id} is type {profile}")
-        return self._build_customer(id, profile)
+# Function to load customer profiles from a JSON file, in the same format as customer_profiles
+def load_profiles(path):
+    with open(path) as file:
+        return json.load(file)
 
-class VipFactory(CustomerFactory):
-    def create_customer(self, id):
-        profile = "vip"  # Set the profile to "vip"
-        print(f"Customer-{id} is type {profile}")
-        return self._build_customer(id, profile)
 
-class BudgetPlayerFactory(CustomerFactory):
-    def create_customer(self, id):
-        profile = "budget_player"  # Set the profile to "budget_player"
-        print(f"Customer-{id} is type {profile}")
-        return self._build_customer(id, profile)
+# ProfileRegistry class compiles customer profiles once and picks the type of each new customer
+# Profiles come from customer_profiles or from JSON files; "spawn_weight" is how often a type arrives
+# relative to the others (1 if missing). Every other field is a Profile field.
+class ProfileRegistry:
+    def __init__(self, profiles=None):
+        profiles = customer_profiles if profiles is None else profiles
+        self.profiles = {}  # Type -> compiled Profile
+        weights = []
+        for name, fields in profiles.items():
+            fields = dict(fields)
+            weights.append(fields.pop("spawn_weight", 1))
+            self.profiles[name] = Profile(type=name, **fields)
+        self.types = AliasSampler(self.profiles.keys(), weights)  # Alias table of the arrival weights
 
-class DrunkenGamblerFactory(CustomerFactory):
-    def create_customer(self, id):
-        profile = "drunken_gambler"  # Set the profile to "drunken_gambler"
-        print(f"Customer-{id} is type {profile}")
-        return self._build_customer(id, profile)
+    def choose_type(self):
+        # Draw the type of an arriving customer
+        return self.types.sample()
 
-class OrderingAddictFactory(CustomerFactory):
-    def create_customer(self, id):
-        profile = "ordering_addict"  # Set the profile to "ordering_addict"
-        print(f"Customer-{id} is type {profile}")
-        return self._build_customer(id, profile)
 
-class AdventurerFactory(CustomerFactory):
-    def create_customer(self, id):
-        profile = "adventurer"  # Set the profile to "adventurer"
-        print(f"Customer-{id} is type {profile}")
-        return self._build_customer(id, profile)
-
-class MinimalistFactory(CustomerFactory):
-    def create_customer(self, id):
-        profile = "minimalist"  # Set the profile to "minimalist"
-        print(f"Customer-{id} is type {profile}")
-        return self._build_customer(id, profile)
-
-class RiskyPlayerFactory(CustomerFactory):
-    def create_customer(self, id):
-        profile = "risky_player"  # Set the profile to "risky_player"
-        print(f"Customer-{id} is type {profile}")
-        return self._build_customer(id, profile)
-
-class RiskyCheatingFactory(CustomerFactory):
-    def create_customer(self, id):
-        profile = "cheating_player"  # Set the profile to "cheating_player"
-        print(f"Customer-{id} is type {profile}")
-        return self._build_customer(id, profile)
-
-class RichPlayerFactory(CustomerFactory):
-    def create_customer(self, id):
-        profile = "rich_player"  # Set the profile to "rich_player"
-        print(f"Customer-{id} is type {profile}")
-        return self._build_customer(id, profile)
+# CustomerFactory class creates the customers of the casino, of the types of a profile registry
+class CustomerFactory:
+    def __init__(self, casino, registry=None):
+        self.casino = casino  # Reference to the casino where the customer will be created
+        self.registry = registry if registry is not None else ProfileRegistry()  # Profiles customers are built from
 
-class SafePlayerFactory(CustomerFactory):
-    def create_customer(self, id):
-        profile = "safe_player"  # Set the profile to "safe_player"
-        print(f"Customer-{id} is type {profile}")
-        return self._build_customer(id, profile)
+    def create_customer(self, id, type=None):
+        # Build a customer of the given type, or of a type drawn by arrival weight
+        name = type if type is not None else self.registry.choose_type()
+        print(f"Customer-{id} is type {name}")
+        profile = self.registry.profiles[name]  # Fetch the profile based on the customer type (e.g., "gambler")
+        balance = random.randint(100, 1000)  # Randomly set the initial balance of the customer
+        return Customer(id=id, casino=self.casino, balance=balance, profile=profile)
 
-class TiredCustomerFactory(CustomerFactory):
-    def create_customer(self, id):
-        profile = "tired_customer"  # Set the profile to "tired_customer"
-        print(f"Customer-{id} is type {profile}")
-        return self._build_customer(id, profile)
+    def create_customers(self, first_id, count):
+        # Build count customers at once, with consecutive ids from first_id and types drawn by arrival weight
+        return [self.create_customer(id) for id in range(first_id, first_id + count)]
@@ -0,0 +1,57 @@
+import threading
+
+# Places a customer can be in while at the casino
+ON_FLOOR = "floor"  # On the casino floor, free to decide what to do next
+IN_GAME_QUEUE = "game_queue"  # Waiting for a seat at a game table
+AT_GAME_TABLE = "game_table"  # Playing a round at a game table
+IN_RESTAURANT = "restaurant"  # Seated at a restaurant
+IN_HOTEL = "hotel"  # Sleeping in a hotel room
+IN_HOTEL_LOBBY = "hotel_lobby"  # Waiting in the hotel lobby for a room to free up
+AT_ENTRANCE = "entrance"  # Waiting at the entrance for the casino to have room
+DEPARTED = "departed"  # Left the casino (or never got in)
+LOCATIONS = (AT_ENTRANCE, ON_FLOOR, IN_GAME_QUEUE, AT_GAME_TABLE, IN_RESTAURANT, IN_HOTEL, IN_HOTEL_LOBBY, DEPARTED)
+
+# Number of locks the customer ids are spread over
+LOCK_STRIPES = 16
+
+
+# CustomerRegistry class knows where every customer of the casino is, by customer id
+# Moving a customer and looking up their location are O(1) dictionary operations. Customers are spread over
+# several locks by id (lock striping), so customers moving at the same time rarely wait for each other.
+# Departed customers are only counted, so the registry does not grow over the night.
+class CustomerRegistry:
+    def __init__(self, stripes=LOCK_STRIPES):
+        self.stripes = [threading.Lock() for _ in range(stripes)]  # Lock of each stripe
+        self.locations = [{} for _ in range(stripes)]  # Customer id -> location, for the ids of each stripe
+        self.counts = [dict.fromkeys(LOCATIONS, 0) for _ in range(stripes)]  # Customers per location, per stripe
+
+    def move(self, customer, location):
+        # Record that a customer is now at the given location, returns where they were (None if unknown)
+        stripe = customer.id % len(self.stripes)
+        locations, counts = self.locations[stripe], self.counts[stripe]
+        with self.stripes[stripe]:
+            previous = locations.pop(customer.id, None)
+            if previous is not None:
+                counts[previous] -= 1
+            if location != DEPARTED:
+                locations[customer.id] = location
+            counts[location] += 1
+        return previous
+
+    def location_of(self, customer_id):
+        # Return where a customer is (None if they are not at the casino)
+        stripe = customer_id % len(self.stripes)
+        with self.stripes[stripe]:
+            return self.locations[stripe].get(customer_id)
+
+    def count(self, location):
+        # Return the number of customers at a location
+        total = 0
+        for lock, counts in zip(self.stripes, self.counts):
+            with lock:
+                total += counts[location]
+        return total
+
+    def report(self):
+        # Return the number of customers at every location
+        return {location: self.count(location) for location in LOCATIONS}
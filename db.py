@@ -1,9 +1,10 @@
-import sqlite3
-import os
-
 import sqlite3
 import os
 from collections import Counter
+from clock import timestamp
+
+# Connection shared by every helper while a single-threaded simulation is running (see open_shared_connection)
+_shared_connection = None
 
 # Function to create all the necessary tables in the database if they do not already exist
 def create_tables():
@@ -77,11 +78,13 @@ def create_tables():
         )
     """)
 
-    # Create game instance table to store information about active game instances
+    # Create game instance table to store information about game tables, with the time they were opened and closed
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS game_instance (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            game_name TEXT NOT NULL
+            game_name TEXT NOT NULL,
+            opened_at TIMESTAMP,
+            closed_at TIMESTAMP
         )
     """)
 
@@ -140,18 +143,119 @@ def create_tables():
         )
     """)
 
+    # Create refused entry table to record customers who never got in: turned away because the casino and its
+    # entrance line were full, or gone after waiting too long at the entrance
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS refused_entry (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id INTEGER NOT NULL,
+            reason TEXT NOT NULL CHECK(reason IN ('rejected', 'balked')),
+            attempt_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Create staffing table to record every barista or waiter hired or retired by the staffing controller
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS staffing (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            venue_type TEXT NOT NULL CHECK(venue_type IN ('bar', 'restaurant')),
+            venue_name TEXT NOT NULL,
+            action TEXT NOT NULL CHECK(action IN ('hire', 'retire')),
+            workers INTEGER NOT NULL,
+            queue_depth INTEGER NOT NULL,
+            wait_seconds REAL NOT NULL,
+            change_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Create latency histogram table to store the order duration histograms of every bar and restaurant
+    # (bucket is the lowest value of the bucket in histogram.RESOLUTION units, see histogram.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS latency_histogram (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            venue_type TEXT NOT NULL CHECK(venue_type IN ('bar', 'restaurant')),
+            venue_name TEXT NOT NULL,
+            metric TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Add the columns introduced after a table was first created
+    add_missing_columns(cursor, "game_instance", {"opened_at": "TIMESTAMP", "closed_at": "TIMESTAMP"})
+    add_missing_columns(cursor, "order_record", {"queue_wait": "REAL", "service_time": "REAL", "completed_at": "TIMESTAMP"})
+    add_missing_columns(cursor, "customer", {"final_balance": "INTEGER", "departed_at": "TIMESTAMP", "departure_reason": "TEXT"})
+
     # Commit the changes and close the connection to the database
     conn.commit()
     conn.close()
 
 
+# Function to add columns that are missing from an existing table (databases created by older versions)
+def add_missing_columns(cursor, table, columns):
+    cursor.execute(f"PRAGMA table_info({table})")
+    existing = {row[1] for row in cursor.fetchall()}
+    for name, definition in columns.items():
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+
 # Function to get a database connection
 def get_db_connection():
+    # Reuse the shared connection if one is open
+    if _shared_connection is not None:
+        return _shared_connection
     # Define the database path and return a connection to the database
     db_path = os.path.join(os.path.dirname(__file__), "casino.db")
     return sqlite3.connect(db_path)
 
 
+# Function to commit and close a connection obtained from get_db_connection
+def release_db_connection(conn):
+    # The shared connection stays open and is committed once in close_shared_connection
+    if conn is _shared_connection:
+        return
+    conn.commit()  # Commit the transaction
+    conn.close()  # Close the connection
+
+
+# Function to open a connection shared by all helpers
+# Only safe when every write happens on the same thread (discrete-event simulation), it avoids
+# opening a connection and committing for every single record
+def open_shared_connection():
+    global _shared_connection
+    if _shared_connection is None:
+        _shared_connection = get_db_connection()
+    return _shared_connection
+
+
+# Function to commit and close the shared connection
+def close_shared_connection():
+    global _shared_connection
+    if _shared_connection is not None:
+        _shared_connection.commit()
+        _shared_connection.close()
+        _shared_connection = None
+
+
+# Function to save a customer when they are created
+def save_customer(customer):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # Insert the customer into the database
+    cursor.execute("""
+        INSERT INTO customer (initial_balance, customer_type, has_car)
+        VALUES (?, ?, ?)
+    """, (customer.balance, customer.type, 1 if customer.car else 0))
+
+    record_id = cursor.lastrowid  # Get the last inserted row ID
+    release_db_connection(conn)  # Commit the transaction and close the connection
+
+    return record_id  # Return the record ID
+
+
 # Function to save an order made by a customer
 def save_order(customer_id, place_type, place_id, order):
     conn = get_db_connection()  # Get a database connection
@@ -159,11 +263,17 @@ def save_order(customer_id, place_type, place_id, order):
 
     # Insert the order record into the database
     cursor.execute("""
-        INSERT INTO order_record (customer_id, place_type, place_id, total_spent)
-        VALUES (?, ?, ?, ?)
-    """, (customer_id, place_type, place_id, order.get_total()))
+        INSERT INTO order_record (customer_id, place_type, place_id, total_spent, timestamp)
+        VALUES (?, ?, ?, ?, ?)
+    """, (customer_id, place_type, place_id, order.get_total(), timestamp()))
 
     order_id = cursor.lastrowid  # Get the last inserted row ID
+    with order.lock:
+        order.record_id = order_id
+        processed = order.status == "processed"
+    if processed:
+        # The order was finished before it was saved, its timing would otherwise be lost
+        update_order_timing(cursor, order)
 
     # Count how many times each item was ordered
     item_counter = Counter(item.name for item in order.items)
@@ -182,24 +292,110 @@ def save_order(customer_id, place_type, place_id, order):
                 VALUES (?, ?, ?)
             """, (order_id, menu_item_id, quantity))  # Insert the order item
 
-    conn.commit()  # Commit the transaction
-    conn.close()  # Close the connection
+    release_db_connection(conn)  # Commit the transaction and close the connection
 
 
-# Function to save a game play record
-def save_game_play(customer_id, game_instance_id, amount_bet, result):
-    db_path = os.path.join(os.path.dirname(__file__), "casino.db")
-    conn = sqlite3.connect(db_path)
+# Function to save how long an order waited and was prepared, once it is processed
+def save_order_timing(order):
+    with order.lock:
+        saved = order.record_id is not None
+    if not saved:
+        return  # save_order writes the timing when it saves the order
+    conn = get_db_connection()
+    update_order_timing(conn.cursor(), order)
+    release_db_connection(conn)  # Commit the transaction and close the connection
+
+
+def update_order_timing(cursor, order):
+    # Fill the queue wait (placed to started), service time (started to processed) and completion time of an order
+    placed_at = order.status_times["waiting"]
+    started_at = order.status_times.get("in_progress", order.completed_at)
+    cursor.execute("""
+        UPDATE order_record
+        SET queue_wait = ?, service_time = ?, completed_at = ?
+        WHERE id = ?
+    """, (started_at - placed_at, order.completed_at - started_at, timestamp(), order.record_id))
+
+
+# Function to save the order duration histograms of a bar or restaurant
+def save_latency_histograms(venue_type, venue_name, histograms):
+    rows = [(venue_type, venue_name, metric, bucket, count, timestamp())
+            for metric, histogram in histograms.items() for bucket, count in histogram.buckets()]
+    if not rows:
+        return
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # Insert every non-empty bucket into the database
+    cursor.executemany("""
+        INSERT INTO latency_histogram (venue_type, venue_name, metric, bucket, count, recorded_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, rows)
+
+    release_db_connection(conn)  # Commit the transaction and close the connection
+
+
+# Function to save a game table when it opens
+def save_game_instance(game_name):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # Insert the game instance into the database
+    cursor.execute("""
+        INSERT INTO game_instance (game_name, opened_at)
+        VALUES (?, ?)
+    """, (game_name, timestamp()))
+
+    record_id = cursor.lastrowid  # Get the last inserted row ID
+    release_db_connection(conn)  # Commit the transaction and close the connection
+
+    return record_id  # Return the record ID
+
+
+# Function to record that a game table closed
+def close_game_instance(record_id):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # Update the closing time of the game instance
+    cursor.execute("""
+        UPDATE game_instance
+        SET closed_at = ?
+        WHERE id = ?
+    """, (timestamp(), record_id))
+
+    release_db_connection(conn)  # Commit the transaction and close the connection
+
+
+# Function to record a staffing change (workers is the number of workers after the change)
+def save_staffing_change(venue_type, venue_name, action, workers, queue_depth, wait_seconds):
+    conn = get_db_connection()
     cursor = conn.cursor()
 
-    # Insert the game play record into the database
+    # Insert the staffing change into the database
     cursor.execute("""
+        INSERT INTO staffing (venue_type, venue_name, action, workers, queue_depth, wait_seconds, change_time)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (venue_type, venue_name, action, workers, queue_depth, wait_seconds, timestamp()))
+
+    release_db_connection(conn)  # Commit the transaction and close the connection
+
+
+# Function to save every play of a game round with a single statement
+def save_game_plays(plays):
+    # plays is a list of (customer_id, game_instance_id, amount_bet, result) tuples
+    if not plays:
+        return
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # Insert all the game play records into the database
+    cursor.executemany("""
         INSERT INTO game_play (customer_id, game_instance_id, amount_bet, result)
         VALUES (?, ?, ?, ?)
-    """, (customer_id, game_instance_id, amount_bet, result))
+    """, plays)
 
-    conn.commit()  # Commit the transaction
-    conn.close()  # Close the connection
+    release_db_connection(conn)  # Commit the transaction and close the connection
 
 
 # Function to save room booking record
@@ -208,12 +404,11 @@ def save_booking(room_number, customer, duration_seconds):
     cursor = conn.cursor()
     price = duration_seconds * customer.casino.hotel.price_per_second  # Calculate the price for the booking
     cursor.execute("""
-            INSERT INTO room_booking (customer_id, room_number, duration_seconds, price)
-            VALUES (?, ?, ?, ?)
-    """, (customer.id, room_number, duration_seconds, price))
+            INSERT INTO room_booking (customer_id, room_number, duration_seconds, price, booking_time)
+            VALUES (?, ?, ?, ?, ?)
+    """, (customer.id, room_number, duration_seconds, price, timestamp()))
 
-    conn.commit()  # Commit the transaction
-    conn.close()  # Close the connection
+    release_db_connection(conn)  # Commit the transaction and close the connection
 
 
 # Function to save a car parking record
@@ -223,13 +418,12 @@ def save_parking_record(customer_id, slot_id):
 
     # Insert the car parking record into the database
     cursor.execute("""
-        INSERT INTO car_parking (customer_id, slot_id)
-        VALUES (?, ?)
-    """, (customer_id, slot_id))
+        INSERT INTO car_parking (customer_id, slot_id, start_time)
+        VALUES (?, ?, ?)
+    """, (customer_id, slot_id, timestamp()))
 
-    conn.commit()  # Commit the transaction
     record_id = cursor.lastrowid  # Get the last inserted row ID
-    conn.close()  # Close the connection
+    release_db_connection(conn)  # Commit the transaction and close the connection
 
     return record_id  # Return the record ID
 
@@ -242,12 +436,11 @@ def close_parking_record(record_id):
     # Update the end time of the parking record
     cursor.execute("""
         UPDATE car_parking
-        SET end_time = CURRENT_TIMESTAMP
+        SET end_time = ?
         WHERE id = ?
-    """, (record_id,))
+    """, (timestamp(), record_id))
 
-    conn.commit()  # Commit the transaction
-    conn.close()  # Close the connection
+    release_db_connection(conn)  # Commit the transaction and close the connection
 
 
 # Function to save a customer's permanence record when they enter the casino
@@ -257,13 +450,12 @@ def save_permanence_record(customer_id):
 
     # Insert the permanence record into the casino_permanence table
     cursor.execute("""
-        INSERT INTO casino_permanence (customer_id)
-        VALUES (?)
-    """, (customer_id,))
+        INSERT INTO casino_permanence (customer_id, arrival_time)
+        VALUES (?, ?)
+    """, (customer_id, timestamp()))
 
-    conn.commit()  # Commit the transaction
     record_id = cursor.lastrowid  # Get the last inserted row ID
-    conn.close()  # Close the connection
+    release_db_connection(conn)  # Commit the transaction and close the connection
 
     return record_id  # Return the record ID
 
@@ -276,12 +468,26 @@ def close_permanence_record(record_id):
     # Update the departure time of the permanence record
     cursor.execute("""
         UPDATE casino_permanence
-        SET departure_time = CURRENT_TIMESTAMP
+        SET departure_time = ?
         WHERE id = ?
-    """, (record_id,))
+    """, (timestamp(), record_id))
+
+    release_db_connection(conn)  # Commit the transaction and close the connection
 
-    conn.commit()  # Commit the transaction
-    conn.close()  # Close the connection
+
+# Function to save a customer's final balance, and when and why they left the casino
+def save_customer_departure(customer, reason):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # Update the customer record saved when they were created
+    cursor.execute("""
+        UPDATE customer
+        SET final_balance = ?, departed_at = ?, departure_reason = ?
+        WHERE id = ?
+    """, (customer.balance, timestamp(), reason, customer.id))
+
+    release_db_connection(conn)  # Commit the transaction and close the connection
 
 
 # Function to save a failed parking attempt record
@@ -291,12 +497,190 @@ def save_failed_parking(customer_id):
 
     # Insert the failed parking attempt record into the failed_parking table
     cursor.execute("""
-        INSERT INTO failed_parking (customer_id)
-        VALUES (?)
-    """, (customer_id,))
+        INSERT INTO failed_parking (customer_id, attempt_time)
+        VALUES (?, ?)
+    """, (customer_id, timestamp()))
 
-    conn.commit()  # Commit the transaction
-    conn.close()  # Close the connection
+    release_db_connection(conn)  # Commit the transaction and close the connection
+
+
+# Function to save a customer who did not get into the casino ('rejected' or 'balked')
+def save_refused_entry(customer_id, reason):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # Insert the refused entry record into the refused_entry table
+    cursor.execute("""
+        INSERT INTO refused_entry (customer_id, reason, attempt_time)
+        VALUES (?, ?, ?)
+    """, (customer_id, reason, timestamp()))
+
+    release_db_connection(conn)  # Commit the transaction and close the connection
+
+
+# Function to save a bar and its menu, returns the bar's id and the ids of its menu items (in menu order)
+def save_bar(bar):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # Insert the bar, then every item of its menu
+    cursor.execute("""
+        INSERT INTO bar (name) VALUES (?)
+    """, (bar.name,))
+    bar_id = cursor.lastrowid
+    item_ids = save_menu(cursor, 'bar', bar_id, bar.menu.products)
+
+    release_db_connection(conn)  # Commit the transaction and close the connection
+
+    return bar_id, item_ids
+
+
+# Function to save a restaurant and its menu, returns the restaurant's id and the ids of its menu items
+def save_restaurant(restaurant):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # Insert the restaurant, then every item of its menu
+    cursor.execute("""
+        INSERT INTO restaurant (name, num_tables) VALUES (?, ?)
+    """, (restaurant.name, restaurant.num_tables))
+    restaurant_id = cursor.lastrowid
+    item_ids = save_menu(cursor, 'restaurant', restaurant_id, restaurant.menu.products)
+
+    release_db_connection(conn)  # Commit the transaction and close the connection
+
+    return restaurant_id, item_ids
+
+
+def save_menu(cursor, source_type, source_id, products):
+    # Insert the items of a bar or restaurant menu, returns their ids
+    item_ids = []
+    for item in products:
+        cursor.execute("""
+            INSERT INTO menu_item (name, price, prep_time, source_type, source_id)
+            VALUES (?, ?, ?, ?, ?)
+        """, (item.name, item.price, item.prep_time, source_type, source_id))
+        item_ids.append(cursor.lastrowid)
+    return item_ids
+
+
+# Function to get the id the next row of a table will take
+# Bulk writers give their rows explicit ids from here, so that related rows can refer to them
+def next_record_id(table):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}")
+    record_id = cursor.fetchone()[0]
+    release_db_connection(conn)
+    return record_id
+
+
+# Function to save many customers with a single statement
+def save_customers(customers):
+    # customers is a list of (id, initial_balance, customer_type, has_car, final_balance, departed_at,
+    # departure_reason) tuples, the last three are None for customers who have not left
+    if not customers:
+        return
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # Insert all the customers into the database
+    cursor.executemany("""
+        INSERT INTO customer (id, initial_balance, customer_type, has_car, final_balance, departed_at, departure_reason)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, customers)
+
+    release_db_connection(conn)  # Commit the transaction and close the connection
+
+
+# Function to save many permanence records with a single statement
+def save_permanence_records(records):
+    # records is a list of (customer_id, arrival_time, departure_time) tuples
+    if not records:
+        return
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # Insert all the permanence records into the database
+    cursor.executemany("""
+        INSERT INTO casino_permanence (customer_id, arrival_time, departure_time)
+        VALUES (?, ?, ?)
+    """, records)
+
+    release_db_connection(conn)  # Commit the transaction and close the connection
+
+
+# Function to save many car parking records with a single statement
+def save_parking_records(records):
+    # records is a list of (customer_id, slot_id, start_time, end_time) tuples
+    if not records:
+        return
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # Insert all the car parking records into the database
+    cursor.executemany("""
+        INSERT INTO car_parking (customer_id, slot_id, start_time, end_time)
+        VALUES (?, ?, ?, ?)
+    """, records)
+
+    release_db_connection(conn)  # Commit the transaction and close the connection
+
+
+# Function to save many failed parking attempts with a single statement
+def save_failed_parkings(attempts):
+    # attempts is a list of (customer_id, attempt_time) tuples
+    if not attempts:
+        return
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # Insert all the failed parking attempts into the database
+    cursor.executemany("""
+        INSERT INTO failed_parking (customer_id, attempt_time)
+        VALUES (?, ?)
+    """, attempts)
+
+    release_db_connection(conn)  # Commit the transaction and close the connection
+
+
+# Function to save many room bookings with a single statement
+def save_bookings(bookings):
+    # bookings is a list of (customer_id, room_number, duration_seconds, price, booking_time) tuples
+    if not bookings:
+        return
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # Insert all the room bookings into the database
+    cursor.executemany("""
+        INSERT INTO room_booking (customer_id, room_number, duration_seconds, price, booking_time)
+        VALUES (?, ?, ?, ?, ?)
+    """, bookings)
+
+    release_db_connection(conn)  # Commit the transaction and close the connection
+
+
+# Function to save many orders and their items with two statements
+def save_orders(orders, items):
+    # orders is a list of (id, customer_id, place_type, place_id, total_spent, timestamp) tuples (ids from
+    # next_record_id), items a list of (order_id, menu_item_id, quantity) tuples
+    if not orders:
+        return
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # Insert all the order records, then all their items into the database
+    cursor.executemany("""
+        INSERT INTO order_record (id, customer_id, place_type, place_id, total_spent, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, orders)
+    cursor.executemany("""
+        INSERT INTO order_item (order_id, menu_item_id, quantity)
+        VALUES (?, ?, ?)
+    """, items)
+
+    release_db_connection(conn)  # Commit the transaction and close the connection
 
 
 # Create the necessary tables if they do not exist
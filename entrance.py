@@ -0,0 +1,152 @@
+import threading
+from collections import deque
+from db import save_refused_entry, save_customer_departure
+from customer_registry import AT_ENTRANCE, DEPARTED
+from simulation import Signal, run_process, run_process_async
+
+# Shortest sleep (seconds) of the balking scheduler, so that rounding cannot make it wake up just too early forever
+MIN_SCHEDULER_DELAY = 0.01
+
+
+# Visitor class is a customer waiting at the entrance for someone inside to leave
+class Visitor:
+    __slots__ = ("customer", "since")
+
+    def __init__(self, customer, since):
+        self.customer = customer  # Customer waiting to get in
+        self.since = since  # Time at which the customer joined the line
+
+
+# Entrance class is the casino's admission controller
+# At most max_occupancy customers are inside (started and not yet departed) at any time. Arrivals beyond it
+# wait in a line of at most max_queue customers, outside the casino: they are not started, so they take no
+# thread, task or game seat. Each departure lets the first customer of the line in. Customers who find the
+# line full are rejected, customers who wait max_wait seconds balk; both are recorded in the database.
+# Every customer waits the same time, so the line is also in order of balking: the entrance's own actor
+# sleeps until the first customer of the line balks.
+class Entrance:
+    def __init__(self, casino, max_occupancy=None, max_queue=100, max_wait=60):
+        if max_occupancy is not None and max_occupancy < 1:
+            raise ValueError("The casino must let at least one customer in")
+        self.casino = casino  # Reference to the casino
+        self.max_occupancy = max_occupancy  # Most customers inside at the same time (None: no limit)
+        self.max_queue = max_queue  # Most customers waiting at the entrance
+        self.max_wait = max_wait  # Longest time (seconds) a customer waits at the entrance before leaving
+        self.line = deque()  # Visitors waiting to get in, in arrival order
+        self.lock = threading.Lock()  # Lock guarding the occupancy, the line and the counters
+        self.wakeup = Signal()  # Wakes the balking scheduler when the line was empty
+        self.inside = 0  # Customers let in and not yet departed
+        self.admitted = 0  # Customers let in so far
+        self.max_inside = 0  # Most customers inside at the same time
+        self.queued = 0  # Customers who had to wait at the entrance
+        self.waited = 0  # Customers let in after waiting
+        self.total_wait = 0  # Seconds these customers spent at the entrance, summed
+        self.max_line = 0  # Longest line at the entrance
+        self.rejected = 0  # Customers turned away because the line was full
+        self.balked = 0  # Customers who left after waiting max_wait seconds
+
+    def arrive(self, customer):
+        # Let an arriving customer in, or in line if the casino is full, or turn them away if the line is full too
+        with self.lock:
+            if self.max_occupancy is None or (self.inside < self.max_occupancy and not self.line):
+                self._count_admission()
+                admitted, rejected = True, False
+            elif len(self.line) < self.max_queue:
+                self.line.append(Visitor(customer, self.casino.clock.now()))
+                self.queued += 1
+                self.max_line = max(self.max_line, len(self.line))
+                self.casino.locations.move(customer, AT_ENTRANCE)  # Before a departure can let the customer in
+                first = len(self.line) == 1
+                admitted, rejected = False, False
+            else:
+                self.rejected += 1
+                admitted, rejected = False, True
+        if admitted:
+            self.casino.admit(customer)
+        elif rejected:
+            print(f"Customer-{customer.id} was turned away: the casino and its entrance line are full.")
+            self._refuse(customer, "rejected")
+        else:
+            print(f"The casino is full, customer-{customer.id} waits at the entrance for up to {self.max_wait} seconds.")
+            if first:
+                self.wakeup.notify()
+
+    def _count_admission(self):
+        # Count a customer going in (called with the lock held)
+        self.inside += 1
+        self.admitted += 1
+        self.max_inside = max(self.max_inside, self.inside)
+
+    def leave(self, customer):
+        # Called when a customer inside departs: let the first customer still in line in
+        balked = []
+        visitor = None
+        with self.lock:
+            self.inside -= 1
+            now = self.casino.clock.now()
+            while self.line:
+                candidate = self.line.popleft()
+                if now - candidate.since >= self.max_wait:
+                    self.balked += 1  # Due to balk, the scheduler has not run yet
+                    balked.append(candidate.customer)
+                    continue
+                visitor = candidate
+                self.waited += 1
+                self.total_wait += now - visitor.since
+                self._count_admission()
+                break
+        for waiting in balked:
+            self._balk(waiting)
+        if visitor is not None:
+            self.casino.admit(visitor.customer)
+
+    def _balk(self, customer):
+        # A customer who waited too long at the entrance goes home
+        print(f"Customer-{customer.id} gave up waiting at the entrance.")
+        self._refuse(customer, "balked")
+
+    def _refuse(self, customer, reason):
+        # Record a customer who never got in, as a departure too so that they do not count as still inside
+        self.casino.locations.move(customer, DEPARTED)
+        save_refused_entry(customer.id, reason)
+        save_customer_departure(customer, reason)
+
+    def report(self):
+        # Return the occupancy and line counters of the entrance
+        with self.lock:
+            return {
+                'max_occupancy': self.max_occupancy,
+                'inside': self.inside,
+                'max_inside': self.max_inside,
+                'admitted': self.admitted,
+                'queued': self.queued,
+                'waiting': len(self.line),
+                'max_line': self.max_line,
+                'waited': self.waited,
+                'mean_wait': self.total_wait / self.waited if self.waited else 0,
+                'rejected': self.rejected,
+                'balked': self.balked,
+            }
+
+    def run(self):
+        # Run the balking scheduler on its own thread
+        run_process(self.process(), self.casino.clock)
+
+    async def run_async(self):
+        # Coroutine equivalent of run() for the asyncio backend
+        await run_process_async(self.process(), self.casino.clock)
+
+    def process(self):
+        # Balking scheduler: send home the customers who have waited max_wait seconds, then sleep until the next
+        # one is due (or until someone joins an empty line)
+        while True:
+            now = self.casino.clock.now()
+            balked = []
+            with self.lock:
+                while self.line and now - self.line[0].since >= self.max_wait:
+                    balked.append(self.line.popleft().customer)
+                    self.balked += 1
+                delay = max(self.line[0].since + self.max_wait - now, MIN_SCHEDULER_DELAY) if self.line else None
+            for customer in balked:
+                self._balk(customer)
+            yield self.wakeup.wait(delay)
@@ -0,0 +1,580 @@
+import argparse
+import time
+from datetime import timedelta
+import numpy as np
+from bar import create_bars
+from restaurant import create_restaurants
+from clock import VirtualClock, set_clock, TIMESTAMP_FORMAT
+from customer import FLOOR_ACTIONS, PARKING_TIMEOUT
+from customer_factory import ProfileRegistry, load_profiles
+from game_implementations import GAME_RULES, DEFAULT_RULES
+from table_manager import TABLE_LIMITS, DEFAULT_LIMITS
+from sampling import AliasTable
+from arrivals import RATE_CURVES, night_schedule
+from db import (create_tables, open_shared_connection, close_shared_connection, next_record_id, save_bar,
+                save_restaurant, save_game_instance, close_game_instance, save_customers, save_permanence_records,
+                save_parking_records, save_failed_parkings, save_bookings, save_orders, save_game_plays)
+
+# States of a customer in the population arrays
+EXPECTED = 0  # Has not arrived yet
+PARKING = 1  # Waiting in line for a parking slot
+FLOOR = 2  # On the casino floor, deciding what to do next
+GAME_QUEUE = 3  # Waiting for a seat at a game
+RESTAURANT = 4  # Seated at a restaurant, ordering
+HOTEL_LOBBY = 5  # Paid for a room, waiting in the lobby for one to free up
+HOTEL = 6  # Sleeping in a hotel room
+DEPARTED = 7  # Left the casino
+
+# Why customers leave, stored as an index in the population arrays
+DEPARTURE_REASONS = ("out_of_money", "left", "strategized", "no_parking")
+OUT_OF_MONEY, LEFT, STRATEGIZED, NO_PARKING = range(len(DEPARTURE_REASONS))
+
+# Floor actions, by their index in the profiles' action tables (the last one is "wait")
+LEAVE, STRATEGIZE, PLAY, ORDER, SLEEP, EAT, WAIT = range(len(FLOOR_ACTIONS) + 1)
+
+MAX_ORDER_ITEMS = 7  # Most items in a bar or restaurant order (as in Customer.place_order)
+SEAT_HORIZON = 16  # Seconds ahead a round may hold its seats (a round and the pause after it last at most 10)
+
+
+def rank_in_group(groups):
+    # Position of every entry among the entries of the same group, in order (0 for the first of each group)
+    order = np.argsort(groups, kind="stable")
+    sorted_groups = groups[order]
+    rank = np.empty(len(groups), np.intp)
+    rank[order] = np.arange(len(groups)) - np.searchsorted(sorted_groups, sorted_groups)
+    return rank
+
+
+# FastCasino class simulates a whole night of the casino as arrays, without an actor per customer
+# Every customer is a row of NumPy arrays (struct of arrays), and each tick of one simulated second advances every
+# customer who is due at once with vectorized draws. It uses the same profiles, game rules, menus, parking lot and
+# hotel as the actor simulation, with the most tables the table manager may open; a round holds its seats for its
+# length and the pause after it, and seated players are back on the floor the next second, as in Game.process.
+# Results are written to casino.db in bulk at closing, in the tables the actors write, so stats.py reads them as is.
+# Where it differs from the actor simulation:
+# - the seats of a game are pooled over its tables: a player takes any free seat of the game instead of queueing
+#   at one table (the plays of a round are spread over the game's tables in turn), and no table opens or closes
+# - rounds start with whoever is seated, Poker tables do not wait for min_seats players
+# - orders are recorded when placed, bars and restaurants have no queue, staff or kitchen
+class FastCasino:
+    def __init__(self, parking_slots=30, hotel_rooms=10, profiles=None, seed=None, price_per_second=3,
+                 hotel_max_wait=30):
+        self.rng = np.random.default_rng(seed)  # Random generator of every draw
+        self.now = 0  # Current simulated second
+        self.clock = VirtualClock(self)  # Clock reading the simulated second, for the database timestamps
+        set_clock(self.clock)
+        self.price_per_second = price_per_second  # Price per second of a hotel room
+        self.hotel_max_wait = hotel_max_wait  # Longest time (seconds) a customer waits in the lobby before a refund
+        self.slot_taken = np.zeros(parking_slots, bool)  # Parking slots with a car in them
+        self.room_taken = np.zeros(hotel_rooms, bool)  # Hotel rooms with a guest in them
+
+        # Columns of every profile, by type index
+        registry = ProfileRegistry(profiles)
+        self.type_names = list(registry.profiles)
+        profiles = list(registry.profiles.values())
+        self.type_p_ordering = np.array([profile.p_ordering for profile in profiles])
+        self.type_min_bet = np.array([profile.min_bet for profile in profiles], np.int64)
+        self.type_max_bet = np.array([profile.max_bet for profile in profiles], np.int64)
+        self.type_car_probability = np.array([profile.has_car_probability for profile in profiles])
+        # Alias tables of the profiles: the type of each arrival, the game chosen, and the floor action of a customer
+        # who has not stayed at the hotel (row = type) or has (row = type + number of types, never sleeps again)
+        self.types = AliasTable(self.type_names, [registry.types.probabilities()])
+        # The games of the table manager, then any other game the profiles name (tables built with default rules)
+        self.game_names = list(dict.fromkeys(list(TABLE_LIMITS) + [name for profile in profiles
+                                                                   for name in profile.games.probabilities()]))
+        self.game_rules = [GAME_RULES.get(name, DEFAULT_RULES) for name in self.game_names]
+        self.games = AliasTable(self.game_names, [profile.games.probabilities() for profile in profiles])
+        self.actions = AliasTable(FLOOR_ACTIONS + ("wait",), [profile.actions.probabilities() for profile in profiles] +
+                                  [profile.actions_without_sleep.probabilities() for profile in profiles])
+        self.game_probability = np.array([rules['probability'] for rules in self.game_rules])
+        self.game_prize = np.array([rules['prize'] for rules in self.game_rules], np.int64)
+
+        # Records written at closing, as lists of arrays (one entry per tick that produced some)
+        self.plays = []  # (customer, table id, bet, won)
+        self.orders = []  # (order id, customer, place type, place id, total, second)
+        self.order_items = []  # (order id, menu item index)
+        self.bookings = []  # (customer, room, duration, price, second)
+        self.failed_parkings = []  # (customer, second)
+        self.next_order_id = 1  # Id of the next order_record row
+        self.refunds = 0  # Customers refunded after waiting in the lobby
+        self.steps = 0  # Customer-steps executed: the customers inside at every second a tick ran
+        self.customer_seconds = 0  # Customer-seconds simulated, the idle seconds skipped between ticks included
+
+    def open(self):
+        # Save the bars, restaurants and game tables, as the casino does when it opens
+        create_tables()
+        open_shared_connection()  # Every write happens on this thread
+        self.next_order_id = next_record_id("order_record")
+
+        # Menus of every bar and restaurant, as one flat array of items (venue v owns offset[v]:offset[v]+length[v])
+        menu_ids, prices, names, self.menu_venue = [], [], [], []
+        self.bar_offset, self.bar_length = [], []
+        bars = create_bars()[:3]
+        for index, bar in enumerate(bars):
+            _, item_ids = save_bar(bar)
+            self.bar_offset.append(len(menu_ids))
+            self.bar_length.append(len(item_ids))
+            menu_ids += item_ids
+            prices += [item.price for item in bar.menu.products]
+            names += [item.name for item in bar.menu.products]
+            self.menu_venue += [index] * len(item_ids)
+        self.restaurant_offset, self.restaurant_length, tables = [], [], []
+        restaurants = create_restaurants(None)[:2]  # Only the menus and tables are used, not the kitchens
+        for restaurant in restaurants:
+            _, item_ids = save_restaurant(restaurant)
+            self.restaurant_offset.append(len(menu_ids))
+            self.restaurant_length.append(len(item_ids))
+            tables.append(restaurant.num_tables)
+            menu_ids += item_ids
+            prices += [item.price for item in restaurant.menu.products]
+        self.menu_ids, self.menu_prices = np.array(menu_ids), np.array(prices)
+        # Place id of every bar and restaurant in order_record: its position + 1, as Customer records its orders
+        self.bar_places = np.arange(1, len(bars) + 1)
+        self.restaurant_places = np.arange(1, len(restaurants) + 1)
+        self.bar_offset, self.bar_length = np.array(self.bar_offset), np.array(self.bar_length)
+        self.menu_venue = np.array(self.menu_venue)
+        self.restaurant_offset = np.array(self.restaurant_offset)
+        self.restaurant_length = np.array(self.restaurant_length)
+        self.restaurant_tables = np.array(tables)  # Tables of each restaurant
+        self.restaurant_seated = np.zeros(len(tables), np.int64)  # Customers seated at each restaurant
+
+        # Bar items a customer may want, with the menu entries of the bars serving each one (as BarRouter)
+        bar_items = len(menu_ids) - sum(self.restaurant_length)
+        wanted = {}
+        for index in range(bar_items):
+            wanted.setdefault(names[index], []).append(index)
+        self.wanted_start = np.cumsum([0] + [len(entries) for entries in wanted.values()])[:-1]
+        self.wanted_count = np.array([len(entries) for entries in wanted.values()])
+        self.wanted_entries = np.array([index for entries in wanted.values() for index in entries])
+
+        # The most tables of each game the table manager may open, with the seats they offer
+        self.table_ids = []  # Table ids of each game (game_instance rows)
+        seats = []
+        for name, rules in zip(self.game_names, self.game_rules):
+            ids, capacity = [], 0
+            for _ in range(TABLE_LIMITS.get(name, DEFAULT_LIMITS)['max_tables']):
+                ids.append(save_game_instance(name))
+                if 'min_seats' in rules:
+                    capacity += int(self.rng.integers(rules['min_seats'], rules['capacity'], endpoint=True))
+                else:
+                    capacity += rules['capacity']
+            self.table_ids.append(np.array(ids))
+            seats.append(capacity)
+        self.free_seats = np.array(seats, np.int64)  # Seats of each game not held by a round
+        self.released = np.zeros((len(seats), SEAT_HORIZON), np.int64)  # Seats of each game freed at second % horizon
+        self.released_until = -1  # Last second whose seats were given back
+        self.table_count = np.array([len(ids) for ids in self.table_ids])
+        self.table_grid = np.zeros((len(seats), self.table_count.max()), np.int64)  # Table ids, one row per game
+        for game, ids in enumerate(self.table_ids):
+            self.table_grid[game, :len(ids)] = ids
+
+    def populate(self, arrivals):
+        # Build every customer of the night at once, arriving at the given seconds (sorted, see arrivals.py)
+        count = len(arrivals)
+        self.first_id = next_record_id("customer")  # Customer ids follow the rows already in the database
+        self.arrival = np.floor(arrivals).astype(np.int64)  # Second at which each customer arrives
+        self.type = self.types.draw(self.rng, np.zeros(count, np.intp))  # Type index, drawn by spawn weight
+        self.balance = self.rng.integers(100, 1000, size=count, endpoint=True).astype(float)
+        self.initial_balance = self.balance.copy()
+        self.min_bet = self.type_min_bet[self.type]
+        self.max_bet = self.type_max_bet[self.type]
+        self.has_car = self.rng.random(count) < self.type_car_probability[self.type]
+        self.state = np.full(count, EXPECTED, np.int8)
+        self.next_step = np.zeros(count, np.int64)  # Second at which the customer acts next
+        self.deadline = np.zeros(count, np.int64)  # Second at which a customer waiting in line gives up
+        self.game = np.zeros(count, np.intp)  # Game the customer is queued for
+        self.queued_at = np.zeros(count, np.int64)  # Second at which the customer joined the game's queue
+        self.restaurant = np.zeros(count, np.intp)  # Restaurant the customer is seated at
+        self.bill = np.zeros(count)  # Amount ordered at the current restaurant, paid when leaving
+        self.stay = np.zeros(count, np.int64)  # Length of the hotel stay paid for
+        self.paid = np.zeros(count)  # Price paid for it, refunded if no room frees up
+        self.room = np.full(count, -1, np.intp)  # Hotel room of the customer
+        self.slept = np.zeros(count, bool)  # Whether the customer has stayed at the hotel
+        self.slot = np.full(count, -1, np.intp)  # Parking slot of the customer's car
+        self.parked_at = np.full(count, -1, np.int64)  # Second at which the car was parked
+        self.departed_at = np.full(count, -1, np.int64)  # Second at which the customer left
+        self.reason = np.full(count, -1, np.int8)  # Why the customer left
+        self.active = np.empty(0, np.intp)  # Customers in the casino, in arrival order
+        self.arrived = 0  # Customers who have arrived so far
+
+    def run(self, arrivals, duration=None):
+        # Simulate the night: every customer arrives at their second of the schedule, and the casino closes once
+        # they have all left (or after duration seconds)
+        self.open()
+        self.populate(arrivals)
+        started = time.perf_counter()
+        while self.arrived < len(self.arrival) or len(self.active):
+            if duration is not None and self.now >= duration:
+                break
+            self.tick()
+            # Skip the seconds in which nothing can happen (the customers inside still count as simulated)
+            later = self._next_second()
+            if duration is not None:
+                later = max(min(later, int(duration)), self.now + 1)
+            self.customer_seconds += len(self.active) * (later - self.now - 1)
+            self.now = later
+        elapsed = time.perf_counter() - started
+        started = time.perf_counter()
+        self.close()
+        saved = time.perf_counter() - started
+        self.report(elapsed, saved)
+
+    def tick(self):
+        # Advance every customer by one simulated second
+        now = self.now
+        self._arrive(now)
+        self.steps += len(self.active)
+        self.customer_seconds += len(self.active)
+        self._park(now)
+        self._check_out(now)
+        self._step_restaurant(now)
+        self._step_floor(now)
+        self._seat_players(now)
+        self._hotel_lobby(now)
+        self.active = self.active[self.state[self.active] != DEPARTED]
+
+    def _next_second(self):
+        # First second after this one at which a customer acts or arrives
+        # Customers waiting for a parking slot, a room or a seat may be served any second, so none is skipped
+        following = self.now + 1
+        states = self.state[self.active]
+        if ((states == PARKING) | (states == GAME_QUEUE) | (states == HOTEL_LOBBY)).any():
+            return following
+        later = [self.next_step[self.active].min()] if len(self.active) else []
+        if self.arrived < len(self.arrival):
+            later.append(self.arrival[self.arrived])
+        return max(following, int(min(later))) if later else following
+
+    def _due(self, state):
+        # Customers in a state whose next step is due
+        active = self.active
+        return active[(self.state[active] == state) & (self.next_step[active] <= self.now)]
+
+    def _arrive(self, now):
+        # Let in the customers arriving this second: drivers join the line for a parking slot
+        end = np.searchsorted(self.arrival, now, side="right")
+        if end == self.arrived:
+            return
+        new = np.arange(self.arrived, end)
+        self.arrived = end
+        self.active = np.concatenate([self.active, new])
+        drivers = self.has_car[new]
+        self.state[new] = np.where(drivers, PARKING, FLOOR)
+        self.next_step[new] = now
+        self.deadline[new] = now + PARKING_TIMEOUT
+
+    def _park(self, now):
+        # Hand free slots to the cars in line, in arrival order; cars that waited PARKING_TIMEOUT seconds give up
+        line = self.active[self.state[self.active] == PARKING]
+        if not len(line):
+            return
+        free = np.flatnonzero(~self.slot_taken)
+        parked = line[:len(free)]
+        self.slot[parked] = free[:len(parked)]
+        self.slot_taken[self.slot[parked]] = True
+        self.parked_at[parked] = now
+        self.state[parked] = FLOOR
+        waiting = line[len(parked):]
+        gave_up = waiting[self.deadline[waiting] <= now]
+        if len(gave_up):
+            self.failed_parkings.append((gave_up, np.full(len(gave_up), now)))
+            self._depart(gave_up, NO_PARKING)
+
+    def _check_out(self, now):
+        # End the stays that are over, the guests go back to the floor
+        guests = self._due(HOTEL)
+        if not len(guests):
+            return
+        self.room_taken[self.room[guests]] = False
+        self.room[guests] = -1
+        self.state[guests] = FLOOR
+
+    def _step_restaurant(self, now):
+        # Seated customers order again (as often as p_ordering), or pay for everything and go back to the floor
+        seated = self._due(RESTAURANT)
+        if not len(seated):
+            return
+        ordering = self.rng.random(len(seated)) < self.type_p_ordering[self.type[seated]]
+        diners = seated[ordering]
+        restaurants = self.restaurant[diners]
+        items, totals = self._pick_items(self.restaurant_offset[restaurants], self.restaurant_length[restaurants])
+        placed = totals + self.bill[diners] <= self.balance[diners]
+        self.bill[diners[placed]] += totals[placed]
+        self._log_orders(diners[placed], "restaurant", self.restaurant_places[restaurants[placed]], totals[placed],
+                         items[placed])
+        self.next_step[diners] = now + self.rng.integers(1, 10, size=len(diners), endpoint=True)
+
+        leaving = seated[~ordering]
+        self.balance[leaving] -= self.bill[leaving]
+        self.bill[leaving] = 0
+        self.restaurant_seated -= np.bincount(self.restaurant[leaving], minlength=len(self.restaurant_seated))
+        self.state[leaving] = FLOOR
+
+    def _step_floor(self, now):
+        # Every customer due on the floor takes one action, drawn from their profile's action table
+        customers = self._due(FLOOR)
+        if not len(customers):
+            return
+        broke = self.balance[customers] <= 0
+        self._depart(customers[broke], OUT_OF_MONEY)
+        customers = customers[~broke]
+        actions = self.actions.draw(self.rng, self.type[customers] + len(self.type_names) * self.slept[customers])
+        self._depart(customers[actions == LEAVE], LEFT)
+        self._depart(customers[actions == STRATEGIZE], STRATEGIZED)
+
+        players = customers[actions == PLAY]
+        self.game[players] = self.games.draw(self.rng, self.type[players])
+        self.queued_at[players] = now
+        self.state[players] = GAME_QUEUE
+
+        self._order_at_bar(customers[actions == ORDER])
+        self._book_room(customers[actions == SLEEP])
+        self._enter_restaurant(customers[actions == EAT])
+        waiting = customers[actions == WAIT]
+        self.next_step[waiting] = now + self.rng.integers(1, 5, size=len(waiting), endpoint=True)
+
+    def _order_at_bar(self, customers):
+        # Each customer wants an item, goes to a bar serving it and orders it with up to six more of its items
+        if not len(customers):
+            return
+        wanted = self.rng.integers(len(self.wanted_count), size=len(customers))
+        entry = self.wanted_entries[self.wanted_start[wanted] +
+                                    (self.rng.random(len(customers)) * self.wanted_count[wanted]).astype(np.intp)]
+        bars = self.menu_venue[entry]
+        items, totals = self._pick_items(self.bar_offset[bars], self.bar_length[bars], first=entry)
+        placed = totals <= self.balance[customers]
+        self.balance[customers[placed]] -= totals[placed]
+        self._log_orders(customers[placed], "bar", self.bar_places[bars[placed]], totals[placed], items[placed])
+        self.next_step[customers] = self.now + 1
+
+    def _pick_items(self, offset, length, first=None):
+        # Draw 1 to MAX_ORDER_ITEMS items per order from each order's menu, returns the menu indexes (-1 past the
+        # last item) and the totals
+        count = self.rng.integers(1, MAX_ORDER_ITEMS, size=len(offset), endpoint=True)
+        items = offset[:, None] + (self.rng.random((len(offset), MAX_ORDER_ITEMS)) * length[:, None]).astype(np.intp)
+        if first is not None:
+            items[:, 0] = first
+        items[np.arange(MAX_ORDER_ITEMS) >= count[:, None]] = -1
+        totals = np.where(items >= 0, self.menu_prices[items], 0).sum(axis=1)
+        return items, totals
+
+    def _log_orders(self, customers, place_type, place_ids, totals, items):
+        # Keep the orders placed this second and their items for closing
+        if not len(customers):
+            return
+        ids = self.next_order_id + np.arange(len(customers))
+        self.next_order_id += len(customers)
+        self.orders.append((ids, customers, place_type, place_ids, totals, self.now))
+        ordered = items >= 0
+        self.order_items.append((np.repeat(ids, ordered.sum(axis=1)), items[ordered]))
+
+    def _book_room(self, customers):
+        # Customers who can afford a stay of 1 to 50 seconds pay for it and wait in the lobby for a room
+        if not len(customers):
+            return
+        duration = self.rng.integers(1, 50, size=len(customers), endpoint=True)
+        price = duration * self.price_per_second
+        paying = price <= self.balance[customers]
+        guests = customers[paying]
+        self.balance[guests] -= price[paying]
+        self.paid[guests] = price[paying]
+        self.stay[guests] = duration[paying]
+        self.deadline[guests] = self.now + self.hotel_max_wait
+        self.state[guests] = HOTEL_LOBBY
+        self.next_step[customers[~paying]] = self.now + 1
+
+    def _hotel_lobby(self, now):
+        # Give free rooms to the customers in the lobby, in order; refund those who waited hotel_max_wait seconds
+        lobby = self.active[self.state[self.active] == HOTEL_LOBBY]
+        if not len(lobby):
+            return
+        lobby = lobby[np.argsort(self.deadline[lobby], kind="stable")]
+        free = np.flatnonzero(~self.room_taken)
+        guests = lobby[:len(free)]
+        rooms = free[:len(guests)]
+        self.room[guests] = rooms
+        self.room_taken[rooms] = True
+        self.slept[guests] = True
+        self.state[guests] = HOTEL
+        self.next_step[guests] = now + self.stay[guests]
+        if len(guests):
+            self.bookings.append((guests, rooms, self.stay[guests], self.paid[guests], now))
+        waiting = lobby[len(guests):]
+        refunded = waiting[self.deadline[waiting] <= now]
+        self.balance[refunded] += self.paid[refunded]
+        self.state[refunded] = FLOOR
+        self.next_step[refunded] = now + 1
+        self.refunds += len(refunded)
+
+    def _enter_restaurant(self, customers):
+        # Each customer picks a restaurant and is seated if a table is free (in order), otherwise stays on the floor
+        if not len(customers):
+            return
+        restaurants = self.rng.integers(len(self.restaurant_tables), size=len(customers))
+        free = self.restaurant_tables - self.restaurant_seated
+        seated = rank_in_group(restaurants) < free[restaurants]
+        diners = customers[seated]
+        self.restaurant[diners] = restaurants[seated]
+        self.bill[diners] = 0
+        self.restaurant_seated += np.bincount(restaurants[seated], minlength=len(free))
+        self.state[diners] = RESTAURANT
+        self.next_step[customers] = self.now + 1
+
+    def _seat_players(self, now):
+        # Seat the queued players, oldest first, on the seats their game has free, and play their round at once
+        # (bets and outcomes as in Game.play_round); the seats stay taken for the round and the pause after it
+        self._release_seats(now)
+        queue = self.active[self.state[self.active] == GAME_QUEUE]
+        if not len(queue):
+            return
+        queued_games = self.game[queue]
+        players, games, rank = [], [], []
+        for game in np.flatnonzero(self.free_seats > 0).tolist():
+            waiting = queue[queued_games == game]
+            free = int(self.free_seats[game])
+            if len(waiting) > free:
+                # Only the oldest players get a seat: a partial sort finds them in linear time
+                waiting = waiting[np.argpartition(self.queued_at[waiting], free - 1)[:free]]
+            players.append(waiting)
+            games.append(np.full(len(waiting), game))
+            rank.append(np.arange(len(waiting)))
+        players = np.concatenate(players) if players else queue[:0]
+        if not len(players):
+            return
+        games, rank = np.concatenate(games), np.concatenate(rank)
+        self.free_seats -= np.bincount(games, minlength=len(self.free_seats))
+        length = self.rng.integers(1, 5, size=len(players), endpoint=True) + self.rng.integers(1, 5, size=len(players), endpoint=True)
+        np.add.at(self.released, (games, (now + length) % SEAT_HORIZON), 1)
+        tables = self.table_grid[games, rank % self.table_count[games]]  # Players spread over the game's tables
+
+        balances = np.floor(self.balance[players]).astype(np.int64)
+        low = np.minimum(self.min_bet[players], balances)  # Bet limits, capped by the balance
+        high = np.minimum(self.max_bet[players], balances)
+        bets = self.rng.integers(low, high, endpoint=True)
+        won = self.rng.random(len(players)) < self.game_probability[games]
+        self.balance[players] += np.where(won, bets * self.game_prize[games], 0) - bets
+        self.plays.append((players, tables, bets, won))
+        self.state[players] = FLOOR
+        self.next_step[players] = now + 1
+
+    def _release_seats(self, now):
+        # Give back the seats of the rounds that ended since the last tick (all of them after SEAT_HORIZON seconds)
+        for second in range(max(self.released_until + 1, now - SEAT_HORIZON + 1), now + 1):
+            column = second % SEAT_HORIZON
+            self.free_seats += self.released[:, column]
+            self.released[:, column] = 0
+        self.released_until = now
+
+    def _depart(self, customers, reason):
+        # Customers leave the casino, freeing their parking slot
+        if not len(customers):
+            return
+        self.state[customers] = DEPARTED
+        self.departed_at[customers] = self.now
+        self.reason[customers] = reason
+        slots = self.slot[customers]
+        self.slot_taken[slots[slots >= 0]] = False
+
+    def timestamps(self, seconds):
+        # Database timestamps of an array of simulated seconds (each distinct second is formatted once)
+        unique, inverse = np.unique(seconds, return_inverse=True)
+        stamps = np.array([(self.clock.start_time + timedelta(seconds=second)).strftime(TIMESTAMP_FORMAT)
+                           for second in unique.tolist()], dtype=object)
+        return stamps[inverse.ravel()]
+
+    def close(self):
+        # Close the game tables and write every record of the night with one statement per table
+        for ids in self.table_ids:
+            for table_id in ids.tolist():
+                close_game_instance(table_id)
+
+        arrived = np.arange(self.arrived)
+        ids = self.first_id + arrived
+        left = self.departed_at[arrived] >= 0
+        departed_at = np.where(left, self.timestamps(np.maximum(self.departed_at[arrived], 0)), None)
+        reasons = np.where(left, np.array(DEPARTURE_REASONS, dtype=object)[self.reason[arrived]], None)
+        final_balance = np.where(left, self.balance[arrived].astype(object), None)
+        save_customers(list(zip(ids.tolist(), self.initial_balance[arrived].tolist(),
+                                np.array(self.type_names, dtype=object)[self.type[arrived]].tolist(),
+                                self.has_car[arrived].astype(int).tolist(), final_balance.tolist(),
+                                departed_at.tolist(), reasons.tolist())))
+
+        # Customers without a car have a permanence record, drivers a parking record (as in Customer)
+        walkers = arrived[~self.has_car[arrived]]
+        save_permanence_records(list(zip((self.first_id + walkers).tolist(),
+                                         self.timestamps(self.arrival[walkers]).tolist(), departed_at[walkers].tolist())))
+        drivers = arrived[self.parked_at[arrived] >= 0]
+        save_parking_records(list(zip((self.first_id + drivers).tolist(), self.slot[drivers].tolist(),
+                                      self.timestamps(self.parked_at[drivers]).tolist(), departed_at[drivers].tolist())))
+        if self.failed_parkings:
+            customers, seconds = (np.concatenate(column) for column in zip(*self.failed_parkings))
+            save_failed_parkings(list(zip((self.first_id + customers).tolist(), self.timestamps(seconds).tolist())))
+
+        if self.plays:
+            players, tables, bets, won = (np.concatenate(column) for column in zip(*self.plays))
+            results = np.where(won, "won", "lost").tolist()
+            save_game_plays(list(zip((self.first_id + players).tolist(), tables.tolist(), bets.tolist(), results)))
+        if self.bookings:
+            guests, rooms, stays, prices, seconds = zip(*self.bookings)
+            seconds = np.repeat(seconds, [len(guest) for guest in guests])
+            save_bookings(list(zip((self.first_id + np.concatenate(guests)).tolist(), np.concatenate(rooms).tolist(),
+                                   np.concatenate(stays).tolist(), np.concatenate(prices).tolist(),
+                                   self.timestamps(seconds).tolist())))
+        if self.orders:
+            order_ids, customers, place_types, place_ids, totals, seconds = zip(*self.orders)
+            sizes = [len(order) for order in order_ids]
+            orders = zip(np.concatenate(order_ids).tolist(), (self.first_id + np.concatenate(customers)).tolist(),
+                         np.repeat(place_types, sizes).tolist(), np.concatenate(place_ids).tolist(),
+                         np.concatenate(totals).tolist(), self.timestamps(np.repeat(seconds, sizes)).tolist())
+            # Identical items of an order are saved as one row with their quantity, as save_order does
+            order_ids, items = (np.concatenate(column) for column in zip(*self.order_items))
+            keys, quantities = np.unique(order_ids * len(self.menu_ids) + items, return_counts=True)
+            items = zip((keys // len(self.menu_ids)).tolist(), self.menu_ids[keys % len(self.menu_ids)].tolist(),
+                        quantities.tolist())
+            save_orders(list(orders), list(items))
+        close_shared_connection()
+
+    def report(self, elapsed, saved):
+        # Print what happened over the night and how fast it was simulated
+        arrived = np.arange(self.arrived)
+        reasons = np.bincount(self.reason[arrived][self.reason[arrived] >= 0], minlength=len(DEPARTURE_REASONS))
+        inside = int((self.departed_at[arrived] < 0).sum())
+        plays = sum(len(play[0]) for play in self.plays)
+        orders = sum(len(order[0]) for order in self.orders)
+        stays = sum(len(booking[0]) for booking in self.bookings)
+        print(f"Fast mode: {self.arrived} customers over {self.now / 3600:.1f} simulated hours "
+              f"({self.customer_seconds} customer-seconds), {self.steps} customer-steps executed in {elapsed:.2f}s "
+              f"({self.steps / max(elapsed, 1e-9) / 1e6:.2f}M customer-steps/s)")
+        print("Departures: " + ", ".join(f"{count} {reason}" for reason, count in zip(DEPARTURE_REASONS, reasons.tolist()))
+              + f", {inside} still inside")
+        print(f"Games: {plays} plays, orders: {orders}, hotel: {stays} stays and {self.refunds} refunds, "
+              f"parking: {int((self.parked_at >= 0).sum())} cars parked")
+        print(f"Records saved to casino.db in {saved:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the casino simulation as arrays (no actor per customer)")
+    parser.add_argument("--initial-customers", type=int, default=80, help="customers present at opening")
+    parser.add_argument("--max-customers", type=int,
+                        help="total customers for the night (300 by default, no limit with an arrival curve)")
+    parser.add_argument("--arrival-curve", metavar="CURVE",
+                        help=f"arrival rate over the night: {', '.join(RATE_CURVES)} or a JSON file of [hour, customers per hour] "
+                             "points (default: one arrival every 5 to 15 seconds)")
+    parser.add_argument("--arrival-scale", type=float, default=1.0, help="multiplier of the arrival curve's rates")
+    parser.add_argument("--parking-slots", type=int, default=30, help="slots in the parking lot")
+    parser.add_argument("--hotel-rooms", type=int, default=10, help="rooms in the hotel")
+    parser.add_argument("--profiles", nargs="+", metavar="JSON",
+                        help="customer profile files to use instead of the built-in profiles (merged in order)")
+    parser.add_argument("--hours", type=float, help="close the casino after this many simulated hours")
+    parser.add_argument("--seed", type=int, help="seed of the random generator, for a reproducible night")
+    args = parser.parse_args()
+
+    profiles = None
+    if args.profiles:
+        profiles = {}
+        for path in args.profiles:
+            profiles.update(load_profiles(path))
+    casino = FastCasino(parking_slots=args.parking_slots, hotel_rooms=args.hotel_rooms, profiles=profiles, seed=args.seed)
+    arrivals = night_schedule(casino.rng, args.arrival_curve, args.arrival_scale, args.initial_customers,
+                              args.max_customers)
+    casino.run(arrivals, duration=args.hours * 3600 if args.hours is not None else None)
@@ -1,44 +1,253 @@
 import threading
 import random
-import time
-import threading
-import time
-import random
+from collections import deque
+import numpy as np
+from db import save_game_plays
+from simulation import Signal, run_process, run_process_async
+from customer_registry import AT_GAME_TABLE
+
+# Shortest sleep (seconds) of a table waiting for players, so that rounding cannot make it wake up just too early
+MIN_WAIT = 0.01
+
+# WaitList class holds the players waiting for one game table
+class WaitList:
+    def __init__(self, clock, min_seats=1):
+        self.clock = clock  # Clock used to time how long players wait
+        self.players = deque()  # Players in arrival order (O(1) pops from the front)
+        self.joined_at = deque()  # Time at which each queued player joined, in the same order
+        self.lock = threading.Lock()  # Lock guarding the queue
+        self.ready = Signal()  # Wakes the waiting table once enough players are queued
+        self.min_seats = min_seats  # Players needed before the table starts a round without waiting
+        self.closed = False  # Set once the table has closed, no player can join anymore
+
+    def __len__(self):
+        return len(self.players)
+
+    def join(self, player):
+        # Add a player to the queue and wake the table if a round can start
+        # Returns False if the table has closed in the meantime
+        with self.lock:
+            if self.closed:
+                return False
+            self.players.append(player)
+            self.joined_at.append(self.clock.now())
+            ready = len(self.players) >= self.min_seats
+        if ready:
+            self.ready.notify()
+        return True
+
+    def seat(self, capacity, min_seats):
+        # Remove up to capacity players from the queue, or none if fewer than min_seats are waiting
+        with self.lock:
+            if len(self.players) < max(min_seats, 1):
+                return []
+            count = min(len(self.players), capacity)
+            for _ in range(count):
+                self.joined_at.popleft()
+            return [self.players.popleft() for _ in range(count)]
+
+    def drain(self):
+        # Close the queue, removing and returning every queued player
+        with self.lock:
+            self.closed = True
+            players = list(self.players)
+            self.players.clear()
+            self.joined_at.clear()
+        return players
 
-class Game(threading.Thread):
-    def __init__(self, casino, name, capacity, probability, prize, id):
-        # Initialize the game thread and set its attributes
-        super().__init__()
+    def oldest_wait(self, now):
+        # Seconds the first queued player has been waiting (0 if nobody is waiting)
+        with self.lock:
+            return now - self.joined_at[0] if self.joined_at else 0
+
+
+# GameDispatcher class routes the players of a game to its tables (instances)
+# Arriving players go to the least-loaded table, and idle tables steal waiting players from busy ones
+class GameDispatcher:
+    def __init__(self, name, open_table=None):
+        self.name = name  # Name of the game
+        self.instances = []  # Tables of this game
+        self.open_table = open_table  # Opens a table of the game by name (the table manager's), if none is open
+        # Lock guarding the tables, held while one is opened so that two openings cannot both pass the table limit
+        # (reentrant: a new table registers itself with add while its opening holds the lock)
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        # Number of players waiting for this game across all tables
+        return sum(len(game.wait_list) for game in self.instances)
+
+    def add(self, game):
+        # Register a table (adding the same table twice has no effect)
+        with self.lock:
+            if game not in self.instances:
+                self.instances.append(game)
+
+    def remove(self, game):
+        # Stop routing players to a table that is closing
+        with self.lock:
+            if game in self.instances:
+                self.instances.remove(game)
+
+    def join(self, player):
+        # Send the player to the table where they are expected to be seated soonest
+        while True:
+            with self.lock:
+                game = self.choose_instance()
+                if game is None:
+                    game = self.open_table(self.name)  # Every table of the game is closed, open one
+            if game.wait_list.join(player):
+                return
+            # The chosen table closed at the same moment: stop routing to it, so that each retry has one table
+            # fewer to choose from and the loop ends (at worst by opening a table)
+            self.remove(game)
+
+    def choose_instance(self):
+        # A table gathering players for its minimum seat count comes first, so that the round can start
+        for game in self.instances:
+            if 0 < len(game.wait_list) < game.min_seats:
+                return game
+        # Otherwise the least loaded table, spreading ties over the tables that served the fewest players
+        return min(self.instances, key=lambda game: (game.load(), game.players_served), default=None)
+
+    def steal(self, thief):
+        # Give an idle table the players waiting at the most loaded other table
+        with self.lock:
+            others = [game for game in self.instances if game is not thief]
+        victim = max(others, key=lambda game: len(game.wait_list), default=None)
+        if victim is None or not len(victim.wait_list):
+            return []
+        players = victim.wait_list.seat(thief.capacity, thief.min_seats)
+        if players:
+            thief.players_stolen += len(players)
+        return players
+
+    def report(self, now):
+        # Return throughput and utilization counters for every table
+        return [game.counters(now) for game in self.instances]
+
+
+class Game:
+    def __init__(self, casino, name, capacity, probability, prize, id, min_seats=1, max_wait=10):
+        # Initialize the game and set its attributes
         self.casino = casino  # Reference to the casino object where the game is held
         self.name = name  # Name of the game (e.g., Poker, Blackjack)
         self.capacity = capacity  # Maximum number of players allowed in the game
         self.probability = probability  # Probability of the customer winning
         self.prize = prize  # Prize multiplier for a winning player
         self.id = id  # Unique game identifier
+        self.min_seats = min_seats  # Players needed to start a round as soon as they arrive
+        self.max_wait = max_wait  # Seconds a table waits for min_seats before starting with fewer players
+        self.rng = np.random.default_rng()  # Random generator used to draw a whole round at once
+        self.wait_list = WaitList(casino.clock, min_seats)  # Players queued for this table
+        self.busy = False  # Whether a round is being played
+        self.idle_since = None  # Clock time since which the table has had nothing to do
+        self.closed = False  # Set when the table manager closes the table
+        # Counters for throughput and utilization
+        self.opened_at = None  # Clock time at which the table started running
+        self.rounds_played = 0
+        self.players_served = 0
+        self.players_stolen = 0  # Players taken from other tables' queues
+        self.busy_time = 0  # Seconds spent playing rounds
         # Add the game to the casino's game list
         casino.add_game(self)
 
+    def close(self):
+        # Ask the table to stop once its current round is over
+        self.closed = True
+        self.wait_list.ready.notify()  # Wake the table if it is waiting for players
+
+    def idle_for(self, now):
+        # Seconds the table has been waiting for players (0 while it is playing)
+        return now - self.idle_since if self.idle_since is not None else 0
+
+    def load(self):
+        # Expected number of rounds before a newly queued player is seated
+        return len(self.wait_list) / self.capacity + (1 if self.busy else 0)
+
+    def counters(self, now):
+        # Return the table's throughput (players per hour) and utilization (fraction of time playing)
+        elapsed = now - self.opened_at if self.opened_at is not None else 0
+        return {
+            'game': self.name,
+            'id': self.id,
+            'rounds': self.rounds_played,
+            'players': self.players_served,
+            'stolen': self.players_stolen,
+            'throughput': self.players_served * 3600 / elapsed if elapsed > 0 else 0.0,
+            'utilization': self.busy_time / elapsed if elapsed > 0 else 0.0,
+        }
+
     def run(self):
-        # Main thread that handles the running of the game, continuously running as long as needed
-        while True:
-            # Acquire the game lock to ensure no other thread can modify the game during play
-            with self.casino.games[self.name]['lock']:
-                players = len(self.casino.games[self.name]['wait_list'])  # Get the number of players in the waitlist
+        # Run the game on its own thread
+        run_process(self.process(), self.casino.clock)
 
-                if players == 0:
-                    # If no players are in the waitlist, the game will sleep for a random amount of time before checking again
-                    time.sleep(random.randint(1, 10))
-                    continue  # Skip to the next iteration
+    async def run_async(self):
+        # Coroutine equivalent of run() for the asyncio backend
+        await run_process_async(self.process(), self.casino.clock)
 
-                # Determine how many players can actually play based on the game's capacity
-                num_players = min(players, self.capacity)  # Start the game with as many players as the capacity allows
-                print(f"Game {self.name}-{self.id} starting with {num_players} players")
+    def process(self):
+        # Main loop that handles the running of the game, continuously running as long as needed
+        # Written as a generator that yields how many seconds to wait between steps
+        dispatcher = self.casino.games[self.name]
+        self.opened_at = self.idle_since = self.casino.clock.now()
+        while not self.closed:
+            # Take as many players as the capacity allows, once enough of them are waiting here or at another table
+            seated = self.wait_list.seat(self.capacity, self.min_seats) or dispatcher.steal(self)
+            if not seated:
+                # Sleep until enough players arrive, or until the first queued player has waited max_wait seconds
+                oldest_wait = self.wait_list.oldest_wait(self.casino.clock.now())
+                delay = max(self.max_wait - oldest_wait, MIN_WAIT) if len(self.wait_list) else self.max_wait
+                yield self.wait_list.ready.wait(delay)
+                if self.closed:
+                    break
+                # Below min_seats a round starts only once the first player has waited max_wait since joining
+                if self.wait_list.oldest_wait(self.casino.clock.now()) < self.max_wait:
+                    continue  # Enough players arrived, nobody is waiting yet, or the wait is not over
+                seated = self.wait_list.seat(self.capacity, 1)
+                if not seated:
+                    continue  # Another table took them
 
-                # For each player in the game, pop them from the waitlist and allow them to play
-                for _ in range(num_players):
-                    player = self.casino.games[self.name]['wait_list'].pop(0)  # Pop the first player from the waitlist
-                    # Let the player play the game (this simulates the player's actions)
-                    player.play(self.name, self.probability, self.prize, self.id)
+            self.idle_since = None
+            print(f"Game {self.name}-{self.id} starting with {len(seated)} players")
+            # Every seated player plays the same round (no lock is held from here on)
+            self.busy = True
+            self.play_round(seated)
+            duration = random.randint(1, 5)  # Time the round takes
+            yield duration
+            self.busy = False
+            self.rounds_played += 1
+            self.players_served += len(seated)
+            self.busy_time += duration
 
             # Sleep for a random period between game rounds
-            time.sleep(random.randint(1, 5))
+            yield random.randint(1, 5)
+            self.idle_since = self.casino.clock.now()
+
+        # The table is closed: players who were queued here go to the remaining tables
+        for player in self.wait_list.drain():
+            dispatcher.join(player)
+
+    def play_round(self, players):
+        # Resolve a round for all seated players at once
+        # Bets and outcomes are drawn in one vectorized operation, balances are settled per player in a single
+        # step and the round's plays are saved with one database write
+        for player in players:
+            self.casino.locations.move(player, AT_GAME_TABLE)
+        balances = np.array([int(player.get_balance()) for player in players])
+        low = np.minimum([player.profile.min_bet for player in players], balances)  # Bet limits, capped by the balance
+        high = np.minimum([player.profile.max_bet for player in players], balances)
+        bets = self.rng.integers(low, high, endpoint=True)  # Amount each player bets
+        won = self.rng.random(len(players)) < self.probability  # Which players win
+        payouts = np.where(won, bets * self.prize, 0)  # Amount paid back to each player
+
+        plays = []
+        for player, bet, payout, player_won in zip(players, bets.tolist(), payouts.tolist(), won.tolist()):
+            if player.settle(bet, payout):
+                result = "won" if player_won else "lost"
+                print(f"Customer-{player.id} {result} ${bet} at {self.name}-{self.id}.")
+                plays.append((player.id, self.id, bet, result))
+        save_game_plays(plays)
+
+        # Players go back to the casino floor
+        for player in players:
+            self.casino.return_to_floor(player)
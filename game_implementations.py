@@ -1,8 +1,19 @@
 from abc import ABC, abstractmethod
 from game import Game
 import random
-from abc import ABC, abstractmethod
-import random
+
+# Rules of every game: players seated per round, probability that a player wins a round and prize multiplier
+# Poker tables need min_seats players and draw their capacity between min_seats and capacity when they open
+GAME_RULES = {
+    "BlackJack": {'capacity': 5, 'probability': 0.49, 'prize': 2},
+    "Roulette": {'capacity': 30, 'probability': 0.486, 'prize': 2},
+    "Slot Machine": {'capacity': 1, 'probability': 0.1, 'prize': 2},
+    "Craps": {'capacity': 20, 'probability': 0.493, 'prize': 2},
+    "Poker": {'capacity': 10, 'probability': 0.5, 'prize': 2, 'min_seats': 2},
+}
+
+# Rules of a game that is not in GAME_RULES (e.g. named only in a --profiles file)
+DEFAULT_RULES = {'capacity': 5, 'probability': 0.49, 'prize': 2}
 
 # Abstract base class for creating casino games
 class GameFactory(ABC):
@@ -15,32 +26,45 @@ class GameFactory(ABC):
     def create_game(self, id):
         pass  # Each subclass will implement this method to create a specific game
 
+# Factory class for creating the tables of a game that has no factory of its own, from its rules
+class RulesGameFactory(GameFactory):
+    def __init__(self, casino, name):
+        super().__init__(casino)
+        self.name = name  # Name of the game
+
+    def create_game(self, id):
+        # Create and return a new table with the game's rules, or the default rules for an unknown game
+        return Game(self.casino, self.name, id=id, **GAME_RULES.get(self.name, DEFAULT_RULES))
+
 # Factory class for creating BlackJack games
 class BlackJackFactory(GameFactory):
     def create_game(self, id):
         # Create and return a new BlackJack game with specified parameters
-        return Game(self.casino, "BlackJack", capacity=5, probability=0.49, prize=2, id=id)
+        return Game(self.casino, "BlackJack", id=id, **GAME_RULES["BlackJack"])
 
 # Factory class for creating Roulette games
 class RouletteFactory(GameFactory):
     def create_game(self, id):
         # Create and return a new Roulette game with specified parameters
-        return Game(self.casino, "Roulette", capacity=30, probability=0.486, prize=2, id=id)
+        return Game(self.casino, "Roulette", id=id, **GAME_RULES["Roulette"])
 
 # Factory class for creating Slot Machine games
 class SlotMachineFactory(GameFactory):
     def create_game(self, id):
         # Create and return a new Slot Machine game with specified parameters
-        return Game(self.casino, "Slot Machine", capacity=1, probability=0.1, prize=2, id=id)
+        return Game(self.casino, "Slot Machine", id=id, **GAME_RULES["Slot Machine"])
 
 # Factory class for creating Craps games
 class CrapsFactory(GameFactory):
     def create_game(self, id):
         # Create and return a new Craps game with specified parameters
-        return Game(self.casino, "Craps", capacity=20, probability=0.493, prize=2, id=id)
+        return Game(self.casino, "Craps", id=id, **GAME_RULES["Craps"])
 
 # Factory class for creating Poker games
 class PokerFactory(GameFactory):
     def create_game(self, id):
-        # Create and return a new Poker game with random capacity between 2 and 10 players
-        return Game(self.casino, "Poker", capacity=random.randint(2, 10), probability=0.5, prize=2, id=id)
+        # Create and return a new Poker game with random capacity between 2 and 10 players (see GAME_RULES)
+        # A poker round needs at least two players, tables wait up to max_wait seconds for the second one
+        rules = dict(GAME_RULES["Poker"])
+        rules['capacity'] = random.randint(rules['min_seats'], rules['capacity'])
+        return Game(self.casino, "Poker", id=id, **rules)
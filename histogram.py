@@ -0,0 +1,73 @@
+import threading
+
+# Smallest duration the histograms tell apart, in seconds
+RESOLUTION = 0.001
+
+# Bits of precision kept per bucket: 5 bits means buckets are at most 1/16 (about 6%) of their value wide
+SIGNIFICANT_BITS = 5
+
+# Order lifecycle durations kept for every venue
+LIFECYCLE_METRICS = ("queue_wait", "service_time", "completion")
+
+
+def bucket_of(value):
+    # Return the bucket of a value (seconds): its number of RESOLUTION units with the low bits cleared
+    units = int(value / RESOLUTION)
+    shift = max(units.bit_length() - SIGNIFICANT_BITS, 0)
+    return (units >> shift) << shift
+
+
+def bucket_value(bucket):
+    # Return the highest value (seconds) that falls in a bucket
+    shift = max(bucket.bit_length() - SIGNIFICANT_BITS, 0)
+    return (bucket + (1 << shift) - 1) * RESOLUTION
+
+
+# LatencyHistogram class counts durations in log-linear buckets, like an HDR histogram
+# Recording is O(1) and the memory used grows with the range of values, not with their number, so
+# percentiles of millions of orders can be kept in memory and saved in a few rows.
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = {}  # Bucket (lowest value, in RESOLUTION units) -> number of values
+        self.total = 0  # Number of values recorded
+        self.sum = 0  # Sum of the values recorded (seconds), for the mean
+        self.max = 0  # Largest value recorded (seconds)
+        self.lock = threading.Lock()  # Lock guarding the counts
+
+    def record(self, value):
+        # Count one duration (seconds)
+        bucket = bucket_of(max(value, 0))
+        with self.lock:
+            self.counts[bucket] = self.counts.get(bucket, 0) + 1
+            self.total += 1
+            self.sum += value
+            self.max = max(self.max, value)
+
+    def add_bucket(self, bucket, count):
+        # Merge a bucket count (e.g. read back from the database)
+        with self.lock:
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+            self.total += count
+            self.sum += bucket_value(bucket) * count
+            self.max = max(self.max, bucket_value(bucket))
+
+    def mean(self):
+        return self.sum / self.total if self.total else 0
+
+    def percentile(self, fraction):
+        # Return the value under which the given fraction of the durations fall (0 if nothing was recorded)
+        with self.lock:
+            if not self.total:
+                return 0
+            rank = fraction * self.total
+            seen = 0
+            for bucket in sorted(self.counts):
+                seen += self.counts[bucket]
+                if seen >= rank:
+                    return min(bucket_value(bucket), self.max)
+            return self.max
+
+    def buckets(self):
+        # Return the (bucket, count) pairs, to save the histogram
+        with self.lock:
+            return sorted(self.counts.items())
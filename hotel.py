@@ -1,7 +1,14 @@
+import heapq
+import itertools
 import threading
+from collections import deque
 from db import save_booking
-import threading
-import time
+from customer_registry import IN_HOTEL, IN_HOTEL_LOBBY
+from simulation import Signal, run_process, run_process_async
+
+# Shortest sleep (seconds) of the expiry scheduler, so that rounding cannot make it wake up just too early forever
+MIN_SCHEDULER_DELAY = 0.01
+
 
 # Room class represents a hotel room in the casino
 class Room:
@@ -9,54 +16,160 @@ class Room:
         # Initialize the room with a unique room number and casino reference
         self.room_number = room_number
         self.customer = None  # Initially, no customer is assigned to the room
-        self.lock = threading.Lock()  # Lock to ensure thread-safe access to room status
         self.casino = casino  # Reference to the casino
 
     def book(self, customer, duration_seconds):
-        # Attempt to book the room for a customer
-        with self.lock:  # Ensure thread-safety while checking and assigning the room
-            if self.customer is None:
-                # If the room is not already booked, assign it to the customer
-                self.customer = customer
-                print(f"Customer-{customer.id} booked Room-{self.room_number} for {duration_seconds} seconds.")
-                save_booking(self.room_number, customer, duration_seconds)  # Save the booking in the database
-                with self.casino.customers_lock:
-                    # Remove the customer from the casino's available customer list
-                    self.casino.customers.remove(customer)
-                # Set a timer to de-book the room after the specified duration
-                timer = threading.Timer(duration_seconds, self.de_book)
-                timer.start()
-                return True
-            else:
-                # If the room is already booked, return False
-                return False
+        # Give the room to a customer (the hotel has taken it from its free rooms, so nobody else can book it)
+        self.customer = customer
+        print(f"Customer-{customer.id} booked Room-{self.room_number} for {duration_seconds} seconds.")
+        save_booking(self.room_number, customer, duration_seconds)  # Save the booking in the database
+        self.casino.locations.move(customer, IN_HOTEL)  # The customer leaves the casino floor
 
     def de_book(self):
         # De-book the room when the booking duration expires
-        with self.lock:  # Ensure thread-safety while de-booking
-            if self.customer is None:
-                print(f"The room {self.room_number} was not booked.")
-            else:
-                with self.casino.customers_lock:
-                    # Re-add the customer to the casino's list of available customers
-                    self.casino.customers.append(self.customer)
-                    print(f"The room {self.room_number} is now available, emptied by customer-{self.customer.id}.")
-                self.customer = None  # Room is now available, so set customer to None
+        customer = self.customer
+        self.customer = None  # Room is now available, so set customer to None
+        print(f"The room {self.room_number} is now available, emptied by customer-{customer.id}.")
+        self.casino.return_to_floor(customer)  # The customer goes back to the casino floor
+
+
+# Reservation class is a customer waiting in the hotel lobby for a room to free up
+class Reservation:
+    def __init__(self, customer, duration_seconds, since):
+        self.customer = customer  # Customer who paid for the stay
+        self.duration_seconds = duration_seconds  # Length of the stay
+        self.since = since  # Time at which the customer started waiting
+        self.waiting = True  # Cleared once the customer gets a room or gives up
+
 
 # Hotel class represents the hotel within the casino, managing multiple rooms
+# Free rooms are kept in a pool, so a booking takes O(1) whatever the number of rooms. Checkouts and the
+# timeouts of customers waiting in the lobby sit on one heap, served by the hotel's own actor (a single
+# thread, task or process) instead of a timer per booking.
 class Hotel:
-    def __init__(self, num_rooms, casino, price_per_second=3):
+    def __init__(self, num_rooms, casino, price_per_second=3, max_wait=30):
         # Initialize the hotel with a set number of rooms, the casino reference, and a price per second for bookings
         self.rooms = [Room(i, casino) for i in range(num_rooms)]  # Create a list of rooms in the hotel
+        self.free_rooms = deque(self.rooms)  # Rooms nobody is staying in
+        self.lobby = deque()  # Reservations of customers waiting for a room, in arrival order
+        self.expiries = []  # Heap of (time, sequence, callback, argument): checkouts and lobby timeouts
+        self.sequence = itertools.count()  # Tie-breaker that keeps expiries due at the same time in order
+        self.lock = threading.Lock()  # Lock guarding the free rooms, the lobby, the expiries and the counters
+        self.wakeup = Signal()  # Wakes the expiry scheduler when an earlier expiry is added
         self.price_per_second = price_per_second  # Price per second for booking a room
+        self.max_wait = max_wait  # Longest time (seconds) a customer waits in the lobby before being refunded
         self.casino = casino  # Reference to the casino
+        self.bookings = 0  # Stays started so far
+        self.max_occupied = 0  # Most rooms taken at the same time
+        self.queued = 0  # Customers who had to wait in the lobby
+        self.waited = 0  # Customers who got a room after waiting
+        self.total_wait = 0  # Seconds these customers spent in the lobby, summed
+        self.gave_up = 0  # Customers refunded after waiting max_wait seconds
+        self.max_lobby = 0  # Most customers waiting in the lobby at the same time
 
     def book_room(self, customer, duration_seconds):
-        # Attempt to book a room for the customer
-        for room in self.rooms:
-            # Try to book each room until a free one is found
-            if room.book(customer, duration_seconds):
-                return room  # Return the room that was successfully booked
-        print(f"Customer-{customer.id} could not find a free room.")  # If no room is available
-        customer.increment(duration_seconds * self.price_per_second)  # Refund the customer if no room is available
-        return None  # Return None if no room could be booked
+        # Give the customer a free room, or a place in the lobby until a room frees up
+        # Returns the room booked, or None if the customer has to wait
+        with self.lock:
+            if self.free_rooms:
+                room = self.free_rooms.popleft()
+                self._count_stay()
+            else:
+                room = None
+                self.lobby.append(Reservation(customer, duration_seconds, self.casino.clock.now()))
+                self.queued += 1
+                self.max_lobby = max(self.max_lobby, len(self.lobby))
+                self.casino.locations.move(customer, IN_HOTEL_LOBBY)  # The customer leaves the casino floor
+                earliest = self._schedule(self.max_wait, self._give_up, self.lobby[-1])
+        if room is None:
+            print(f"No free room, customer-{customer.id} waits in the lobby for up to {self.max_wait} seconds.")
+            if earliest:
+                self.wakeup.notify()
+            return None
+        self._start_stay(room, customer, duration_seconds)
+        return room
+
+    def _count_stay(self):
+        # Count a stay starting (called with the lock held)
+        self.bookings += 1
+        self.max_occupied = max(self.max_occupied, len(self.rooms) - len(self.free_rooms))
+
+    def _schedule(self, delay, callback, argument):
+        # Add an expiry (called with the lock held), returns whether it is now the first one due
+        sequence = next(self.sequence)
+        heapq.heappush(self.expiries, (self.casino.clock.now() + delay, sequence, callback, argument))
+        return self.expiries[0][1] == sequence
+
+    def _start_stay(self, room, customer, duration_seconds):
+        # Put the customer in the room and schedule the checkout
+        customer.booked_room = room
+        room.book(customer, duration_seconds)
+        with self.lock:
+            earliest = self._schedule(duration_seconds, self._check_out, room)
+        if earliest:
+            self.wakeup.notify()
+
+    def _check_out(self, room):
+        # End a stay, then give the room to the first customer still waiting in the lobby
+        room.de_book()
+        with self.lock:
+            reservation = self.lobby.popleft() if self.lobby else None  # Customers who gave up have left the lobby
+            if reservation is None:
+                self.free_rooms.append(room)
+            else:
+                reservation.waiting = False
+                self.waited += 1
+                self.total_wait += self.casino.clock.now() - reservation.since
+                self._count_stay()
+        if reservation is not None:
+            self._start_stay(room, reservation.customer, reservation.duration_seconds)
+
+    def _give_up(self, reservation):
+        # Send a customer who waited too long in the lobby back to the floor, with a refund
+        with self.lock:
+            if not reservation.waiting:
+                return  # The customer got a room in time
+            reservation.waiting = False
+            self.lobby.remove(reservation)  # Usually the first in line, every customer waits max_wait at most
+            self.gave_up += 1
+        customer = reservation.customer
+        print(f"Customer-{customer.id} could not find a free room.")
+        customer.increment(reservation.duration_seconds * self.price_per_second)  # Refund the customer
+        self.casino.return_to_floor(customer)
+
+    def report(self):
+        # Return the occupancy and lobby counters of the hotel
+        with self.lock:
+            return {
+                'rooms': len(self.rooms),
+                'occupied': len(self.rooms) - len(self.free_rooms),
+                'max_occupied': self.max_occupied,
+                'bookings': self.bookings,
+                'queued': self.queued,
+                'waited': self.waited,
+                'mean_wait': self.total_wait / self.waited if self.waited else 0,
+                'gave_up': self.gave_up,
+                'max_lobby': self.max_lobby,
+            }
+
+    def run(self):
+        # Run the expiry scheduler on its own thread
+        run_process(self.process(), self.casino.clock)
+
+    async def run_async(self):
+        # Coroutine equivalent of run() for the asyncio backend
+        await run_process_async(self.process(), self.casino.clock)
+
+    def process(self):
+        # Expiry scheduler: run the checkouts and lobby timeouts that are due, then sleep until the next one
+        while True:
+            now = self.casino.clock.now()
+            due = []
+            with self.lock:
+                while self.expiries and self.expiries[0][0] <= now:
+                    due.append(heapq.heappop(self.expiries))
+                delay = max(self.expiries[0][0] - now, MIN_SCHEDULER_DELAY) if self.expiries else None
+            for _, _, callback, argument in due:
+                callback(argument)
+            if not due:
+                yield self.wakeup.wait(delay)
@@ -0,0 +1,138 @@
+import threading
+from clock import get_clock
+from order_queue import OrderQueue
+from simulation import run_process, run_process_async
+
+
+# Task class is one item of a restaurant order, prepared at the station of its type
+class Task:
+    def __init__(self, order, item):
+        self.order = order  # Order the item belongs to
+        self.item = item  # Item to prepare
+        self.customer = order.customer  # Customer who ordered it (used by the vip scheduling policy)
+        self.status = 'waiting'
+        self.placed_at = None  # Time at which the task reached its station
+        self.queued_at = None  # Time at which the task was queued at its station
+        self.queue_wait = None  # Seconds the task waited for a cook
+        self.completed_at = None  # Time at which the item was ready
+        self.status_times = {}  # Time at which the task reached each status
+
+    def set_status(self, status):
+        self.status = status  # Only the cook working on the task changes it
+        self.status_times[status] = get_clock().now()
+
+    def get_estimated_time(self):
+        return self.item.prep_time
+
+
+# Station class is one kind of workplace in a kitchen (grill, oven, drinks...) with a number of cooks
+class Station:
+    def __init__(self, name, capacity, policy="fifo"):
+        self.name = name  # Type of the station, matching Item.station
+        self.capacity = capacity  # Items the station can prepare at the same time (one cook each)
+        self.tasks = OrderQueue(get_clock(), policy)  # Items waiting for a cook
+        self.lock = threading.Lock()  # Lock guarding the busy time
+        self.busy_time = 0  # Seconds spent preparing items, summed over the cooks
+
+    def add_busy_time(self, seconds):
+        with self.lock:
+            self.busy_time += seconds
+
+    def report(self, now):
+        # Return the utilization of the station and the waiting time of its items
+        row = self.tasks.report()
+        with self.lock:
+            row['station'] = self.name
+            row['capacity'] = self.capacity
+            row['utilization'] = self.busy_time / (self.capacity * now) if now else 0
+        return row
+
+
+# Kitchen class splits restaurant orders into item tasks that the stations prepare in parallel
+# An order is handed to the waiters (the restaurant's orders queue) once its last item is ready.
+class Kitchen:
+    def __init__(self, restaurant, capacities, policy="fifo"):
+        self.restaurant = restaurant  # Restaurant the kitchen cooks for
+        self.stations = {name: Station(name, capacity, policy) for name, capacity in capacities.items()}
+        self.lock = threading.Lock()  # Lock guarding the closing and the number of cooks still working
+        self.closed = False  # Set at closing time, no order can be submitted anymore
+        self.cooks_working = 0  # Cooks started and not yet gone home
+
+    def cooks(self):
+        # Create one cook per unit of capacity of every station
+        return [Cook(i, station, self) for station in self.stations.values() for i in range(station.capacity)]
+
+    def submit(self, order):
+        # Send every item of the order to its station, returns False if the kitchen is closed
+        # The items are queued under the kitchen lock, so the kitchen cannot close with only some of them queued
+        tasks = [Task(order, item) for item in order.items]
+        with self.lock:
+            if self.closed:
+                return False
+            for task in tasks:
+                self.stations[task.item.station].tasks.put(task)
+        return True
+
+    def item_ready(self, task):
+        # Called by a cook when an item is ready: the order goes to the waiters with its last item
+        if task.order.item_done():
+            task.order.set_status("ready")
+            self.restaurant.orders.put(task.order)
+
+    def close(self):
+        # Stop accepting orders, the cooks finish the queued items and go home
+        with self.lock:
+            self.closed = True
+        for station in self.stations.values():
+            station.tasks.close()
+
+    def cook_started(self):
+        with self.lock:
+            self.cooks_working += 1
+
+    def cook_stopped(self):
+        # The waiters go home once the last cook has left and every ready order is delivered
+        with self.lock:
+            self.cooks_working -= 1
+            last = self.cooks_working == 0
+        if last:
+            self.restaurant.orders.close()
+
+    def report(self, now):
+        # Return the utilization of every station
+        return [station.report(now) for station in self.stations.values()]
+
+
+# Cook class prepares the items of one kitchen station, one at a time
+class Cook:
+    def __init__(self, id, station, kitchen, idle_timeout=60):
+        self.id = id  # Cook's ID within the station
+        self.station = station  # Station the cook works at
+        self.kitchen = kitchen  # Kitchen the station belongs to
+        self.idle_timeout = idle_timeout  # Longest sleep (seconds) without an item before checking again
+
+    def run(self):
+        # Worker thread that prepares items
+        run_process(self.process(), get_clock())
+
+    async def run_async(self):
+        # Coroutine equivalent of run() for the asyncio backend
+        await run_process_async(self.process(), get_clock())
+
+    def process(self):
+        # Take items from the station queue, yielding the seconds spent waiting or preparing
+        self.kitchen.cook_started()
+        while True:
+            task = self.station.tasks.get()
+            if task is None:
+                if self.station.tasks.closed:
+                    break  # The kitchen has closed and every item is done
+                yield self.station.tasks.wait(self.idle_timeout)
+                continue
+            task.set_status("in_progress")
+            task.order.set_status("in_progress")
+            yield task.item.prep_time
+            self.station.add_busy_time(task.item.prep_time)
+            self.station.tasks.complete(task)
+            self.kitchen.item_ready(task)
+        self.kitchen.cook_stopped()
@@ -0,0 +1,144 @@
+import heapq
+import itertools
+import threading
+from histogram import LatencyHistogram, LIFECYCLE_METRICS
+from simulation import Signal
+
+# Customer types whose orders go first with the "vip" policy
+VIP_TYPES = {"vip", "rich_player"}
+
+# Seconds of estimated preparation time an order is forgiven per second it waits, with the "aging" policy
+AGING_RATE = 0.5
+
+
+# Scheduling policies: each gives the priority of an order queued at the given time, smallest first
+def fifo_priority(order, queued_at):
+    # First come, first served
+    return queued_at
+
+
+def sjf_priority(order, queued_at):
+    # Shortest estimated job first (ties in arrival order)
+    return order.get_estimated_time()
+
+
+def vip_priority(order, queued_at):
+    # VIP and rich customers first, everyone in arrival order within their class
+    return (0 if order.customer.type in VIP_TYPES else 1, queued_at)
+
+
+def aging_priority(order, queued_at):
+    # Shortest job first, but every second spent waiting lowers the priority by AGING_RATE so that long
+    # orders cannot starve. estimated - AGING_RATE * (now - queued_at) orders the queue the same way
+    # at any time, so the priority can be computed once, when the order is queued.
+    return order.get_estimated_time() + AGING_RATE * queued_at
+
+
+POLICIES = {
+    "fifo": fifo_priority,
+    "sjf": sjf_priority,
+    "vip": vip_priority,
+    "aging": aging_priority,
+}
+
+
+# OrderQueue class holds the orders waiting at a bar or restaurant until a barista or waiter takes them
+# Staff sleep on the queue's signal and wake up as soon as an order arrives, on any backend.
+# Orders are kept in a heap and taken in the order of the scheduling policy.
+class OrderQueue:
+    def __init__(self, clock, policy="fifo"):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown order scheduling policy: {policy}")
+        self.clock = clock  # Clock used to time how long orders wait
+        self.policy = policy  # Name of the scheduling policy
+        self.priority = POLICIES[policy]  # Priority function of the policy
+        self.orders = []  # Heap of (priority, sequence, order)
+        self.sequence = itertools.count()  # Tie-breaker that keeps orders of equal priority in arrival order
+        self.lock = threading.Lock()  # Lock guarding the queue and its counters
+        self.ready = Signal()  # Wakes one idle worker when an order arrives
+        self.closed = False  # Set at closing time, no order can be placed anymore
+        self.orders_received = 0  # Orders placed so far
+        self.orders_taken = 0  # Orders taken by a worker so far
+        self.total_wait = 0  # Seconds the taken orders spent in the queue, summed
+        self.max_wait = 0  # Longest time an order spent in the queue
+        self.max_depth = 0  # Largest number of orders queued at the same time
+        # Durations of the finished orders: waiting before being started, from start to completion, and in total
+        self.histograms = {metric: LatencyHistogram() for metric in LIFECYCLE_METRICS}
+
+    def __len__(self):
+        return len(self.orders)
+
+    def put(self, order):
+        # Queue an order and wake an idle worker
+        # Returns False if the queue has been closed
+        with self.lock:
+            if self.closed:
+                return False
+            order.queued_at = self.clock.now()
+            if order.placed_at is None:
+                order.placed_at = order.queued_at  # Orders placed earlier (e.g. sent to a kitchen) keep that time
+            heapq.heappush(self.orders, (self.priority(order, order.queued_at), next(self.sequence), order))
+            self.orders_received += 1
+            self.max_depth = max(self.max_depth, len(self.orders))
+        self.ready.notify()
+        return True
+
+    def get(self):
+        # Take the order that goes first without waiting, None if the queue is empty
+        with self.lock:
+            if self.orders:
+                order = heapq.heappop(self.orders)[2]
+                self._record_wait(order)
+                return order
+            closed = self.closed
+        if closed:
+            self.ready.notify()  # Pass the closing on to the next idle worker
+        return None
+
+    def _record_wait(self, order):
+        # Record how long an order waited before a worker started on it (called with the lock held)
+        order.queue_wait = self.clock.now() - order.queued_at
+        self.orders_taken += 1
+        self.total_wait += order.queue_wait
+        self.max_wait = max(self.max_wait, order.queue_wait)
+
+    def complete(self, order):
+        # Mark an order as processed once its last item is finished, and record its lifecycle durations
+        order.completed_at = self.clock.now()
+        order.set_status("processed")
+        started_at = order.status_times.get("in_progress", order.completed_at)
+        self.histograms["queue_wait"].record(started_at - order.placed_at)
+        self.histograms["service_time"].record(order.completed_at - started_at)
+        self.histograms["completion"].record(order.completed_at - order.placed_at)
+
+    def oldest_wait(self, now):
+        # Seconds the longest-waiting queued order has been waiting (0 if the queue is empty)
+        with self.lock:
+            return now - min(entry[2].queued_at for entry in self.orders) if self.orders else 0
+
+    def wait(self, timeout=None):
+        # Return the request a worker yields to sleep until an order arrives (or the timeout, in seconds)
+        return self.ready.wait(timeout)
+
+    def close(self):
+        # Refuse new orders and wake the workers: they finish the queued orders, then stop
+        with self.lock:
+            self.closed = True
+        self.ready.notify()
+
+    def report(self):
+        # Return the queue depth, waiting time and completion time counters
+        completion = self.histograms["completion"]
+        with self.lock:
+            return {
+                'policy': self.policy,
+                'depth': len(self.orders),
+                'max_depth': self.max_depth,
+                'orders': self.orders_taken,
+                'mean_wait': self.total_wait / self.orders_taken if self.orders_taken else 0,
+                'max_wait': self.max_wait,
+                'completed': completion.total,
+                'mean_completion': completion.mean(),
+                'p95_completion': completion.percentile(0.95),
+                'p99_completion': completion.percentile(0.99),
+            }
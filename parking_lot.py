@@ -1,19 +1,24 @@
 import threading
-import random
-import time
+from collections import deque
+from clock import get_clock
 from db import save_parking_record, close_parking_record
-import threading
-import time
-import random
+from simulation import Signal
 
 # Car class represents a customer's car in the casino parking lot
 class Car:
+    __slots__ = ("customer_id", "parked", "slot", "parking_record_id", "parking", "waiting", "waiting_since",
+                 "slot_ready")  # No __dict__: most customers come by car
+
     def __init__(self, customer_id):
         # Initialize the car with a unique customer ID
         self.customer_id = customer_id
         self.parked = False  # Initially, the car is not parked
         self.slot = None  # The car is not parked in any slot
         self.parking_record_id = None  # No parking record exists initially
+        self.parking = None  # Parking lot the car is parked in (or waiting at)
+        self.waiting = False  # Whether the car is in the queue for a free slot
+        self.waiting_since = None  # Time at which the car joined the queue
+        self.slot_ready = Signal()  # Wakes the driver when a slot is handed to the car
 
     def enter(self):
         # Simulate the car entering the parking lot
@@ -23,28 +28,25 @@ class Car:
         # Simulate the car exiting the parking lot
         print(f"Customer-{self.customer_id} is exiting the Parking")
 
-    def park(self, parking):
-        # Attempt to park the car in the parking lot
-        self.enter()
-        attempts = 0
-        max_attempts = 3  # Maximum number of attempts to find an available parking slot
-
-        while attempts < max_attempts:
-            random.shuffle(parking.list_slots)  # Shuffle the list of slots randomly for each attempt
-            for slot in parking.list_slots:
-                with slot.lock:  # Lock the parking slot to ensure thread safety
-                    if slot.available():  # Check if the slot is available
-                        slot.occupy(self)  # Occupy the slot with the car
-                        self.parking_record_id = save_parking_record(self.customer_id, slot.id)  # Save the parking record
-                        return True  # Successfully parked the car
-
-            attempts += 1  # Increment the attempt counter if no slot was available
-            print(
-                f"No slots available (attempt {attempts}/{max_attempts}), customer {self.customer_id} keeps waiting...")
-            time.sleep(random.randrange(1, 10))  # Wait for a random time before trying again
-
-        print(f"Customer {self.customer_id} gave up after {max_attempts} attempts.")  # Failed to park after max attempts
-        return False  # Return False if the car could not be parked
+    def try_park(self, parking):
+        # Take a free slot of the parking lot if there is one, returns whether the car was parked
+        if not parking.acquire(self):
+            return False
+        self.parking_record_id = save_parking_record(self.customer_id, self.slot.id)  # Save the parking record
+        return True
+
+    def wait_for_slot(self, parking, timeout):
+        # Queue for the next slot that frees up, returns the request the driver yields to sleep until then
+        # (or until the timeout, in seconds)
+        parking.join_queue(self)
+        return self.slot_ready.wait(timeout)
+
+    def stop_waiting(self):
+        # Called when the driver wakes up: returns whether a slot was handed over, otherwise leaves the queue
+        if not self.parking.leave_queue(self):
+            return False
+        self.parking_record_id = save_parking_record(self.customer_id, self.slot.id)  # Save the parking record
+        return True
 
     def de_park(self):
         # Attempt to de-park the car and vacate the parking slot
@@ -52,8 +54,7 @@ class Car:
         if not slot:
             print(f"Customer-{self.customer_id} does not have a car parked")  # No car is parked
         else:
-            with slot.lock:  # Lock the slot to ensure thread safety while vacating
-                slot.vacate(self)  # Vacate the parking slot
+            self.parking.release(self)  # Vacate the parking slot, or hand it to the next car in the queue
             self.exit()  # Simulate the car exiting the parking lot
 
             # Close the parking record if it exists
@@ -67,12 +68,12 @@ class ParkingSlot:
         # Initialize the parking slot with a unique ID
         self.id = id
         self.car = None  # No car is occupying the slot initially
-        self.lock = threading.Lock()  # Lock to ensure thread-safe access to the slot
 
     def occupy(self, car):
         # Occupy the parking slot with a car
         print(f"Customer-{car.customer_id} is occupying slot {self.id}")
         car.slot = self  # Set the car's slot to this one
+        car.parked = True
         self.car = car  # Set this slot's car to the given car
 
     def vacate(self, car):
@@ -80,21 +81,114 @@ class ParkingSlot:
         print(f"Customer-{car.customer_id} is vacating slot {self.id}")
         self.car = None  # No car in the slot now
         car.slot = None  # The car is no longer assigned to this slot
+        car.parked = False
 
     def available(self):
         # Check if the slot is available (i.e., no car is parked in it)
         return self.car is None
 
 # Parking class represents the parking lot of the casino
+# Free slots are kept in a pool, so taking and freeing a slot are O(1) whatever the size of the lot.
+# Drivers who find the lot full wait in line: a freed slot goes straight to the first car still waiting.
 class Parking:
-    def __init__(self):
-        # Initialize the parking lot with a list of cars and slots
-        self.list_cars = []  # List to store all cars in the parking lot
-        self.list_slots = [ParkingSlot(id) for id in range(30)]  # Create 30 parking slots (you can change this number)
-
-
-
-
-
-
-
+    def __init__(self, capacity=30):
+        # Initialize the parking lot with the given number of slots, all free
+        self.capacity = capacity
+        self.slots = [ParkingSlot(id) for id in range(capacity)]
+        self.free = deque(self.slots)  # Slots nobody is parked in
+        self.queue = deque()  # Cars waiting for a slot, in arrival order (cars that gave up are skipped)
+        self.in_line = 0  # Cars in the queue still waiting (the queue may hold cars that gave up)
+        self.lock = threading.Lock()  # Lock guarding the free slots, the queue and the counters
+        self.parked = 0  # Cars parked so far
+        self.max_occupied = 0  # Most slots taken at the same time
+        self.queued = 0  # Cars that had to wait for a slot
+        self.timed_out = 0  # Cars that gave up waiting
+        self.waited = 0  # Cars that got a slot after waiting
+        self.total_wait = 0  # Seconds these cars spent in the queue, summed
+        self.max_queue = 0  # Longest queue of cars
+
+    def acquire(self, car):
+        # Park the car in a free slot without waiting, returns False if the lot is full
+        with self.lock:
+            self._drop_gave_up()
+            if not self.free or self.in_line:
+                return False  # Cars already waiting go first
+            self._assign(car, self.free.popleft())
+        return True
+
+    def _assign(self, car, slot):
+        # Give a slot to a car (called with the lock held)
+        slot.occupy(car)
+        car.parking = self
+        self.parked += 1
+        self.max_occupied = max(self.max_occupied, self.capacity - len(self.free))
+
+    def join_queue(self, car):
+        # Put a car at the end of the line for a slot
+        with self.lock:
+            car.parking = self
+            car.waiting = True
+            car.waiting_since = get_clock().now()
+            self._drop_gave_up()
+            self.queue.append(car)
+            self.in_line += 1
+            self.queued += 1
+            self.max_queue = max(self.max_queue, self.in_line)
+        if self.free:
+            self._hand_over()  # A slot was freed before the car joined the line
+
+    def leave_queue(self, car):
+        # Take a car out of the line once its driver wakes up, returns whether it was given a slot meanwhile
+        with self.lock:
+            if car.slot is not None:
+                return True
+            car.waiting = False  # The car is skipped when it comes to the front of the queue
+            self.in_line -= 1
+            self.timed_out += 1
+        return False
+
+    def _drop_gave_up(self):
+        # Remove the cars that gave up from the front of the queue (called with the lock held)
+        while self.queue and not self.queue[0].waiting:
+            self.queue.popleft()
+
+    def release(self, car):
+        # Free the car's slot and hand it to the first car still waiting
+        with self.lock:
+            slot = car.slot
+            slot.vacate(car)
+            self.free.append(slot)
+        self._hand_over()
+
+    def _hand_over(self):
+        # Give the free slots to the cars waiting in line, waking their drivers
+        woken = []
+        with self.lock:
+            now = get_clock().now()
+            while self.free and self.queue:
+                car = self.queue.popleft()
+                if not car.waiting:
+                    continue  # The driver gave up
+                car.waiting = False
+                self.in_line -= 1
+                self.waited += 1
+                self.total_wait += now - car.waiting_since
+                self._assign(car, self.free.popleft())
+                woken.append(car)
+        for car in woken:
+            car.slot_ready.notify()
+
+    def report(self):
+        # Return the occupancy and waiting counters of the parking lot
+        with self.lock:
+            return {
+                'capacity': self.capacity,
+                'occupied': self.capacity - len(self.free),
+                'max_occupied': self.max_occupied,
+                'parked': self.parked,
+                'queued': self.queued,
+                'timed_out': self.timed_out,
+                'max_queue': self.max_queue,
+                'waited': self.waited,
+                'mean_wait': self.total_wait / self.waited if self.waited else 0,
+            }
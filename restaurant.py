@@ -1,16 +1,22 @@
-import random
 import threading
-import time
-import threading
-import time
+from clock import get_clock
+from db import save_order_timing
+from kitchen import Kitchen
+from order_queue import OrderQueue
+from simulation import run_process, run_process_async
+from customer_registry import IN_RESTAURANT
+
+# Seconds a waiter needs to bring a ready order to the table
+DELIVERY_TIME = 1
 
 # Item class represents a single menu item (food or drink)
 class Item:
-    def __init__(self, name, price, prep_time):
-        # Initialize the item with its name, price, and preparation time
+    def __init__(self, name, price, prep_time, station):
+        # Initialize the item with its name, price, preparation time and the kitchen station that prepares it
         self.name = name
         self.price = price
         self.prep_time = prep_time  # Time it takes to prepare the item in seconds
+        self.station = station  # Kitchen station type (e.g., grill, oven, drinks)
 
 # Menu class represents a collection of items available in a restaurant
 class Menu:
@@ -18,9 +24,9 @@ class Menu:
         # Initialize the menu with an empty list of products (items)
         self.products = []
 
-    def add_product(self, product: str, price: float, prep_time):
+    def add_product(self, product: str, price: float, prep_time, station):
         # Add a new product (item) to the menu
-        self.products.append(Item(product, price, prep_time))
+        self.products.append(Item(product, price, prep_time, station))
 
 # Order class represents an order placed by a customer
 class Order:
@@ -30,15 +36,30 @@ class Order:
         self.lock = threading.Lock()  # Lock to ensure thread-safe access to order status
         self.items = []  # List of items in the order
         self.customer = customer  # The customer who placed the order
+        self.placed_at = None  # Time at which the order was sent to the kitchen
+        self.queued_at = None  # Time at which the order was ready to be delivered
+        self.queue_wait = None  # Seconds the ready order waited before a waiter took it
+        self.completed_at = None  # Time at which the order was delivered
+        self.remaining = 0  # Items the kitchen has not finished yet
+        self.status_times = {}  # Time at which the order first reached each status
+        self.record_id = None  # Row of the order in order_record, once saved
 
     def set_status(self, status):
-        # Change the status of the order (e.g., waiting, in progress, processed)
+        # Change the status of the order (e.g., waiting, in progress, ready, processed)
         with self.lock:
             self.status = status
+            self.status_times.setdefault(status, get_clock().now())  # Keep the first time of each status
 
     def add_item(self, item):
         # Add an item to the order
         self.items.append(item)
+        self.remaining += 1
+
+    def item_done(self):
+        # Count one more item ready in the kitchen, returns True when it was the last one
+        with self.lock:
+            self.remaining -= 1
+            return self.remaining == 0
 
     def get_total(self):
         # Calculate the total price of all items in the order
@@ -50,10 +71,11 @@ class Order:
 
 # Restaurant class represents a restaurant in the casino with a menu, tables, and customers
 class Restaurant:
-    def __init__(self, menu, name, num_tables, casino):
+    def __init__(self, menu, name, num_tables, casino, stations, policy="fifo"):
         # Initialize the restaurant with its menu, name, number of tables, and reference to the casino
         self.menu = menu
-        self.orders = []  # List to store orders placed at the restaurant
+        self.orders = OrderQueue(get_clock(), policy)  # Queue of ready orders waiting for a waiter, in policy order
+        self.kitchen = Kitchen(self, stations, policy)  # Stations preparing the items, in policy order
         self.lock = threading.Lock()  # Lock to ensure thread-safety for seating customers
         self.name = name  # The name of the restaurant
         self.num_tables = num_tables  # Number of tables in the restaurant
@@ -69,66 +91,81 @@ class Restaurant:
             self.lock.release()
             return False
         # If a table is available, seat the customer
-        self.casino.customers_lock.acquire()
-        self.casino.customers.remove(customer)  # Remove the customer from the casino's available customers list
         self.customers += 1  # Increment the number of customers seated
-        print(f"Customer-{customer.id} was seated at {self.name}.")
-        self.casino.customers_lock.release()
         self.lock.release()
+        self.casino.locations.move(customer, IN_RESTAURANT)  # The customer leaves the casino floor
+        print(f"Customer-{customer.id} was seated at {self.name}.")
         return True
 
     def de_seat_customer(self, customer):
         # Remove a customer from the restaurant and free up their table
         self.lock.acquire()
-        self.casino.customers_lock.acquire()
         self.customers -= 1  # Decrease the number of seated customers
-        self.casino.customers.append(customer)  # Add the customer back to the casino's list of available customers
-        print(f"Customer-{customer.id} left {self.name}.")
-        self.casino.customers_lock.release()
         self.lock.release()
+        self.casino.return_to_floor(customer)  # The customer goes back to the casino floor
+        print(f"Customer-{customer.id} left {self.name}.")
+
+    def add_order(self, order):
+        # Send an order to the kitchen, returns False if the restaurant is closed
+        order.placed_at = self.orders.clock.now()
+        order.set_status("waiting")
+        return self.kitchen.submit(order)
 
-# Waiter class represents a waiter working in the restaurant, serving orders
-class Waiter(threading.Thread):
-    def __init__(self, id, bar):
-        super().__init__()
+    def close(self):
+        # Stop taking orders: the cooks finish the queued items, the waiters deliver them and go home
+        self.kitchen.close()
+
+# Waiter class represents a waiter working in the restaurant, delivering the orders the kitchen has prepared
+class Waiter:
+    def __init__(self, id, restaurant, idle_timeout=60):
         self.id = id  # The unique identifier for the waiter
-        self.bar = bar  # Reference to the bar (or restaurant) where the waiter works
+        self.restaurant = restaurant  # Reference to the restaurant where the waiter works
+        self.idle_timeout = idle_timeout  # Longest sleep (seconds) without an order before checking again
+        self.retired = False  # Set by the staffing controller, the waiter leaves after the current delivery
 
     def run(self):
         # The main thread that keeps processing orders
-        while True:
-            with self.bar.lock:
-                if not self.bar.orders:
-                    # If there are no orders, wait for a moment before checking again
-                    time.sleep(2)
-                    continue
-                order = self.bar.orders.pop(0)  # Get the first order from the queue
-                order.set_status("in_progress")  # Set the order status to 'in progress'
-                print(f"Waiter-{self.id} preparing order for customer-{order.customer.id} will take {order.get_estimated_time()} seconds")
-
-            # Simulate preparing each item in the order
-            for item in order.items:
-                time.sleep(item.prep_time)
-
-            order.set_status("processed")  # Mark the order as processed once it's completed
-            print(f"Waiter-{self.id} done preparing order for customer-{order.customer.id}")
+        run_process(self.process(), get_clock())
+
+    async def run_async(self):
+        # Coroutine equivalent of run() for the asyncio backend
+        await run_process_async(self.process(), get_clock())
+
+    def process(self):
+        # Keep delivering ready orders, yielding the seconds spent waiting or walking to the tables
+        while not self.retired:
+            order = self.restaurant.orders.get()  # Get the first ready order
+            if order is None:
+                if self.restaurant.orders.closed:
+                    break  # The restaurant has closed and every order is delivered
+                # If no order is ready, sleep until the kitchen finishes one
+                yield self.restaurant.orders.wait(self.idle_timeout)
+                continue
+            print(f"Waiter-{self.id} delivering order for customer-{order.customer.id}, ready for {order.queue_wait:.1f}s")
+            yield DELIVERY_TIME
+
+            self.restaurant.orders.complete(order)  # Mark the order as processed once it's delivered
+            save_order_timing(order)
+            print(f"Waiter-{self.id} delivered order for customer-{order.customer.id} {order.completed_at - order.placed_at:.1f}s after it was placed")
 
 # Function to create multiple restaurants with predefined menus
-def create_restaurants(casino):
+def create_restaurants(casino, policy="fifo"):
     # Create menus for two restaurants
     menu1 = Menu()
-    menu1.add_product("Burger", 5.99, 2)
-    menu1.add_product("Fries", 2.99, 1)
-    menu1.add_product("Soda", 1.50, 1)
+    menu1.add_product("Burger", 5.99, 2, "grill")
+    menu1.add_product("Fries", 2.99, 1, "grill")
+    menu1.add_product("Soda", 1.50, 1, "drinks")
 
     menu2 = Menu()
-    menu2.add_product("Pizza", 8.99, 4)
-    menu2.add_product("Salad", 4.99, 2)
-    menu2.add_product("Water", 0.00, 0)
-
-    # Create two restaurants with the menus
-    restaurant1 = Restaurant(menu1, "FastBurger", num_tables=10, casino=casino)
-    restaurant2 = Restaurant(menu2, "PizzaPlace", num_tables=10, casino=casino)
+    menu2.add_product("Pizza", 8.99, 4, "oven")
+    menu2.add_product("Salad", 4.99, 2, "cold")
+    menu2.add_product("Water", 0.00, 0, "drinks")
+
+    # Create two restaurants with the menus and the capacity of each kitchen station
+    restaurant1 = Restaurant(menu1, "FastBurger", num_tables=10, casino=casino,
+                             stations={"grill": 2, "drinks": 1}, policy=policy)
+    restaurant2 = Restaurant(menu2, "PizzaPlace", num_tables=10, casino=casino,
+                             stations={"oven": 2, "cold": 1, "drinks": 1}, policy=policy)
 
     # Return the list of created restaurants
     return [restaurant1, restaurant2]
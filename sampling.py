@@ -0,0 +1,60 @@
+import random
+import numpy as np
+
+
+# AliasSampler class draws items with fixed weights in O(1) per draw (Vose's alias method)
+# The table is built once in O(n): every column holds an item with probability prob[i] and its alias
+# otherwise, so a draw is one column pick and one coin flip, taken from a single random number.
+class AliasSampler:
+    def __init__(self, items, weights):
+        items, weights = list(items), list(weights)
+        total = sum(weights)
+        if not items or total <= 0 or min(weights) < 0:
+            raise ValueError("An alias sampler needs at least one item and non-negative weights with a positive sum")
+        count = len(items)
+        self.items = items  # Items to draw
+        self.prob = [0.0] * count  # Probability of keeping the column's own item
+        self.alias = list(range(count))  # Item drawn instead of the column's own item
+        scaled = [weight * count / total for weight in weights]
+        small = [i for i, weight in enumerate(scaled) if weight < 1]
+        large = [i for i, weight in enumerate(scaled) if weight >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+        for i in small + large:
+            self.prob[i] = 1.0  # Leftovers are full columns (up to rounding)
+
+    def sample(self):
+        # Draw one item: the integer part of a single random number picks the column, the fraction the side
+        u = random.random() * len(self.items)
+        column = int(u)
+        return self.items[column] if u - column < self.prob[column] else self.items[self.alias[column]]
+
+    def probabilities(self):
+        # Return the chance of drawing each item, read back from the table
+        count = len(self.items)
+        chances = dict.fromkeys(self.items, 0.0)
+        for column in range(count):
+            chances[self.items[column]] += self.prob[column] / count
+            chances[self.items[self.alias[column]]] += (1 - self.prob[column]) / count
+        return chances
+
+
+# AliasTable class stacks the alias tables of several distributions over the same items, one row each
+# draw() takes one item for every entry of an array of rows with a handful of NumPy operations, whatever the
+# number of entries, so a whole population can draw at once (see fast_mode.py)
+class AliasTable:
+    def __init__(self, items, distributions):
+        self.items = list(items)  # Items to draw, draws return their index in this list
+        samplers = [AliasSampler(self.items, [chances.get(item, 0) for item in self.items]) for chances in distributions]
+        self.prob = np.array([sampler.prob for sampler in samplers])  # Probability of keeping each column's item
+        self.alias = np.array([sampler.alias for sampler in samplers], dtype=np.intp)  # Item drawn otherwise
+
+    def draw(self, rng, rows):
+        # Draw one item index for each entry of rows (the distribution each entry draws from)
+        u = rng.random(len(rows)) * len(self.items)
+        column = np.minimum(u.astype(np.intp), len(self.items) - 1)  # Rounding can make u reach the width
+        return np.where(u - column < self.prob[rows, column], column, self.alias[rows, column])
@@ -0,0 +1,170 @@
+import asyncio
+import heapq
+import itertools
+import threading
+
+
+# Actors (customers, games, baristas, waiters, the customer spawner) describe their behaviour as
+# "processes": generators that yield the number of seconds they want to wait before continuing,
+# or a Wait (signal.wait(timeout)) to sleep until another actor wakes them up.
+# The same process can then be run on a real thread, as an asyncio task or inside the discrete-event Simulation.
+
+
+# Signal class lets a process sleep until another actor notifies it, on any backend
+# A notification is never lost: if nobody is waiting it is kept until the next wait, which returns immediately.
+# Waking up is only a hint, processes always re-check the state they were waiting for.
+class Signal:
+    __slots__ = ("_lock", "_waiters", "_pending")  # Every customer and car has signals: keep them small
+
+    def __init__(self):
+        self._lock = threading.Lock()  # Lock guarding the waiters and the pending notification
+        self._waiters = []  # Wake-up callbacks of the waiting processes and blocked threads, in arrival order
+        self._pending = False  # Notification received while nobody was waiting
+
+    def wait(self, timeout=None):
+        # Return the request a process yields to wait for a notification (or the timeout, in simulated seconds)
+        return Wait(self, timeout)
+
+    def notify(self):
+        # Wake up one waiter, or remember the notification for the next one
+        while True:
+            with self._lock:
+                if not self._waiters:
+                    self._pending = True
+                    return
+                callback = self._waiters.pop(0)  # Signals have a handful of waiters at most
+            if callback():
+                return  # The callback was still waiting (it may already have timed out)
+
+    def notify_all(self):
+        # Wake every current waiter (e.g. so that they re-check a flag), nothing is remembered if nobody waits
+        with self._lock:
+            callbacks = self._waiters
+            self._waiters = []
+        for callback in callbacks:
+            callback()
+
+    def wait_blocking(self, timeout=None):
+        # Block the calling thread until notified or until the timeout (in real seconds) expires
+        woken = threading.Lock()  # Released by the notification
+        woken.acquire()
+        once = threading.Lock()  # Notification and timeout may race
+
+        def wake():
+            if not once.acquire(blocking=False):
+                return False  # Already timed out
+            woken.release()
+            return True
+
+        self.add_waiter(wake)
+        if not woken.acquire(timeout=-1 if timeout is None else timeout) and once.acquire(blocking=False):
+            self.remove_waiter(wake)  # Timed out before any notification
+
+    def add_waiter(self, callback):
+        # Register a wake-up callback, called immediately if a notification is pending
+        with self._lock:
+            if not self._pending:
+                self._waiters.append(callback)
+                return
+            self._pending = False
+        callback()
+
+    def remove_waiter(self, callback):
+        # Forget a callback whose wait timed out
+        with self._lock:
+            if callback in self._waiters:
+                self._waiters.remove(callback)
+
+
+# Wait class is the request yielded by a process waiting on a Signal
+class Wait:
+    def __init__(self, signal, timeout):
+        self.signal = signal
+        self.timeout = timeout  # Simulated seconds, None to wait until notified
+
+    def on_wake(self, resume, call_later):
+        # Arrange for resume() to be called exactly once, on notification or timeout
+        once = threading.Lock()  # Notification and timeout may race on different threads
+
+        def wake():
+            if not once.acquire(blocking=False):
+                return False  # Already woken
+            resume()
+            return True
+
+        def expire():
+            if wake():
+                self.signal.remove_waiter(wake)
+
+        self.signal.add_waiter(wake)
+        if self.timeout is not None:
+            call_later(self.timeout, expire)
+
+
+def run_process(process, clock):
+    # Drive a process on the calling thread, sleeping on the given clock between steps
+    for step in process:
+        if isinstance(step, Wait):
+            step.signal.wait_blocking(None if step.timeout is None else clock.to_real(step.timeout))
+        else:
+            clock.sleep(step)
+
+
+async def run_process_async(process, clock):
+    # Drive a process as a coroutine, suspending on the event loop between steps
+    for step in process:
+        if isinstance(step, Wait):
+            woken = asyncio.get_running_loop().create_future()
+            step.on_wake(lambda: woken.set_result(None), clock.call_later)
+            await woken
+        else:
+            await asyncio.sleep(clock.to_real(step))
+
+
+# Simulation class is a discrete-event scheduler with a virtual clock
+class Simulation:
+    def __init__(self):
+        self.now = 0.0  # Current virtual time in seconds
+        self._queue = []  # Priority queue of pending events: (time, sequence, callback, args)
+        self._sequence = itertools.count()  # Tie-breaker that keeps events at the same time in FIFO order
+        self._running = False
+        self.events_processed = 0  # Number of events executed so far
+
+    def schedule(self, delay, callback, *args):
+        # Schedule a callback to run after the given virtual delay
+        event = (self.now + delay, next(self._sequence), callback, args)
+        heapq.heappush(self._queue, event)
+        return event
+
+    def start(self, process):
+        # Start a process (generator) at the current virtual time
+        self.schedule(0, self._resume, process)
+
+    def _resume(self, process):
+        # Advance a process to its next yield and schedule it to continue after the requested delay
+        try:
+            step = next(process)
+        except StopIteration:
+            return  # The process has finished
+        if isinstance(step, Wait):
+            step.on_wake(lambda: self.schedule(0, self._resume, process), self.schedule)
+        else:
+            self.schedule(step, self._resume, process)
+
+    def stop(self):
+        # Stop the simulation after the current event
+        self._running = False
+
+    def run(self, until=None):
+        # Execute events in time order until the queue is empty, stop() is called or the time limit is reached
+        self._running = True
+        queue = self._queue
+        while self._running and queue:
+            if until is not None and queue[0][0] > until:
+                self.now = until
+                break
+            event_time, _, callback, args = heapq.heappop(queue)
+            self.now = event_time
+            callback(*args)
+            self.events_processed += 1
+        self._running = False
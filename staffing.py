@@ -0,0 +1,114 @@
+from bar import Barista
+from restaurant import Waiter
+from db import save_staffing_change
+from simulation import run_process, run_process_async
+
+# Staffing bounds and latency target (SLO, seconds an order may wait for a worker) of each kind of venue
+STAFFING_LIMITS = {
+    "bar": {'worker': Barista, 'min_workers': 1, 'max_workers': 6, 'slo': 30},
+    "restaurant": {'worker': Waiter, 'min_workers': 1, 'max_workers': 6, 'slo': 10},
+}
+
+
+# StaffingController class hires baristas and waiters when orders wait too long and retires them when it is calm
+# Hiring reacts at the first check over the SLO; retiring needs several calm checks in a row (hysteresis),
+# so that the staff does not flap around the threshold.
+class StaffingController:
+    def __init__(self, casino, limits=None, check_interval=10, max_queue_per_worker=2, calm_fraction=0.25, calm_checks=3):
+        self.casino = casino  # Reference to the casino
+        self.limits = limits if limits is not None else STAFFING_LIMITS  # Bounds and SLO of each venue type
+        self.check_interval = check_interval  # Seconds between two checks of the queues
+        self.max_queue_per_worker = max_queue_per_worker  # Hire when more orders than this per worker are queued
+        self.calm_fraction = calm_fraction  # Calm means an empty queue and waits under this fraction of the SLO
+        self.calm_checks = calm_checks  # Consecutive calm checks before a worker is retired
+        self.venues = []  # (venue type, venue) pairs under control
+        self.staff = {}  # Venue name -> workers currently employed, most recently hired last
+        self.calm = {}  # Venue name -> consecutive calm checks
+        self.previous = {}  # Venue name -> (orders taken, total wait) at the previous check
+        self.next_id = {}  # Venue name -> id of the next worker hired
+        self.changes = {}  # Venue name -> [hires, retirements, most workers at once]
+
+    def add_venue(self, venue_type, venue):
+        # Put a bar or restaurant under control and hire its minimum staff
+        self.venues.append((venue_type, venue))
+        self.staff[venue.name] = []
+        self.calm[venue.name] = 0
+        self.previous[venue.name] = (0, 0)
+        self.next_id[venue.name] = 0
+        self.changes[venue.name] = [0, 0, 0]
+        for _ in range(self.limits[venue_type]['min_workers']):
+            self.hire(venue_type, venue, 0, 0)
+
+    def hire(self, venue_type, venue, depth, wait):
+        # Start a new worker at the venue
+        worker = self.limits[venue_type]['worker'](self.next_id[venue.name], venue)
+        self.next_id[venue.name] += 1
+        staff = self.staff[venue.name]
+        staff.append(worker)
+        changes = self.changes[venue.name]
+        changes[0] += 1
+        changes[2] = max(changes[2], len(staff))
+        print(f"Staffing: hired worker {worker.id} at {venue.name} ({len(staff)} working, {depth} queued, wait {wait:.1f}s)")
+        save_staffing_change(venue_type, venue.name, 'hire', len(staff), depth, wait)
+        self.casino.start_actor(worker)
+
+    def retire(self, venue_type, venue, depth, wait):
+        # Let the most recently hired worker go home after their current order
+        staff = self.staff[venue.name]
+        worker = staff.pop()
+        worker.retired = True
+        venue.orders.ready.notify_all()  # Wake idle workers so that the retired one notices
+        self.changes[venue.name][1] += 1
+        print(f"Staffing: retired worker {worker.id} at {venue.name} ({len(staff)} working, {depth} queued, wait {wait:.1f}s)")
+        save_staffing_change(venue_type, venue.name, 'retire', len(staff), depth, wait)
+
+    def measure(self, venue, now):
+        # Return the queue depth and the wait to compare with the SLO: the longest of the mean wait of the
+        # orders taken since the previous check and the wait of the oldest order still queued
+        queue = venue.orders
+        with queue.lock:
+            taken, total_wait, depth = queue.orders_taken, queue.total_wait, len(queue.orders)
+        previous_taken, previous_wait = self.previous[venue.name]
+        self.previous[venue.name] = (taken, total_wait)
+        recent_wait = (total_wait - previous_wait) / (taken - previous_taken) if taken > previous_taken else 0
+        return depth, max(recent_wait, queue.oldest_wait(now))
+
+    def check(self):
+        # Hire or retire at most one worker per venue, depending on its queue
+        now = self.casino.clock.now()
+        for venue_type, venue in self.venues:
+            if venue.orders.closed:
+                continue  # The staff is going home
+            limit = self.limits[venue_type]
+            depth, wait = self.measure(venue, now)
+            workers = len(self.staff[venue.name])
+            if workers < limit['max_workers'] and (wait > limit['slo'] or depth > self.max_queue_per_worker * workers):
+                self.calm[venue.name] = 0
+                self.hire(venue_type, venue, depth, wait)
+            elif workers > limit['min_workers'] and depth == 0 and wait < self.calm_fraction * limit['slo']:
+                self.calm[venue.name] += 1
+                if self.calm[venue.name] >= self.calm_checks:
+                    self.calm[venue.name] = 0
+                    self.retire(venue_type, venue, depth, wait)
+            else:
+                self.calm[venue.name] = 0
+
+    def report(self):
+        # Return the staffing changes of every venue
+        return [{'venue': venue.name, 'workers': len(self.staff[venue.name]), 'hires': self.changes[venue.name][0],
+                 'retirements': self.changes[venue.name][1], 'peak': self.changes[venue.name][2]}
+                for _, venue in self.venues]
+
+    def run(self):
+        # Run the staffing controller on its own thread
+        run_process(self.process(), self.casino.clock)
+
+    async def run_async(self):
+        # Coroutine equivalent of run() for the asyncio backend
+        await run_process_async(self.process(), self.casino.clock)
+
+    def process(self):
+        # Check the queues periodically for as long as the casino is open
+        while True:
+            yield self.check_interval
+            self.check()
@@ -6,6 +6,7 @@ import sqlite3
 import os
 import pandas as pd
 import matplotlib.pyplot as plt
+from histogram import LatencyHistogram
 
 # Function to connect to the SQLite database
 def connect_db():
@@ -154,6 +155,13 @@ def main():
     print("\nQuantity of People who Couldn't Park:")
     print(df)
 
+    # Quantity of people who never got in: turned away at a full entrance line, or tired of waiting in it
+    df = pd.read_sql_query('''
+        SELECT reason, COUNT(*) AS customers FROM refused_entry GROUP BY reason;
+    ''', conn)
+    print("\nQuantity of People who Couldn't Get In:")
+    print(df)
+
     # Query to calculate how many customers have a car
     df = pd.read_sql_query('''
         SELECT COUNT(DISTINCT customer_id) AS customers_with_car
@@ -163,6 +171,27 @@ def main():
     print("\nNumber of Customers with a Car:")
     print(df)
 
+    # 13. Order latency percentiles per Bar/Restaurant, merged from the saved histograms (a few rows per venue)
+    rows = conn.execute('''
+        SELECT venue_type, venue_name, metric, bucket, SUM(count)
+        FROM latency_histogram
+        GROUP BY venue_type, venue_name, metric, bucket;
+    ''').fetchall()
+    histograms = {}
+    for venue_type, venue_name, metric, bucket, count in rows:
+        histograms.setdefault((venue_type, venue_name, metric), LatencyHistogram()).add_bucket(bucket, count)
+    df = pd.DataFrame([
+        {'place_type': venue_type, 'place_name': venue_name, 'metric': metric, 'orders': histogram.total,
+         'mean': histogram.mean(), 'p50': histogram.percentile(0.5), 'p95': histogram.percentile(0.95),
+         'p99': histogram.percentile(0.99)}
+        for (venue_type, venue_name, metric), histogram in sorted(histograms.items())
+    ], columns=['place_type', 'place_name', 'metric', 'orders', 'mean', 'p50', 'p95', 'p99'])
+    print("\nOrder Latency Percentiles per Bar/Restaurant (seconds):")
+    print(df)
+    # Plot the p95 completion time per bar/restaurant
+    completion = df[df['metric'] == 'completion']
+    plot_bar(completion['place_name'], completion['p95'], "p95 Order Completion Time per Bar/Restaurant", "Place Name", "Seconds")
+
     conn.close()  # Close the database connection after all operations are done
 
 
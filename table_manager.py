@@ -0,0 +1,107 @@
+from game_implementations import RouletteFactory, BlackJackFactory, CrapsFactory, SlotMachineFactory, PokerFactory, RulesGameFactory
+from db import save_game_instance, close_game_instance
+from simulation import run_process, run_process_async
+
+# Table limits for each game: the factory that builds its tables and how many tables may be open
+# max_tables matches the number of tables the casino used to open for the whole night
+TABLE_LIMITS = {
+    "Roulette": {'factory': RouletteFactory, 'min_tables': 1, 'max_tables': 4},
+    "Slot Machine": {'factory': SlotMachineFactory, 'min_tables': 5, 'max_tables': 25},
+    "BlackJack": {'factory': BlackJackFactory, 'min_tables': 1, 'max_tables': 6},
+    "Craps": {'factory': CrapsFactory, 'min_tables': 1, 'max_tables': 3},
+    "Poker": {'factory': PokerFactory, 'min_tables': 1, 'max_tables': 5},
+}
+
+# Table bounds of a game that is not in TABLE_LIMITS (e.g. named only in a --profiles file), its tables are
+# built from its rules by a RulesGameFactory
+DEFAULT_LIMITS = {'min_tables': 1, 'max_tables': 3}
+
+
+# TableManager class opens game tables when demand rises and closes idle ones when it falls
+class TableManager:
+    def __init__(self, casino, limits=None, check_interval=10, max_queue_per_seat=1.0, max_wait=30, idle_timeout=300):
+        self.casino = casino  # Reference to the casino
+        self.limits = limits if limits is not None else TABLE_LIMITS  # Factory and table bounds for each game
+        if any(limit['min_tables'] < 1 or limit['max_tables'] < limit['min_tables']
+               for limit in self.limits.values()):
+            raise ValueError("Every game needs at least one open table, and max_tables cannot be below min_tables")
+        self.factories = {name: limit['factory'](casino) for name, limit in self.limits.items()}
+        self.check_interval = check_interval  # Seconds between two checks of the demand
+        self.max_queue_per_seat = max_queue_per_seat  # Open a table when more players than seats are queued
+        self.max_wait = max_wait  # Open a table when a player has been waiting longer than this (seconds)
+        self.idle_timeout = idle_timeout  # Close a table that has been idle for this long (seconds)
+
+    def open_initial_tables(self):
+        # Open the minimum number of tables of every game
+        for name, limit in self.limits.items():
+            for _ in range(limit['min_tables']):
+                self.open_table(name)
+
+    def limit(self, name):
+        # Return the table bounds of a game, the default ones for a game that is not in the limits
+        return self.limits.get(name, DEFAULT_LIMITS)
+
+    def games(self):
+        # Names of the games to manage: the ones in the limits, then any other game customers have asked for
+        return list(self.limits) + [name for name in list(self.casino.games) if name not in self.limits]
+
+    def tables(self, name):
+        # Return the open tables of a game
+        dispatcher = self.casino.games.get(name)
+        if dispatcher is None:
+            return []
+        with dispatcher.lock:
+            return list(dispatcher.instances)
+
+    def open_table(self, name):
+        # Create a new table with the game's factory, record it and start it
+        # Returns None if the game already has max_tables open: the count and the opening happen under the
+        # dispatcher's lock, so a customer finding no table and the manager cannot both open one past the limit
+        dispatcher = self.casino.dispatcher(name)
+        with dispatcher.lock:
+            if len(dispatcher.instances) >= self.limit(name)['max_tables']:
+                return None
+            game_id = save_game_instance(name)  # The database id identifies the table in game_play
+            if name not in self.factories:
+                self.factories[name] = RulesGameFactory(self.casino, name)
+            game = self.factories[name].create_game(game_id)  # The new table adds itself to the dispatcher
+            print(f"Table manager opened {name}-{game.id}")
+            self.casino.start_actor(game)
+        return game
+
+    def close_table(self, game):
+        # Stop routing players to the table, then let it finish and hand back anyone still queued
+        self.casino.games[game.name].remove(game)
+        game.close()
+        close_game_instance(game.id)
+        print(f"Table manager closed {game.name}-{game.id}")
+
+    def check(self):
+        # Open or close at most one table per game, depending on the current demand
+        now = self.casino.clock.now()
+        for name in self.games():
+            limit = self.limit(name)
+            tables = self.tables(name)
+            seats = sum(game.capacity for game in tables)
+            queued = sum(len(game.wait_list) for game in tables)
+            oldest_wait = max((game.wait_list.oldest_wait(now) for game in tables), default=0)
+            if len(tables) < limit['max_tables'] and (queued > self.max_queue_per_seat * seats or oldest_wait > self.max_wait):
+                self.open_table(name)
+            elif len(tables) > limit['min_tables']:
+                idle = [game for game in tables if game.idle_for(now) > self.idle_timeout]
+                if idle:
+                    self.close_table(idle[-1])  # Close the most recently opened idle table
+
+    def run(self):
+        # Run the table manager on its own thread
+        run_process(self.process(), self.casino.clock)
+
+    async def run_async(self):
+        # Coroutine equivalent of run() for the asyncio backend
+        await run_process_async(self.process(), self.casino.clock)
+
+    def process(self):
+        # Check the demand periodically for as long as the casino is open
+        while True:
+            yield self.check_interval
+            self.check()
@@ -0,0 +1,51 @@
+# Tests of the arrival schedules drawn from rate curves
+#
+# Usage: python -m pytest tests
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from arrivals import RATE_CURVES, RateCurve, night_schedule, spawner_schedule
+
+
+def test_expected_arrivals_integrate_the_curve():
+    assert RateCurve([(0, 0), (2, 600)]).expected() == pytest.approx(600)
+    assert RateCurve(RATE_CURVES["steady"], scale=2).expected() == pytest.approx(360 * 8 * 2)
+
+
+def test_thinning_draws_the_expected_number_of_arrivals():
+    curve = RateCurve(RATE_CURVES["friday_night"])
+    rng = np.random.default_rng(0)
+    counts = [len(curve.schedule(rng)) for _ in range(200)]
+    # A Poisson count: its mean over 200 nights is within a few standard errors of the expected arrivals
+    assert abs(np.mean(counts) - curve.expected()) < 4 * np.sqrt(curve.expected() / 200)
+
+
+def test_thinning_follows_the_shape_of_the_curve():
+    # The rate ramps up from 0 over the first hour: 3/4 of its arrivals come in the second half hour
+    # After the second hour the rate is 0 until closing, and nobody arrives
+    curve = RateCurve([(0, 0), (1, 20000), (2, 0), (3, 0)])
+    arrivals = curve.schedule(np.random.default_rng(0))
+    assert np.all(np.diff(arrivals) >= 0)
+    assert arrivals[0] >= 0 and arrivals[-1] < 2 * 3600
+    first_hour = arrivals[arrivals < 3600]
+    assert abs(np.mean(first_hour >= 1800) - 0.75) < 0.02
+
+
+def test_invalid_curves_are_refused():
+    for points in ([(0, 100)], [(0, 100), (0, 200)], [(0, 100), (1, -5)]):
+        with pytest.raises(ValueError):
+            RateCurve(points)
+
+
+def test_night_schedules():
+    rng = np.random.default_rng(0)
+    spawned = spawner_schedule(rng, initial_customers=3, max_customers=10)
+    assert len(spawned) == 10 and np.all(spawned[:4] == 0)  # The first spawned customer comes at opening too
+    assert np.all(np.isin(np.diff(spawned[3:]), np.arange(5, 16)))
+    night = night_schedule(rng, "closing", initial_customers=5, max_customers=50)
+    assert len(night) == 50 and np.all(night[:5] == 0)
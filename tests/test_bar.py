@@ -0,0 +1,81 @@
+# Tests of the bar router and of batching identical items across bar orders, on the discrete-event backend
+#
+# Usage: python -m pytest tests
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bar import Bar, BarRouter, Menu, Order
+from casino import Casino
+
+
+# Patron class stands in for a customer: the bar only needs an id and a type
+class Patron:
+    def __init__(self, id):
+        self.id = id
+        self.type = "regular"
+
+
+def bar(name, backlog, items=("Beer",), batch_size=1):
+    # A bar serving the given items (10s each) with the given seconds of work already ordered
+    menu = Menu()
+    for item in items:
+        menu.add_product(item, 5.0, 10)
+    bar = Bar(menu, name, batch_size=batch_size)
+    bar.backlog = backlog
+    return bar
+
+
+def router(strategy, *bars):
+    router = BarRouter(strategy)
+    for bar in bars:
+        router.add(bar)
+    return router
+
+
+def test_jsq_sends_orders_to_the_shortest_expected_wait():
+    Casino(backend="des")  # Bars and orders take the time from the casino clock
+    bars = [bar("A", 10), bar("B", 2), bar("C", 5)]
+    beer = router("jsq", *bars)
+    assert beer.choose("Beer") is bars[1]
+    bars[0].staff_changed(10)  # Ten baristas share A's 10 seconds of work
+    assert beer.choose("Beer") is bars[0]
+    assert beer.routed == {"A": 1, "B": 1, "C": 0}
+
+
+def test_p2c_never_picks_the_busiest_bar():
+    Casino(backend="des")  # Bars and orders take the time from the casino clock
+    random.seed(0)
+    bars = [bar("A", 10), bar("B", 2), bar("C", 5)]
+    beer = router("p2c", *bars)
+    chosen = {beer.choose("Beer").name for _ in range(200)}
+    assert chosen == {"B", "C"}
+
+
+def test_an_item_served_by_one_bar_goes_there():
+    Casino(backend="des")  # Bars and orders take the time from the casino clock
+    bars = [bar("A", 0, ("Beer",)), bar("B", 100, ("Beer", "Mojito"))]
+    drinks = router("jsq", *bars)
+    assert drinks.item_names == ["Beer", "Mojito"]
+    assert drinks.choose("Mojito") is bars[1]
+
+
+def test_batch_takes_the_same_item_from_several_orders():
+    Casino(backend="des")  # Bars and orders take the time from the casino clock
+    batching = bar("A", 0, ("Beer", "Coke"), batch_size=3)
+    orders = []
+    for id, names in enumerate([("Beer", "Coke"), ("Coke",), ("Beer", "Beer")]):
+        order = Order(Patron(id))
+        for name in names:
+            order.add_item(batching.products[name])
+        batching.add_order(order)
+        orders.append(order)
+    batch, delay = batching.orders.take_batch(3)
+    assert delay == 0
+    assert [(order.customer.id, item.name) for order, item in batch] == [(0, "Beer"), (2, "Beer"), (2, "Beer")]
+    assert len(batching.orders) == 2  # The third order has nothing left to start
+    batch, _ = batching.orders.take_batch(3)
+    assert [(order.customer.id, item.name) for order, item in batch] == [(0, "Coke"), (1, "Coke")]
+    assert batching.orders.take_batch(3) == ([], None)
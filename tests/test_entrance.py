@@ -0,0 +1,61 @@
+# Tests of the entrance's occupancy limit, line, balking and refusals, on the discrete-event backend
+#
+# Usage: python -m pytest tests
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import entrance
+from casino import Casino
+
+
+# Visitor class stands in for a customer: the entrance only needs an id
+class Visitor:
+    def __init__(self, id):
+        self.id = id
+
+
+def night(monkeypatch, arrivals, departures, until=30):
+    # Run an entrance letting one customer in, with a line of one who waits up to 5 seconds
+    # arrivals are (time, id), departures (time, id) of customers inside; returns who got in and who was refused
+    casino = Casino(backend="des", max_occupancy=1, entrance_queue=1, entrance_wait=5)
+    simulation = casino.backend.simulation
+    admitted, refused = [], []
+    monkeypatch.setattr(casino, "admit", lambda customer: admitted.append((simulation.now, customer.id)))
+    monkeypatch.setattr(entrance, "save_refused_entry",
+                        lambda customer_id, reason: refused.append((simulation.now, customer_id, reason)))
+    monkeypatch.setattr(entrance, "save_customer_departure", lambda customer, reason: None)
+    visitors = {}
+    for at, id in arrivals:
+        visitors[id] = Visitor(id)
+        simulation.schedule(at, casino.entrance.arrive, visitors[id])
+    for at, id in departures:
+        simulation.schedule(at, casino.entrance.leave, visitors[id])
+    casino.start_actor(casino.entrance)
+    simulation.run(until=until)
+    return admitted, refused, casino.entrance.report()
+
+
+def test_departure_lets_the_first_in_line_in_and_a_full_line_turns_away(monkeypatch):
+    admitted, refused, report = night(monkeypatch, [(0, 1), (1, 2), (2, 3)], [(4, 1)])
+    assert admitted == [(0, 1), (4, 2)]
+    assert refused == [(2, 3, "rejected")]
+    assert (report['inside'], report['waited'], report['mean_wait'], report['max_line']) == (1, 1, 3, 1)
+
+
+def test_customer_balks_after_max_wait(monkeypatch):
+    admitted, refused, report = night(monkeypatch, [(0, 1), (1, 2), (9, 3)], [(8, 1)])
+    assert refused == [(6, 2, "balked")]  # The scheduler sends them home 5 seconds after they joined the line
+    assert admitted == [(0, 1), (9, 3)]  # Nobody was left in line when customer 1 left
+    assert (report['balked'], report['waiting'], report['inside']) == (1, 0, 1)
+
+
+def test_no_limit_lets_everyone_in(monkeypatch):
+    casino = Casino(backend="des")
+    admitted = []
+    monkeypatch.setattr(casino, "admit", lambda customer: admitted.append(customer.id))
+    for id in range(50):
+        casino.entrance.arrive(Visitor(id))
+    assert admitted == list(range(50))
+    assert casino.entrance.report()['max_inside'] == 50
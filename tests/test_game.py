@@ -0,0 +1,60 @@
+# Tests of the game tables' wait for min_seats players, on the discrete-event backend
+#
+# Usage: python -m pytest tests
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from casino import Casino
+from game import Game
+
+
+# Player class stands in for a customer: the test only needs an id
+class Player:
+    def __init__(self, id):
+        self.id = id
+
+
+# RecordingGame class is a table that records its rounds (time, players) instead of playing them
+class RecordingGame(Game):
+    def __init__(self, casino, **rules):
+        super().__init__(casino, "Poker", id=1, **rules)
+        self.rounds = []
+
+    def play_round(self, players):
+        self.rounds.append((self.casino.clock.now(), players))
+
+
+def play(joins, seed, until=120):
+    # Run a Poker table (2 seats needed, 10 seconds of waiting) with players joining at the given times
+    random.seed(seed)  # Round and pause lengths
+    casino = Casino(backend="des")
+    game = RecordingGame(casino, capacity=10, probability=0.5, prize=2, min_seats=2, max_wait=10)
+    simulation = casino.backend.simulation
+    joined_at = {}
+    for id, at in enumerate(joins):
+        player = Player(id)
+        joined_at[player] = at
+        simulation.schedule(at, casino.games["Poker"].join, player)
+    casino.start_actor(game)
+    simulation.run(until=until)
+    return game.rounds, joined_at
+
+
+def test_lone_poker_player_waits_max_wait_since_joining():
+    # Pairs join while the table is busy (leaving a wake-up pending), then players come alone
+    joins = [0, 0, 0.5, 0.5, 0.6, 0.6, 8.1, 31, 47.5]
+    for seed in range(20):
+        rounds, joined_at = play(joins, seed)
+        assert sum(len(players) for _, players in rounds) == len(joins)  # Everyone played
+        for started, players in rounds:
+            if len(players) < 2:
+                assert started - joined_at[players[0]] >= 10, f"seed {seed}: lone round at {started}"
+
+
+def test_staggered_poker_pair_plays_together():
+    # The second player joins before the first has waited max_wait: they play the same round
+    rounds, _ = play([0, 6], seed=0)
+    assert [(started, len(players)) for started, players in rounds] == [(6, 2)]
@@ -0,0 +1,65 @@
+# Tests of the hotel's checkouts and of its lobby timeouts, on the discrete-event backend
+#
+# Usage: python -m pytest tests
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hotel
+from casino import Casino
+from hotel import Hotel
+
+
+# Guest class stands in for a customer: the hotel books them a room, refunds them and hands them back
+class Guest:
+    def __init__(self, id):
+        self.id = id
+        self.booked_room = None
+        self.refunds = 0
+
+    def increment(self, amount):
+        self.refunds += amount
+
+
+def stay(monkeypatch, bookings, until=60, rooms=1):
+    # Run a hotel (one room, lobby wait up to 5 seconds, 3 per second) with (time, id, seconds) bookings
+    # Returns when each guest was handed back to the floor, the guests and the hotel
+    monkeypatch.setattr(hotel, "save_booking", lambda room_number, customer, duration_seconds: None)
+    casino = Casino(backend="des")
+    simulation = casino.backend.simulation
+    returned = []
+    monkeypatch.setattr(casino, "return_to_floor", lambda customer: returned.append((simulation.now, customer.id)))
+    lodging = Hotel(rooms, casino, price_per_second=3, max_wait=5)
+    guests = {}
+    for at, id, seconds in bookings:
+        guests[id] = Guest(id)
+        simulation.schedule(at, lodging.book_room, guests[id], seconds)
+    casino.start_actor(lodging)
+    simulation.run(until=until)
+    return returned, guests, lodging
+
+
+def test_guest_in_the_lobby_gets_the_room_at_checkout(monkeypatch):
+    returned, guests, lodging = stay(monkeypatch, [(0, 1, 10), (7, 2, 4)])
+    assert returned == [(10, 1), (14, 2)]
+    report = lodging.report()
+    assert (report['bookings'], report['waited'], report['mean_wait'], report['gave_up']) == (2, 1, 3, 0)
+    assert not lodging.lobby and len(lodging.free_rooms) == 1
+
+
+def test_guest_gives_up_after_max_wait_and_leaves_the_lobby(monkeypatch):
+    returned, guests, lodging = stay(monkeypatch, [(0, 1, 10), (1, 2, 4)], until=7)
+    assert returned == [(6, 2)]
+    assert guests[2].refunds == 4 * 3
+    assert not lodging.lobby  # Taken out of the lobby as soon as they gave up
+    returned, guests, lodging = stay(monkeypatch, [(0, 1, 10), (1, 2, 4)])
+    assert returned == [(6, 2), (10, 1)]  # The room is free again after the first stay, nobody is waiting
+    assert len(lodging.free_rooms) == 1 and lodging.report()['gave_up'] == 1
+
+
+def test_checkouts_come_in_expiry_order(monkeypatch):
+    # Stays of different lengths share one scheduler: it wakes for each checkout in turn
+    returned, _, lodging = stay(monkeypatch, [(0, 1, 20), (1, 2, 5), (2, 3, 12)], rooms=3)
+    assert returned == [(6, 2), (14, 3), (20, 1)]
+    assert lodging.report()['max_occupied'] == 3
@@ -0,0 +1,72 @@
+# Tests of the order scheduling policies, on the discrete-event backend
+#
+# Usage: python -m pytest tests
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bar import Item, Order
+from casino import Casino
+from order_queue import OrderQueue
+
+
+# Patron class stands in for a customer: the policies only look at the type
+class Patron:
+    def __init__(self, id, type):
+        self.id = id
+        self.type = type
+
+
+def take_all(policy, orders, taken_at=50):
+    # Queue (time, customer type, preparation time) orders as the simulation reaches their time, then take them
+    # all at taken_at; returns the ids of the customers in the order the queue gives their orders back
+    casino = Casino(backend="des")
+    queue = OrderQueue(casino.clock, policy)
+    simulation = casino.backend.simulation
+    for id, (at, type, prep_time) in enumerate(orders):
+        order = Order(Patron(id, type))
+        order.add_item(Item("Dish", 10, prep_time))
+        simulation.schedule(at, queue.put, order)
+    taken = []
+
+    def take():
+        order = queue.get()
+        while order is not None:
+            taken.append(order)
+            order = queue.get()
+
+    simulation.schedule(taken_at, take)
+    simulation.run()
+    return [order.customer.id for order in taken], queue
+
+
+# A long regular order first, a short regular one 10s later, a short vip one 40s later
+ORDERS = [(0, "regular", 20), (10, "regular", 2), (40, "vip", 2)]
+
+
+def test_fifo_takes_orders_in_arrival_order():
+    assert take_all("fifo", ORDERS)[0] == [0, 1, 2]
+
+
+def test_sjf_takes_the_shortest_orders_first():
+    assert take_all("sjf", ORDERS)[0] == [1, 2, 0]
+
+
+def test_vip_orders_go_first_then_arrival_order():
+    assert take_all("vip", ORDERS)[0] == [2, 0, 1]
+
+
+def test_aging_lets_a_long_order_overtake_later_short_ones():
+    # The long order has waited 40s when the last short one arrives: 20s of work forgiven, it goes first
+    assert take_all("aging", ORDERS)[0] == [1, 0, 2]
+
+
+def test_queue_records_waits_and_refuses_orders_once_closed():
+    ids, queue = take_all("fifo", ORDERS)
+    report = queue.report()
+    assert (report['orders'], report['max_depth'], report['max_wait']) == (3, 3, 50)
+    assert report['mean_wait'] == (50 + 40 + 10) / 3
+    queue.close()
+    assert not queue.put(Order(Patron(3, "regular")))
+    assert queue.get() is None
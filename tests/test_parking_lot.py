@@ -0,0 +1,59 @@
+# Tests of the parking lot's waiting line and its timeouts, on the discrete-event backend
+#
+# Usage: python -m pytest tests
+import itertools
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parking_lot
+from casino import Casino
+from parking_lot import Car, Parking
+
+
+def drive(simulation, parking, car, timeout, stay, log):
+    # A driver who parks (waiting up to timeout seconds for a slot), stays, then leaves
+    if not car.try_park(parking):
+        yield car.wait_for_slot(parking, timeout)
+        if not car.stop_waiting():
+            log.append((simulation.now, car.customer_id, "gave up"))
+            return
+    log.append((simulation.now, car.customer_id, "parked"))
+    yield stay
+    car.de_park()
+
+
+def park(monkeypatch, capacity, drivers, until=60):
+    # Run drivers (arrival time, timeout, stay) on a lot of the given capacity, returns the log and the report
+    ids = itertools.count(1)
+    monkeypatch.setattr(parking_lot, "save_parking_record", lambda customer_id, slot_id: next(ids))
+    monkeypatch.setattr(parking_lot, "close_parking_record", lambda record_id: None)
+    casino = Casino(backend="des")
+    simulation = casino.backend.simulation
+    parking = Parking(capacity)
+    log = []
+    for id, (at, timeout, stay) in enumerate(drivers):
+        process = drive(simulation, parking, Car(id), timeout, stay, log)
+        simulation.schedule(at, simulation.start, process)
+    simulation.run(until=until)
+    return log, parking.report()
+
+
+def test_freed_slot_goes_to_the_car_waiting_in_line(monkeypatch):
+    log, report = park(monkeypatch, 1, [(0, 5, 3), (1, 5, 3)])
+    assert log == [(0, 0, "parked"), (3, 1, "parked")]
+    assert (report['queued'], report['waited'], report['mean_wait'], report['timed_out']) == (1, 1, 2, 0)
+
+
+def test_driver_gives_up_after_the_timeout(monkeypatch):
+    log, report = park(monkeypatch, 1, [(0, 5, 10), (1, 5, 3), (12, 5, 3)])
+    assert log == [(0, 0, "parked"), (6, 1, "gave up"), (12, 2, "parked")]
+    assert (report['timed_out'], report['waited'], report['occupied']) == (1, 0, 0)
+
+
+def test_cars_that_gave_up_do_not_count_in_the_line(monkeypatch):
+    # The second car gives up at 3, the third waits from 4: the line never held more than one waiting car
+    log, report = park(monkeypatch, 1, [(0, 5, 10), (1, 2, 3), (4, 20, 3)])
+    assert log == [(0, 0, "parked"), (3, 1, "gave up"), (10, 2, "parked")]
+    assert (report['max_queue'], report['queued'], report['timed_out']) == (1, 2, 1)
@@ -0,0 +1,47 @@
+# Tests of the alias tables customers draw their decisions from
+#
+# Usage: python -m pytest tests
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sampling import AliasSampler, AliasTable
+
+WEIGHTS = {"Roulette": 0.1, "Slot Machine": 0.4, "BlackJack": 0.25, "Craps": 0.0, "Poker": 0.25}
+
+
+def test_alias_table_holds_the_weights():
+    sampler = AliasSampler(WEIGHTS.keys(), WEIGHTS.values())
+    assert sampler.probabilities() == pytest.approx(WEIGHTS)
+
+
+def test_draws_follow_the_weights():
+    random.seed(0)
+    sampler = AliasSampler(WEIGHTS.keys(), [weight * 8 for weight in WEIGHTS.values()])  # Weights need not sum to 1
+    draws = 100000
+    counts = dict.fromkeys(WEIGHTS, 0)
+    for _ in range(draws):
+        counts[sampler.sample()] += 1
+    assert counts["Craps"] == 0  # A zero weight is never drawn
+    for game, weight in WEIGHTS.items():
+        assert abs(counts[game] / draws - weight) < 0.01
+
+
+def test_invalid_weights_are_refused():
+    for items, weights in (([], []), (["a", "b"], [0, 0]), (["a", "b"], [1, -1])):
+        with pytest.raises(ValueError):
+            AliasSampler(items, weights)
+
+
+def test_table_draws_each_row_from_its_own_distribution():
+    table = AliasTable(["wait", "play", "leave"], [{"play": 1}, {"wait": 3, "leave": 1}])
+    rows = np.repeat([0, 1], 50000)
+    draws = table.draw(np.random.default_rng(0), rows)
+    assert np.all(draws[:50000] == 1)
+    assert set(draws[50000:].tolist()) == {0, 2}
+    assert abs(np.mean(draws[50000:] == 0) - 0.75) < 0.01
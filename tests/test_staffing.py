@@ -0,0 +1,87 @@
+# Tests of the staffing controller's hiring and of its hysteresis before retiring, on the discrete-event backend
+#
+# Usage: python -m pytest tests
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import staffing
+from bar import Order
+from casino import Casino
+from order_queue import OrderQueue
+from staffing import StaffingController
+
+
+# Patron class stands in for a customer: the queue only needs an id and a type
+class Patron:
+    def __init__(self, id):
+        self.id = id
+        self.type = "regular"
+
+
+# Venue class stands in for a bar: the controller only reads its name and order queue
+class Venue:
+    def __init__(self, name, clock):
+        self.name = name
+        self.orders = OrderQueue(clock)
+
+
+# Worker class stands in for a barista: it is hired, counted and retired, never run
+class Worker:
+    def __init__(self, id, venue):
+        self.id = id
+        self.venue = venue
+        self.retired = False
+
+
+def controller(monkeypatch):
+    # A controller keeping 1 to 3 workers at one bar, hiring above 2 queued orders per worker, retiring after
+    # 3 calm checks in a row
+    monkeypatch.setattr(staffing, "save_staffing_change", lambda *change: None)
+    casino = Casino(backend="des")
+    monkeypatch.setattr(casino, "start_actor", lambda actor: None)
+    limits = {"bar": {'worker': Worker, 'min_workers': 1, 'max_workers': 3, 'slo': 30}}
+    staff = StaffingController(casino, limits, max_queue_per_worker=2, calm_checks=3)
+    venue = Venue("Bar", casino.clock)
+    staff.add_venue("bar", venue)
+    return staff, venue
+
+
+def queue(venue, count):
+    for id in range(count):
+        venue.orders.put(Order(Patron(id)))
+
+
+def drain(venue):
+    while venue.orders.get() is not None:
+        pass
+
+
+def test_controller_hires_up_to_max_workers_while_orders_pile_up(monkeypatch):
+    staff, venue = controller(monkeypatch)
+    assert len(staff.staff["Bar"]) == 1  # The minimum staff is hired with the venue
+    queue(venue, 5)
+    workers = []
+    for _ in range(3):
+        staff.check()
+        workers.append(len(staff.staff["Bar"]))
+    assert workers == [2, 3, 3]
+
+
+def test_controller_retires_only_after_calm_checks_in_a_row(monkeypatch):
+    staff, venue = controller(monkeypatch)
+    queue(venue, 5)
+    staff.check()
+    staff.check()
+    drain(venue)
+    hired = list(staff.staff["Bar"])
+    workers = []
+    for orders in (0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0):  # One order arriving breaks the calm streak
+        queue(venue, orders)
+        staff.check()
+        drain(venue)
+        workers.append(len(staff.staff["Bar"]))
+    assert workers == [3, 3, 3, 3, 3, 2, 2, 2, 1, 1, 1, 1]  # Never below min_workers
+    assert [worker.retired for worker in hired] == [False, True, True]  # The most recently hired go first
+    assert staff.report() == [{'venue': "Bar", 'workers': 1, 'hires': 3, 'retirements': 2, 'peak': 3}]
@@ -0,0 +1,66 @@
+# Tests of the table limits when customers and the table manager open game tables at the same time
+#
+# Usage: python -m pytest tests
+import itertools
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import table_manager
+from casino import Casino
+from game_implementations import PokerFactory
+from table_manager import TableManager
+
+
+# Player class stands in for a customer: the test only needs an id
+class Player:
+    def __init__(self, id):
+        self.id = id
+
+
+def poker_casino(monkeypatch, max_tables):
+    # A casino whose only game is Poker, with tables that are counted but never run nor saved
+    ids = itertools.count(1)
+
+    def save_game_instance(name):
+        time.sleep(0.01)  # As slow as a database write, so that racing openings overlap
+        return next(ids)
+
+    monkeypatch.setattr(table_manager, "save_game_instance", save_game_instance)
+    casino = Casino(backend="des")
+    monkeypatch.setattr(casino, "start_actor", lambda actor: None)
+    limits = {"Poker": {'factory': PokerFactory, 'min_tables': 1, 'max_tables': max_tables}}
+    casino.table_manager = TableManager(casino, limits)  # Before the Poker dispatcher is created
+    return casino
+
+
+def test_players_finding_no_table_open_only_one(monkeypatch):
+    casino = poker_casino(monkeypatch, max_tables=2)
+    dispatcher = casino.dispatcher("Poker")
+    start = threading.Barrier(16)
+
+    def arrive(id):
+        start.wait()
+        dispatcher.join(Player(id))
+
+    threads = [threading.Thread(target=arrive, args=(id,)) for id in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(dispatcher.instances) == 1
+    assert len(dispatcher) == 16  # Everyone is queued at that table
+
+
+def test_open_table_stops_at_max_tables(monkeypatch):
+    casino = poker_casino(monkeypatch, max_tables=2)
+    threads = [threading.Thread(target=casino.table_manager.open_table, args=("Poker",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(casino.dispatcher("Poker").instances) == 2
+    assert casino.table_manager.open_table("Poker") is None